@@ -2,10 +2,20 @@ import csv
 import random
 import datetime
 import pandas as pd
+import os
+import sys
+
+# Shared helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sales_csv import write_sales_csv
+
+NUM_RECORDS = 10000  # Total sales records to generate
+COMPRESSION = None  # Compress the sales file: None, 'gzip', 'zstd' or 'bz2'
+CHUNK_SIZE = 10000  # Sales rows written per chunk, so memory stays flat whatever num_records is
+SUMMARY_STATS = False  # Also write summary_stats_CP.json (see stream_stats.py)
 
 # Step 1: Generate and store detailed sales data
-def generate_sales_data(num_records):
-    sales_data = []
+def iter_sales_data(num_records):
     for i in range(num_records):
         date = datetime.date.today() - datetime.timedelta(days=random.randint(0, 365))
         time = datetime.time(random.randint(0, 23), random.randint(0, 59))
@@ -16,15 +26,16 @@ def generate_sales_data(num_records):
         store_name = f"Store_{random.randint(1, 45)}"
         campaign = random.choice(["", "10% off Black Friday", "Summer Sale"])
         
-        sales_data.append([date, time, product_name, unit_price, quantity, revenue, store_name, campaign])
-        
         if (i + 1) % 1000 == 0:
             print(f"{i + 1} records generated...")
-    
-    with open('sales_data_CP.csv', 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"])
-        writer.writerows(sales_data)
+        
+        yield [date, time, product_name, unit_price, quantity, revenue, store_name, campaign]
+
+def generate_sales_data(num_records):
+    write_sales_csv('sales_data_CP.csv',
+                    ["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"],
+                    iter_sales_data(num_records), COMPRESSION, CHUNK_SIZE,
+                    stats_path='summary_stats_CP.json' if SUMMARY_STATS else None)
     
     print(f"Total {num_records} sales records generated.")
 
@@ -45,8 +56,7 @@ def generate_categories_and_products():
         for product, category in products.items():
             writer.writerow([product, category])
     
-    print(f"Total {len(categories)} categories and {len(products)} products gener
-          ated.")
+    print(f"Total {len(categories)} categories and {len(products)} products generated.")
 
 # Step 3: Generate store data
 def generate_store_data():
@@ -65,7 +75,7 @@ def generate_store_data():
 
 # Main function to run all steps
 def main():
-    num_records = 10000
+    num_records = NUM_RECORDS
     generate_sales_data(num_records)
     generate_categories_and_products()
     generate_store_data()
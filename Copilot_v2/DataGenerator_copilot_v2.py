@@ -2,29 +2,41 @@ import csv
 import random
 import datetime
 import pandas as pd
+import os
+import sys
+
+# Shared helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from sales_csv import write_sales_csv
+
+NUM_RECORDS = 10000  # Total sales records to generate
+COMPRESSION = None  # Compress the sales file: None, 'gzip', 'zstd' or 'bz2'
+CHUNK_SIZE = 10000  # Sales rows written per chunk, so memory stays flat whatever num_records is
+SUMMARY_STATS = False  # Also write summary_stats_CPv2.json (see stream_stats.py)
 
 # Step 1: Generate and store detailed sales data
-def generate_sales_data(num_records, products, stores, campaigns):
-    sales_data = []
+def iter_sales_data(num_records, products, stores, campaigns):
+    product_names = list(products.keys())
     for i in range(num_records):
         date = datetime.date.today() - datetime.timedelta(days=random.randint(0, 365))
         time = datetime.time(random.randint(0, 23), random.randint(0, 59))
-        product_name = random.choice(list(products.keys()))
+        product_name = random.choice(product_names)
         unit_price = products[product_name]['price']
         quantity = random.randint(1, 20)
         revenue = round(unit_price * quantity, 2)
         store_name = random.choice(stores)['store_name']
         campaign = random.choices(campaigns, weights=[0.8, 0.1, 0.1], k=1)[0]
         
-        sales_data.append([date, time, product_name, unit_price, quantity, revenue, store_name, campaign])
-        
         if (i + 1) % 1000 == 0:
             print(f"{i + 1} records generated...")
-    
-    with open('sales_data_CPv2.csv', 'w', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow(["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"])
-        writer.writerows(sales_data)
+        
+        yield [date, time, product_name, unit_price, quantity, revenue, store_name, campaign]
+
+def generate_sales_data(num_records, products, stores, campaigns):
+    write_sales_csv('sales_data_CPv2.csv',
+                    ["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"],
+                    iter_sales_data(num_records, products, stores, campaigns), COMPRESSION, CHUNK_SIZE,
+                    stats_path='summary_stats_CPv2.json' if SUMMARY_STATS else None)
     
     print(f"Total {num_records} sales records generated.")
 
@@ -66,7 +78,7 @@ def generate_store_data():
 
 # Main function to run all steps
 def main():
-    num_records = 10000
+    num_records = NUM_RECORDS
     campaigns = ["", "10% off Black Friday", "Summer Sale"]
     products = generate_categories_and_products()
     stores = generate_store_data()
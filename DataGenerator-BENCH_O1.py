@@ -0,0 +1,81 @@
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+from OpenAI_o1.DataGenerator_o1 import AliasSampler
+
+# Product counts to benchmark and rows generated per run
+PRODUCT_COUNTS = [50, 500, 5000, 50000]
+BENCH_RECORDS = 20000
+
+
+def synthetic_catalogue(num_products):
+    # Spread num_products evenly over the existing categories
+    catalogue = {}
+    per_category = max(1, num_products // len(DataGenerator_o1.CATEGORIES))
+    for category in DataGenerator_o1.CATEGORIES:
+        catalogue[category] = [
+            (f"{category} Item {i}", (5, 500)) for i in range(1, per_category + 1)
+        ]
+    return catalogue
+
+
+def linear_pick(weights, total):
+    # The cumulative walk the generator used before the alias tables
+    r = random.uniform(0, total)
+    cumulative = 0.0
+    for idx, weight in enumerate(weights):
+        cumulative += weight
+        if r <= cumulative:
+            return idx
+    return len(weights) - 1
+
+
+def bench_draws(num_products, draws=20000):
+    weights = [random.randint(1, 100) for _ in range(num_products)]
+    total = sum(weights)
+
+    start = time.perf_counter()
+    for _ in range(draws):
+        linear_pick(weights, total)
+    linear_rate = draws / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    sampler = AliasSampler(weights)
+    for _ in range(draws):
+        sampler.sample()
+    alias_rate = draws / (time.perf_counter() - start)
+    return linear_rate, alias_rate
+
+
+def bench_main(num_products):
+    original_products = DataGenerator_o1.CATEGORY_PRODUCTS
+    original_records = DataGenerator_o1.NUM_SALES_RECORDS
+    original_cwd = os.getcwd()
+    DataGenerator_o1.CATEGORY_PRODUCTS = synthetic_catalogue(num_products)
+    DataGenerator_o1.NUM_SALES_RECORDS = BENCH_RECORDS
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                DataGenerator_o1.main()
+            elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(original_cwd)
+        DataGenerator_o1.CATEGORY_PRODUCTS = original_products
+        DataGenerator_o1.NUM_SALES_RECORDS = original_records
+    return BENCH_RECORDS / elapsed
+
+
+if __name__ == "__main__":
+    random.seed(42)
+    print(f"{'products':>10} {'main rows/sec':>15} {'linear draws/sec':>18} {'alias draws/sec':>17}")
+    for count in PRODUCT_COUNTS:
+        rows_per_sec = bench_main(count)
+        linear_rate, alias_rate = bench_draws(count)
+        print(f"{count:>10} {rows_per_sec:>15,.0f} {linear_rate:>18,.0f} {alias_rate:>17,.0f}")
@@ -0,0 +1,57 @@
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import Perplexity.DataGenerator_Perplexity as DataGenerator_Perplexity
+from Perplexity.DataGenerator_Perplexity import FastDateTimeProvider, fake
+
+BENCH_RECORDS = 1000000
+
+
+def bench_faker(num_rows):
+    # The per-row Faker calls the sales loop used before
+    start = time.perf_counter()
+    for _ in range(num_rows):
+        fake.date_between(start_date='-2y', end_date='today')
+        fake.time()
+    return time.perf_counter() - start
+
+
+def bench_fast(num_rows):
+    start = time.perf_counter()
+    date_times = FastDateTimeProvider()
+    for _ in range(num_rows):
+        date_times.date_time()
+    return time.perf_counter() - start
+
+
+def bench_main(num_rows):
+    # Whole script (stores, products, sales, CSV files) in a temp dir
+    original_records = DataGenerator_Perplexity.NUM_RECORDS
+    original_cwd = os.getcwd()
+    DataGenerator_Perplexity.NUM_RECORDS = num_rows
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                DataGenerator_Perplexity.main()
+            elapsed = time.perf_counter() - start
+    finally:
+        os.chdir(original_cwd)
+        DataGenerator_Perplexity.NUM_RECORDS = original_records
+    return elapsed
+
+
+if __name__ == "__main__":
+    print(f"Date/time sampling for {BENCH_RECORDS:,} rows")
+    faker_time = bench_faker(BENCH_RECORDS)
+    fast_time = bench_fast(BENCH_RECORDS)
+    print(f"  Faker date_between + time: {faker_time:8.2f} s ({BENCH_RECORDS / faker_time:12,.0f} rows/sec)")
+    print(f"  FastDateTimeProvider:      {fast_time:8.2f} s ({BENCH_RECORDS / fast_time:12,.0f} rows/sec)")
+    print(f"  Speedup: {faker_time / fast_time:.1f}x")
+
+    main_time = bench_main(BENCH_RECORDS)
+    print(f"Full main() for {BENCH_RECORDS:,} rows: {main_time:.2f} s ({BENCH_RECORDS / main_time:,.0f} rows/sec)")
@@ -0,0 +1,269 @@
+"""
+Throughput and memory comparison of all the generators.
+
+Every (generator, record count) pair runs main() in a fresh Python process
+inside its own temp directory, so imports, peak RSS and output files never
+leak from one run into the next. Each run is seeded with BENCH_SEED and
+repeated REPEATS times; the median wall time is reported.
+
+Usage:
+    python DataGenerator-BENCH_compare.py
+    python DataGenerator-BENCH_compare.py --counts 10000 100000 --generators O1 Deepseek
+    python DataGenerator-BENCH_compare.py --baseline bench_results.json
+
+Writes bench_results.json and bench_results.md (see --output). With
+--baseline the Markdown table gets a rows/sec change column, and runs that
+got slower than REGRESSION_THRESHOLD are flagged.
+"""
+
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# name -> (script, record count constant, sales file)
+GENERATORS = {
+    'O1': ('OpenAI_o1/DataGenerator_o1.py', 'NUM_SALES_RECORDS', 'sales_data_O1.csv'),
+    'o3-mini-high': ('OpenAI_o3_mini_high/DataGenerator_o3-mini-high.py', 'NUM_SALES_RECORDS', 'sales_data_O3MH.csv'),
+    'Deepseek': ('Deepseek/DataGenerator_deepSeek.py', 'NUM_SALES', 'sales_data_DS.csv'),
+    'Perplexity': ('Perplexity/DataGenerator_Perplexity.py', 'NUM_RECORDS', 'sales_data_Perplexity.csv'),
+    'Copilot': ('Copilot/DataGenerator_copilot.py', 'NUM_RECORDS', 'sales_data_CP.csv'),
+    'Copilot_v2': ('Copilot_v2/DataGenerator_copilot_v2.py', 'NUM_RECORDS', 'sales_data_CPv2.csv'),
+}
+
+RECORD_COUNTS = [10000, 100000, 1000000]
+BENCH_SEED = 42
+REPEATS = 1
+TIMEOUT = 3600  # Seconds before a single run is abandoned
+REGRESSION_THRESHOLD = 0.10  # Flag runs more than 10% slower than the baseline
+
+
+class FirstRowClock:
+    """
+    Wraps parallel_compress.open_sales_output, which every generator's sales
+    sink goes through, and records when the first data row (the second line
+    after the header) is written, counted from `started`. A generator that
+    never opens its sales file through it leaves first_row at None.
+    """
+
+    def __init__(self, open_sales_output, started=None):
+        self.open_sales_output = open_sales_output
+        self.started = started
+        self.first_row = None
+
+    def __call__(self, *args, **kwargs):
+        file = self.open_sales_output(*args, **kwargs)
+        write = file.write
+        lines = 0
+
+        def timed_write(data):
+            nonlocal lines
+            if self.first_row is None:
+                lines += data.count('\n')
+                if lines >= 2:
+                    self.first_row = time.perf_counter() - self.started
+            return write(data)
+
+        file.write = timed_write
+        return file
+
+
+def peak_rss_bytes():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS; children covers sharded O1 runs
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def directory_bytes(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            total += os.path.getsize(os.path.join(dirpath, filename))
+    return total
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def run_one(name, num_records, seed):
+    """Child process: run one generator in the current directory and print a JSON result."""
+    script, count_name, sales_file = GENERATORS[name]
+    # Wrapped before the generator is loaded, so its own `from parallel_compress
+    # import open_sales_output` (or that of a shared helper) gets the clock
+    sys.path.insert(0, ROOT)
+    import parallel_compress
+    clock = FirstRowClock(parallel_compress.open_sales_output)
+    parallel_compress.open_sales_output = clock
+
+    spec = importlib.util.spec_from_file_location(f"bench_{name.replace('-', '_')}", os.path.join(ROOT, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    setattr(module, count_name, num_records)
+
+    import random
+    random.seed(seed)
+    if hasattr(module, 'fake'):
+        module.fake.seed_instance(seed)
+
+    started = clock.started = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        module.main()
+    wall_time = time.perf_counter() - started
+
+    return {
+        'wall_time': wall_time,
+        'time_to_first_row': clock.first_row,
+        'peak_rss': peak_rss_bytes(),
+        'bytes_written': directory_bytes(os.getcwd()),
+        'sales_sha256': file_sha256(sales_file) if os.path.exists(sales_file) else None,
+    }
+
+
+def run_isolated(name, num_records, seed):
+    # Fresh interpreter and temp dir per run; a failed run becomes an error
+    # entry instead of ending the whole comparison
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--child', name, str(num_records), str(seed)],
+                cwd=tmp, capture_output=True, text=True, timeout=TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            return {'error': f"timed out after {TIMEOUT} s"}
+    if completed.returncode != 0:
+        return {'error': completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else f"exit code {completed.returncode}"}
+    try:
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        return {'error': "no result printed by the child process"}
+
+
+def bench(name, num_records, seed=BENCH_SEED, repeats=REPEATS):
+    runs = [run_isolated(name, num_records, seed) for _ in range(repeats)]
+    failed = [run for run in runs if 'error' in run]
+    if failed:
+        return {'generator': name, 'records': num_records, 'error': failed[0]['error']}
+
+    wall_time = statistics.median(run['wall_time'] for run in runs)
+    first_rows = [run['time_to_first_row'] for run in runs if run['time_to_first_row'] is not None]
+    checksums = {run['sales_sha256'] for run in runs}
+    return {
+        'generator': name,
+        'records': num_records,
+        'wall_time': round(wall_time, 4),
+        'rows_per_sec': round(num_records / wall_time, 1),
+        'time_to_first_row': round(statistics.median(first_rows), 4) if first_rows else None,
+        'peak_rss': max(run['peak_rss'] for run in runs),
+        'bytes_written': runs[0]['bytes_written'],
+        'sales_sha256': runs[0]['sales_sha256'],
+        # Generators that date sales relative to today only repeat within a day
+        'deterministic': len(checksums) == 1,
+        'repeats': repeats,
+    }
+
+
+def environment():
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def load_baseline(path):
+    with open(path) as f:
+        results = json.load(f)['results']
+    return {(r['generator'], r['records']): r for r in results if 'error' not in r}
+
+
+def markdown_table(results, baseline=None):
+    header = ['Generator', 'Records', 'Wall time (s)', 'Rows/sec', 'First row (s)', 'Peak RSS (MB)', 'Written (MB)']
+    if baseline is not None:
+        header.append('vs baseline')
+    lines = ['| ' + ' | '.join(header) + ' |', '|' + '---|' * len(header)]
+    for r in results:
+        if 'error' in r:
+            cells = [r['generator'], f"{r['records']:,}", f"error: {r['error']}"] + [''] * (len(header) - 3)
+        else:
+            first_row = f"{r['time_to_first_row']:.3f}" if r['time_to_first_row'] is not None else 'n/a'
+            cells = [r['generator'], f"{r['records']:,}", f"{r['wall_time']:.2f}", f"{r['rows_per_sec']:,.0f}",
+                     first_row, f"{r['peak_rss'] / 1e6:.1f}", f"{r['bytes_written'] / 1e6:.1f}"]
+            if baseline is not None:
+                cells.append(baseline_change(r, baseline))
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return '\n'.join(lines) + '\n'
+
+
+def baseline_change(result, baseline):
+    previous = baseline.get((result['generator'], result['records']))
+    if previous is None:
+        return 'new'
+    change = result['rows_per_sec'] / previous['rows_per_sec'] - 1
+    flag = ' **regression**' if change < -REGRESSION_THRESHOLD else ''
+    if previous.get('sales_sha256') != result['sales_sha256'] and result['deterministic']:
+        flag += ' (output changed)'
+    return f"{change:+.1%}{flag}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every generator's main() across record counts.")
+    parser.add_argument('--generators', nargs='+', choices=list(GENERATORS), default=list(GENERATORS))
+    parser.add_argument('--counts', nargs='+', type=int, default=RECORD_COUNTS)
+    parser.add_argument('--seed', type=int, default=BENCH_SEED)
+    parser.add_argument('--repeats', type=int, default=REPEATS)
+    parser.add_argument('--output', default='bench_results', help="Writes OUTPUT.json and OUTPUT.md")
+    parser.add_argument('--baseline', help="Earlier results JSON to compare rows/sec against")
+    args = parser.parse_args(argv)
+
+    baseline = load_baseline(args.baseline) if args.baseline else None
+    results = []
+    for num_records in args.counts:
+        for name in args.generators:
+            print(f"{name} at {num_records:,} records...", flush=True)
+            result = bench(name, num_records, seed=args.seed, repeats=args.repeats)
+            results.append(result)
+            if 'error' in result:
+                print(f"  failed: {result['error']}")
+            else:
+                print(f"  {result['wall_time']:.2f} s, {result['rows_per_sec']:,.0f} rows/sec, "
+                      f"peak RSS {result['peak_rss'] / 1e6:.1f} MB")
+
+    report = {
+        'seed': args.seed,
+        'repeats': args.repeats,
+        'environment': environment(),
+        'results': results,
+    }
+    with open(args.output + '.json', 'w') as f:
+        json.dump(report, f, indent=2)
+    with open(args.output + '.md', 'w') as f:
+        f.write(f"# Generator benchmark\n\nSeed {args.seed}, median of {args.repeats} run(s), "
+                f"Python {report['environment']['python']} on {report['environment']['platform']}\n\n")
+        f.write(markdown_table(results, baseline))
+    print(f"\nResults written to {args.output}.json and {args.output}.md")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 5 and sys.argv[1] == '--child':
+        print(json.dumps(run_one(sys.argv[2], int(sys.argv[3]), int(sys.argv[4]))))
+    else:
+        main()
@@ -2,8 +2,25 @@ import unittest
 import os
 import csv
 import random
+import tempfile
+import contextlib
+import io
+import gzip
+import json
+import bz2
+import bisect
+import math
+import shutil
+import statistics
+from collections import Counter
 from datetime import datetime
 from OpenAI_o1.DataGenerator_o1 import generate_stores, expand_products_and_categories, seasonality_factor, main, CATEGORIES, NUM_SALES_RECORDS
+from OpenAI_o1.DataGenerator_o1 import AliasSampler
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
 
 class TestDataGeneration(unittest.TestCase):
     @classmethod
@@ -159,5 +176,1048 @@ class TestDataGeneration(unittest.TestCase):
         self.assertTrue(len(store_names) > 20, "Expected a variety of store names in sales.")
 
 
+def run_main_in_tempdir(testcase, shard=None, **overrides):
+    # Run DataGenerator_o1.main() in a fresh temp dir with some module settings
+    # overridden; returns the directory (cleaned up with the test).
+    import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+    tmp = tempfile.TemporaryDirectory()
+    testcase.addCleanup(tmp.cleanup)
+    originals = {name: getattr(DataGenerator_o1, name) for name in overrides}
+    cwd = os.getcwd()
+    try:
+        for name, value in overrides.items():
+            setattr(DataGenerator_o1, name, value)
+        os.chdir(tmp.name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_o1.main(shard=shard)
+    finally:
+        os.chdir(cwd)
+        for name, value in originals.items():
+            setattr(DataGenerator_o1, name, value)
+    return tmp.name
+
+
+def read_rollup(path, key_columns):
+    # {key: [sales, quantity, revenue]} of a rollup file, all as strings
+    with open(path, newline="", encoding="utf-8") as f:
+        return {tuple(row[:key_columns]): row[key_columns:key_columns + 3] for row in list(csv.reader(f))[1:]}
+
+
+def rollups_from_sales(directory):
+    # The three rollups recomputed from sales_data_O1.csv and the dimension files
+    def rows(name):
+        with open(os.path.join(directory, name), newline="", encoding="utf-8") as f:
+            return list(csv.reader(f))[1:]
+    store_ids = {row[0]: str(i) for i, row in enumerate(rows("stores_O1.csv"), start=1)}
+    categories = dict(rows("categories_O1.csv"))
+    product_category = {row[1]: row[2] for row in rows("products_O1.csv")}
+    campaign_ids = {"": "0", "10% off Black Friday": "1", "Summer Sale": "2", "Buy One Get One": "3",
+                    "Holiday Discount": "4", "Clearance Sale": "5"}
+    totals = {"daily": {}, "monthly": {}, "campaign": {}}
+    for day, _, product, _, quantity, revenue, store, campaign in rows("sales_data_O1.csv"):
+        cat_id = product_category[product]
+        for table, key in [("daily", (day, store_ids[store], store)),
+                           ("monthly", (day[:7], cat_id, categories[cat_id])),
+                           ("campaign", (campaign_ids[campaign], campaign))]:
+            cell = totals[table].setdefault(key, [0, 0, 0])
+            cell[0] += 1
+            cell[1] += int(quantity)
+            cell[2] += round(float(revenue) * 100)
+    return {table: {key: [str(n), str(q), f"{r // 100}.{r % 100:02d}"] for key, (n, q, r) in cells.items()}
+            for table, cells in totals.items()}
+
+
+def assert_rollups_match_sales(testcase, directory="."):
+    # The rollup files in `directory` hold the totals of its sales file
+    expected = rollups_from_sales(directory)
+    testcase.assertEqual(read_rollup(os.path.join(directory, "rollup_daily_store_O1.csv"), 3), expected["daily"])
+    testcase.assertEqual(read_rollup(os.path.join(directory, "rollup_monthly_category_O1.csv"), 3), expected["monthly"])
+    testcase.assertEqual(read_rollup(os.path.join(directory, "rollup_campaign_O1.csv"), 2), expected["campaign"])
+
+
+class TestAliasSampler(unittest.TestCase):
+    def test_frequencies_follow_weights(self):
+        # weights 1:2:0:7 -> the zero-weight item must never be drawn
+        sampler = AliasSampler([1, 2, 0, 7])
+        rng = random.Random(0)
+        counts = [0, 0, 0, 0]
+        draws = 100000
+        for _ in range(draws):
+            counts[sampler.sample(rng)] += 1
+        self.assertEqual(counts[2], 0)
+        self.assertAlmostEqual(counts[0] / draws, 0.1, delta=0.01)
+        self.assertAlmostEqual(counts[1] / draws, 0.2, delta=0.01)
+        self.assertAlmostEqual(counts[3] / draws, 0.7, delta=0.01)
+
+    def test_invalid_weights(self):
+        with self.assertRaises(ValueError):
+            AliasSampler([])
+        with self.assertRaises(ValueError):
+            AliasSampler([0, 0])
+
+
+class TestVectorizedMode(unittest.TestCase):
+    def test_vectorized_sales_csv(self):
+        out = run_main_in_tempdir(self, VECTORIZED=True, NUM_SALES_RECORDS=5000, VECTOR_BLOCK_SIZE=1500)
+        with open(os.path.join(out, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"])
+        data_rows = rows[1:]
+        self.assertEqual(len(data_rows), 5000)
+        for row in data_rows:
+            datetime.strptime(row[0] + " " + row[1], "%Y-%m-%d %H:%M:%S")
+            self.assertGreaterEqual(int(row[4]), 1)
+            self.assertAlmostEqual(float(row[5]), float(row[3]) * int(row[4]), places=2)
+        campaign_rate = sum(1 for row in data_rows if row[7]) / len(data_rows)
+        self.assertAlmostEqual(campaign_rate, 0.1, delta=0.03)
+
+
+class TestShardedMode(unittest.TestCase):
+    def test_shards_are_reproducible(self):
+        first = run_main_in_tempdir(self, NUM_SHARDS=3, NUM_SALES_RECORDS=3000, PARALLEL_WORKERS=2)
+        second = run_main_in_tempdir(self, NUM_SHARDS=3, NUM_SALES_RECORDS=3000, PARALLEL_WORKERS=3)
+        with open(os.path.join(first, "sales_data_O1.csv"), "rb") as f:
+            first_bytes = f.read()
+        with open(os.path.join(second, "sales_data_O1.csv"), "rb") as f:
+            second_bytes = f.read()
+        self.assertEqual(first_bytes, second_bytes)
+        self.assertEqual(first_bytes.count(b"\r\n"), 3001)  # header + rows
+        self.assertEqual(first_bytes.count(b"product_name"), 1)  # single header
+
+    def test_keep_part_files(self):
+        out = run_main_in_tempdir(self, NUM_SHARDS=2, NUM_SALES_RECORDS=1001, KEEP_PART_FILES=True)
+        parts = sorted(name for name in os.listdir(out) if ".part-" in name)
+        self.assertEqual(parts, ["sales_data_O1.part-00000.csv", "sales_data_O1.part-00001.csv"])
+        self.assertFalse(os.path.exists(os.path.join(out, "sales_data_O1.csv")))
+
+
+class TestShardManifests(unittest.TestCase):
+    def generate_nodes(self, shard_count, **settings):
+        # Every shard in a directory of its own, like separate machines
+        return [run_main_in_tempdir(self, shard=(idx, shard_count), **settings) for idx in range(shard_count)]
+
+    def collect(self, nodes):
+        # Parts and manifests of all nodes plus the first node's dimension files
+        merge_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(merge_dir.cleanup)
+        for node in nodes:
+            for name in os.listdir(node):
+                if ".part-" in name or node == nodes[0]:
+                    shutil.copy(os.path.join(node, name), merge_dir.name)
+        return merge_dir.name
+
+    def merge(self, directory):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return DataGenerator_o1.merge_shards()
+
+    def test_merge_matches_single_machine_run(self):
+        for settings, reference in [(dict(), dict(NUM_SHARDS=3)),
+                                    (dict(COUNTER_RNG=True, ROLLUPS=True, SORTED_OUTPUT=True),
+                                     dict(COUNTER_RNG=True, ROLLUPS=True, SORTED_OUTPUT=True))]:
+            nodes = self.generate_nodes(3, NUM_SALES_RECORDS=3001, **settings)
+            for name in os.listdir(nodes[0]):
+                if ".part-" not in name:
+                    for node in nodes[1:]:
+                        with open(os.path.join(nodes[0], name), "rb") as f, open(os.path.join(node, name), "rb") as g:
+                            self.assertEqual(f.read(), g.read(), name)
+            with open(os.path.join(nodes[2], "sales_data_O1.part-00002.manifest.json")) as f:
+                manifest = json.load(f)
+            self.assertEqual((manifest["first_row"], manifest["stop_row"], manifest["rows"]), (2001, 3001, 1000))
+            self.assertEqual(manifest["seed"]["master_seed"], 42)
+
+            merge_dir = self.collect(nodes)
+            self.merge(merge_dir)
+            self.assertFalse([name for name in os.listdir(merge_dir) if ".part-" in name])
+            single = run_main_in_tempdir(self, NUM_SALES_RECORDS=3001, **reference)
+            with open(os.path.join(single, "sales_data_O1.csv"), "rb") as f:
+                expected = f.read()
+            with open(os.path.join(merge_dir, "sales_data_O1.csv"), "rb") as f:
+                self.assertEqual(f.read(), expected)
+            if settings.get("ROLLUPS"):
+                assert_rollups_match_sales(self, merge_dir)
+
+    def test_incomplete_or_inconsistent_shards_refused(self):
+        nodes = self.generate_nodes(3, NUM_SALES_RECORDS=900)
+        other_run = self.generate_nodes(2, NUM_SALES_RECORDS=900)
+
+        def refused(directory, message):
+            with self.assertRaises(RuntimeError) as raised:
+                self.merge(directory)
+            self.assertIn(message, str(raised.exception))
+            self.assertFalse(os.path.exists(os.path.join(directory, "sales_data_O1.csv")))
+
+        refused(self.collect(nodes[:2]), "missing shards [2]")
+        merge_dir = self.collect(nodes)
+        with open(os.path.join(merge_dir, "sales_data_O1.part-00001.csv"), "r+b") as f:
+            f.seek(100)
+            f.write(b"9")
+        refused(merge_dir, "sales_data_O1.part-00001.csv does not match its manifest")
+        merge_dir = self.collect(nodes)
+        with open(os.path.join(merge_dir, "stores_O1.csv"), "ab") as f:
+            f.write(b"Extra Store,Rome,Lazio,Italy,Europe\r\n")
+        refused(merge_dir, "dimension file stores_O1.csv differs")
+        # Shard 1 of a two-shard run overlaps shard 2 of the three-shard run
+        merge_dir = self.collect(nodes[:2])
+        for name in ["sales_data_O1.part-00001.csv", "sales_data_O1.part-00001.manifest.json"]:
+            shutil.copy(os.path.join(other_run[1], name), merge_dir)
+        refused(merge_dir, "different shard_count")
+        merge_dir = self.collect(nodes)
+        manifest_file = os.path.join(merge_dir, "sales_data_O1.part-00002.manifest.json")
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        manifest.update(first_row=500, rows=400)
+        with open(manifest_file, "w") as f:
+            json.dump(manifest, f)
+        refused(merge_dir, "overlap the previous shard")
+
+
+class TestSortedOutput(unittest.TestCase):
+    def read_lines(self, path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            return f.read().split(b"\r\n")
+
+    def assert_sorted_copy(self, sorted_lines, lines):
+        self.assertEqual(sorted_lines[0], lines[0])
+        self.assertEqual(sorted(sorted_lines), sorted(lines))
+        times = [line[:19] for line in sorted_lines[1:] if line]
+        self.assertEqual(times, sorted(times))
+
+    def test_external_sorter_is_stable(self):
+        from external_sort import ExternalSorter, sales_time_key
+        rng = random.Random(5)
+        lines = [f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d},{rng.randint(0, 23):02d}:00:00,{i}\r\n"
+                 for i in range(5000)]
+        spill_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_dir.cleanup)
+        with ExternalSorter(run_bytes=20000, temp_dir=spill_dir.name, merge_width=3) as sorter:
+            text = "".join(lines)
+            sorter.write(text[:1001])  # cut in the middle of a line
+            sorter.write(text[1001:])
+            self.assertGreater(len(sorter.runs), 9)  # more runs than one merge takes
+            out = io.StringIO()
+            self.assertEqual(sorter.merge(out), 5000)
+        self.assertEqual(out.getvalue(), "".join(sorted(lines, key=sales_time_key)))
+        self.assertEqual(os.listdir(spill_dir.name), [])
+
+    def test_sales_file_is_time_ordered(self):
+        spill_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(spill_dir.cleanup)
+        unsorted = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000)
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, SORTED_OUTPUT=True, SORT_RUN_BYTES=30000,
+                                  SORT_TEMP_DIR=spill_dir.name)
+        self.assert_sorted_copy(self.read_lines(os.path.join(out, "sales_data_O1.csv")),
+                                self.read_lines(os.path.join(unsorted, "sales_data_O1.csv")))
+        self.assertEqual(os.listdir(spill_dir.name), [])
+
+    def test_sorted_shards_are_merged(self):
+        settings = dict(NUM_SALES_RECORDS=4000, COUNTER_RNG=True, COMPRESSION="gzip", SORT_RUN_BYTES=30000)
+        unsorted = run_main_in_tempdir(self, **settings)
+        single = run_main_in_tempdir(self, SORTED_OUTPUT=True, **settings)
+        sharded = run_main_in_tempdir(self, SORTED_OUTPUT=True, NUM_SHARDS=3, **settings)
+        lines = self.read_lines(os.path.join(single, "sales_data_O1.csv.gz"))
+        self.assert_sorted_copy(lines, self.read_lines(os.path.join(unsorted, "sales_data_O1.csv.gz")))
+        self.assertEqual(self.read_lines(os.path.join(sharded, "sales_data_O1.csv.gz")), lines)
+
+    def test_needs_csv(self):
+        with self.assertRaises(RuntimeError):
+            run_main_in_tempdir(self, NUM_SALES_RECORDS=100, SORTED_OUTPUT=True, OUTPUT_FORMAT="binary")
+
+
+@unittest.skipIf(pq is None, "pyarrow not installed")
+class TestParquetOutput(unittest.TestCase):
+    def check_sales(self, out, expected_rows):
+        for name in ["categories_O1", "products_O1", "stores_O1", "sales_data_O1"]:
+            self.assertTrue(os.path.exists(os.path.join(out, name + ".parquet")))
+        sales = pq.ParquetFile(os.path.join(out, "sales_data_O1.parquet"))
+        self.assertEqual(sales.metadata.num_rows, expected_rows)
+        self.assertGreater(sales.num_row_groups, 1)
+        self.assertEqual(sales.schema_arrow.names, ["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"])
+        self.assertEqual(str(sales.schema_arrow.field("store_name").type), "dictionary<values=string, indices=int32, ordered=0>")
+        rows = sales.read().to_pylist()
+        for row in rows[:500]:
+            self.assertAlmostEqual(row["revenue"], row["unit_price"] * row["quantity"], places=2)
+        stores = pq.read_table(os.path.join(out, "stores_O1.parquet"))
+        self.assertEqual(stores.num_rows, 45)
+
+    def test_row_by_row(self):
+        out = run_main_in_tempdir(self, OUTPUT_FORMAT="parquet", NUM_SALES_RECORDS=3000, PARQUET_ROW_GROUP_SIZE=1000)
+        self.check_sales(out, 3000)
+
+    def test_vectorized(self):
+        out = run_main_in_tempdir(self, OUTPUT_FORMAT="parquet", VECTORIZED=True, NUM_SALES_RECORDS=3000, VECTOR_BLOCK_SIZE=1000)
+        self.check_sales(out, 3000)
+
+
+class TestCompressedOutput(unittest.TestCase):
+    def test_compressed_matches_plain(self):
+        plain_dir = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000)
+        with open(os.path.join(plain_dir, "sales_data_O1.csv"), "rb") as f:
+            plain = f.read()
+        for compression, opener, suffix in [("gzip", gzip.open, ".gz"), ("bz2", bz2.open, ".bz2")]:
+            out = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000, COMPRESSION=compression)
+            path = os.path.join(out, "sales_data_O1.csv" + suffix)
+            self.assertFalse(os.path.exists(os.path.join(out, "sales_data_O1.csv")))
+            with opener(path, "rb") as f:
+                self.assertEqual(f.read(), plain)
+
+    def test_small_blocks_concatenate(self):
+        # Many independent gzip members must read back as one stream
+        from parallel_compress import open_sales_output
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "sales.csv")
+        text = "".join(f"row {i},value {i * i}\r\n" for i in range(20000))
+        with contextlib.redirect_stdout(io.StringIO()):
+            with open_sales_output(path, "gzip", block_size=4096, workers=3) as f:
+                f.write(text)
+        with gzip.open(path + ".gz", "rt", newline="") as f:
+            self.assertEqual(f.read(), text)
+
+
+class TestPipelinedMode(unittest.TestCase):
+    def read_sales(self, out):
+        with open(os.path.join(out, "sales_data_O1.csv"), "rb") as f:
+            return f.read()
+
+    def test_same_bytes_as_direct_writes(self):
+        settings = dict(NUM_SALES_RECORDS=5000, PIPELINE_BATCH_ROWS=333, PIPELINE_QUEUE_BATCHES=2)
+        direct = self.read_sales(run_main_in_tempdir(self, **settings))
+        pipelined = self.read_sales(run_main_in_tempdir(self, PIPELINED=True, FSYNC_INTERVAL=0.0, **settings))
+        self.assertEqual(pipelined, direct)
+
+    def test_vectorized_blocks(self):
+        settings = dict(NUM_SALES_RECORDS=5000, VECTORIZED=True, VECTOR_BLOCK_SIZE=1200)
+        direct = self.read_sales(run_main_in_tempdir(self, **settings))
+        pipelined = self.read_sales(run_main_in_tempdir(self, PIPELINED=True, PIPELINE_QUEUE_BATCHES=1, **settings))
+        self.assertEqual(pipelined, direct)
+
+    def test_writer_error_reaches_producer(self):
+        from write_pipeline import BackgroundWriter
+
+        def consume(batch):
+            raise OSError("disk full")
+
+        pipe = BackgroundWriter(consume, max_pending=1)
+        with self.assertRaises(OSError):
+            for _ in range(100):
+                pipe.put([1, 2, 3])
+            pipe.close()
+
+
+class SimulatedCrash(Exception):
+    pass
+
+
+class TestCheckpointResume(unittest.TestCase):
+    def setUp(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        self.module = DataGenerator_o1
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(tmp.name)
+
+    def run_main(self, settings, resume=False, crash_after=None):
+        # Run main() with `settings`; with crash_after, die right after that many checkpoints
+        originals = {name: getattr(self.module, name) for name in settings}
+        original_checkpoint = self.module.CsvSalesWriter.checkpoint
+        written = []
+
+        def crashing_checkpoint(writer, state):
+            original_checkpoint(writer, state)
+            written.append(state["rows"])
+            if len(written) == crash_after:
+                raise SimulatedCrash()
+
+        try:
+            for name, value in settings.items():
+                setattr(self.module, name, value)
+            if crash_after:
+                self.module.CsvSalesWriter.checkpoint = crashing_checkpoint
+            with contextlib.redirect_stdout(io.StringIO()):
+                self.module.main(resume=resume)
+        finally:
+            self.module.CsvSalesWriter.checkpoint = original_checkpoint
+            for name, value in originals.items():
+                setattr(self.module, name, value)
+
+    def check_resume(self, sales_file, **settings):
+        settings = dict(NUM_SALES_RECORDS=5000, CHECKPOINT_INTERVAL=1000, **settings)
+        self.run_main(settings)
+        with open(sales_file, "rb") as f:
+            expected = f.read()
+        self.assertFalse(os.path.exists(sales_file + ".checkpoint"))
+        os.remove(sales_file)
+
+        with self.assertRaises(SimulatedCrash):
+            self.run_main(settings, crash_after=2)
+        self.assertTrue(os.path.exists(sales_file + ".checkpoint"))
+        with open(sales_file, "ab") as f:
+            f.write(b"2024-03-0")  # half-written row past the checkpoint
+        self.run_main(settings, resume=True)
+        with open(sales_file, "rb") as f:
+            self.assertEqual(f.read(), expected)
+        self.assertFalse(os.path.exists(sales_file + ".checkpoint"))
+
+    def test_row_by_row(self):
+        self.check_resume("sales_data_O1.csv")
+
+    def test_vectorized(self):
+        self.check_resume("sales_data_O1.csv", VECTORIZED=True, VECTOR_BLOCK_SIZE=700)
+
+    def test_pipelined_gzip(self):
+        self.check_resume("sales_data_O1.csv.gz", PIPELINED=True, PIPELINE_BATCH_ROWS=300, COMPRESSION="gzip")
+
+    def test_rollups_survive_resume(self):
+        self.check_resume("sales_data_O1.csv", ROLLUPS=True)
+        assert_rollups_match_sales(self)
+
+    def test_rollups_survive_pipelined_resume(self):
+        # Checkpoints are written by the writer thread while the producer carries on
+        self.check_resume("sales_data_O1.csv", ROLLUPS=True, PIPELINED=True, PIPELINE_BATCH_ROWS=300)
+        assert_rollups_match_sales(self)
+
+    def test_summary_stats_survive_pipelined_resume(self):
+        self.check_resume("sales_data_O1.csv", SUMMARY_STATS=True, PIPELINED=True, PIPELINE_BATCH_ROWS=300)
+        TestSummaryStats.assert_stats_match_sales(self)
+
+    def test_zipf_popularity_resume(self):
+        self.check_resume("sales_data_O1.csv", POPULARITY_MODEL="zipf")
+
+    def test_counter_rng(self):
+        self.check_resume("sales_data_O1.csv", COUNTER_RNG=True, VECTOR_BLOCK_SIZE=700)
+
+    def test_summary_stats_survive_resume(self):
+        self.check_resume("sales_data_O1.csv", SUMMARY_STATS=True, VECTORIZED=True, VECTOR_BLOCK_SIZE=700)
+        TestSummaryStats.assert_stats_match_sales(self)
+
+    def test_changed_settings_refused(self):
+        settings = dict(NUM_SALES_RECORDS=5000, CHECKPOINT_INTERVAL=1000)
+        with self.assertRaises(SimulatedCrash):
+            self.run_main(settings, crash_after=1)
+        with self.assertRaises(RuntimeError):
+            self.run_main(dict(settings, NUM_SALES_RECORDS=6000), resume=True)
+
+
+class TestIncrementalMode(unittest.TestCase):
+    def setUp(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        self.module = DataGenerator_o1
+        self.out = run_main_in_tempdir(self, NUM_SALES_RECORDS=3660)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(self.out)
+        self.addCleanup(setattr, DataGenerator_o1, "NUM_SALES_RECORDS", DataGenerator_o1.NUM_SALES_RECORDS)
+        DataGenerator_o1.NUM_SALES_RECORDS = 3660
+
+    def test_dimensions_round_trip(self):
+        cat_map, products, stores, popularity = self.module.load_dimensions()
+        self.assertEqual((cat_map, products), self.module.expand_products_and_categories())
+        self.assertEqual(len(stores), 45)
+        self.assertEqual(sorted(popularity), [p[0] for p in products])
+
+    def test_append_then_partition(self):
+        with open("sales_data_O1.csv", "rb") as f:
+            before = f.read()
+        start, end = datetime(2025, 1, 1).date(), datetime(2025, 1, 3).date()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.module.generate_incremental(start, end)
+        with open("sales_data_O1.csv", "rb") as f:
+            after = f.read()
+        self.assertTrue(after.startswith(before))
+        new_rows = list(csv.reader(io.StringIO(after[len(before):].decode("utf-8"), newline="")))
+        self.assertEqual(len(new_rows), 30)  # 3660 a year -> 10 a day
+        self.assertTrue(all("2025-01-01" <= row[0] <= "2025-01-03" for row in new_rows))
+
+        # Same range again as a partition: same rows, own header
+        with contextlib.redirect_stdout(io.StringIO()):
+            path = self.module.generate_incremental(start, end, output="partition")
+        self.assertEqual(path, "sales_data_O1.20250101-20250103.csv")
+        with open(path, "rb") as f:
+            partition = f.read()
+        self.assertEqual(partition, before.split(b"\r\n", 1)[0] + b"\r\n" + after[len(before):])
+
+
+class TestPartitionedOutput(unittest.TestCase):
+    def read_partitions(self, root):
+        with open(os.path.join(root, "_manifest.json")) as f:
+            manifest = json.load(f)
+        rows = []
+        for entry in manifest["partitions"]:
+            self.assertEqual(entry["files"], ["part-00000.csv"])
+            path = os.path.join(root, entry["path"], "part-00000.csv")
+            self.assertEqual(os.path.getsize(path), entry["bytes"])
+            with open(path, newline="", encoding="utf-8") as f:
+                part = list(csv.reader(f))
+            self.assertEqual(part[0][0], "date")  # one header per file, even after reopening
+            self.assertEqual(len(part) - 1, entry["rows"])
+            self.assertTrue(all(row[0] == entry["date"] for row in part[1:]))
+            rows.extend(part[1:])
+        self.assertEqual(manifest["total_rows"], len(rows))
+        return manifest, rows
+
+    def test_same_rows_as_single_file(self):
+        single = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000)
+        with open(os.path.join(single, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            expected = list(csv.reader(f))[1:]
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, PARTITIONED=True,
+                                  MAX_OPEN_PARTITIONS=3, PARTITION_BUFFER_ROWS=500)
+        manifest, rows = self.read_partitions(os.path.join(out, "sales_data_O1"))
+        self.assertEqual(sorted(rows), sorted(expected))
+        self.assertEqual(manifest["partitions"][0]["path"], "year=2024/month=01/day=01")
+
+    def test_incremental_adds_partitions(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        settings = dict(NUM_SALES_RECORDS=3660, PARTITIONED=True, VECTORIZED=True, VECTOR_BLOCK_SIZE=1000)
+        out = run_main_in_tempdir(self, **settings)
+        originals = {name: getattr(DataGenerator_o1, name) for name in settings}
+        self.addCleanup(lambda: [setattr(DataGenerator_o1, k, v) for k, v in originals.items()])
+        for name, value in settings.items():
+            setattr(DataGenerator_o1, name, value)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(out)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_o1.generate_incremental(datetime(2025, 1, 1).date(), datetime(2025, 1, 2).date())
+        manifest, rows = self.read_partitions("sales_data_O1")
+        self.assertEqual(len(manifest["partitions"]), 368)
+        self.assertEqual(manifest["partitions"][-1]["path"], "year=2025/month=01/day=02")
+        self.assertEqual(manifest["total_rows"], 3680)
+
+    @unittest.skipIf(pq is None, "pyarrow not installed")
+    def test_parquet_one_part_per_partition(self):
+        for settings in ({}, {"VECTORIZED": True, "VECTOR_BLOCK_SIZE": 1000}):
+            with self.subTest(**settings):
+                single = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, OUTPUT_FORMAT="parquet", **settings)
+                expected = pq.read_table(os.path.join(single, "sales_data_O1.parquet")).to_pylist()
+                # Far more partitions than open files: every partition is still written once
+                out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, OUTPUT_FORMAT="parquet", PARTITIONED=True,
+                                          MAX_OPEN_PARTITIONS=3, PARTITION_BUFFER_ROWS=500, **settings)
+                root = os.path.join(out, "sales_data_O1")
+                with open(os.path.join(root, "_manifest.json")) as f:
+                    manifest = json.load(f)
+                self.assertEqual(sorted(os.listdir(root)), ["_manifest.json", "year=2024"])
+                rows = []
+                for entry in manifest["partitions"]:
+                    self.assertEqual(entry["files"], ["part-00000.parquet"])
+                    part = pq.read_table(os.path.join(root, entry["path"], "part-00000.parquet")).to_pylist()
+                    self.assertEqual(len(part), entry["rows"])
+                    rows.extend(part)
+                self.assertEqual(sorted(map(repr, rows)), sorted(map(repr, expected)))
+
+
+class TestStarSchema(unittest.TestCase):
+    def read_csv(self, out, name):
+        with open(os.path.join(out, name + ".csv"), newline="", encoding="utf-8") as f:
+            return list(csv.reader(f))
+
+    def check_star(self, **settings):
+        named = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000, **settings)
+        star = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000, STAR_SCHEMA=True, **settings)
+        sales = self.read_csv(star, "sales_data_O1")
+        self.assertEqual(sales[0], ["date", "time", "product_id", "unit_price", "quantity", "revenue", "store_id", "campaign_id"])
+        stores = self.read_csv(star, "stores_O1")
+        self.assertEqual(stores[0][0], "store_id")
+        campaigns = self.read_csv(star, "campaigns_O1")
+        self.assertEqual(campaigns[0], ["campaign_id", "campaign_name"])
+
+        # Joining the ids back to the dimensions gives the rows of a run with names
+        products = {row[0]: row[1] for row in self.read_csv(star, "products_O1")[1:]}
+        store_names = {row[0]: row[1] for row in stores[1:]}
+        campaign_names = {row[0]: row[1] for row in campaigns[1:]}
+        campaign_names[""] = ""
+        joined = [row[:2] + [products[row[2]]] + row[3:6] + [store_names[row[6]], campaign_names[row[7]]]
+                  for row in sales[1:]]
+        self.assertEqual(joined, self.read_csv(named, "sales_data_O1")[1:])
+        self.assertLess(os.path.getsize(os.path.join(star, "sales_data_O1.csv")),
+                        os.path.getsize(os.path.join(named, "sales_data_O1.csv")))
+
+    def test_row_by_row(self):
+        self.check_star()
+
+    def test_vectorized(self):
+        self.check_star(VECTORIZED=True, VECTOR_BLOCK_SIZE=1000)
+
+    @unittest.skipIf(pq is None, "pyarrow not installed")
+    def test_parquet_ids(self):
+        out = run_main_in_tempdir(self, OUTPUT_FORMAT="parquet", STAR_SCHEMA=True, NUM_SALES_RECORDS=2000)
+        sales = pq.read_table(os.path.join(out, "sales_data_O1.parquet"))
+        self.assertEqual(str(sales.schema.field("store_id").type), "int32")
+        store_ids = set(pq.read_table(os.path.join(out, "stores_O1.parquet")).column("store_id").to_pylist())
+        self.assertLessEqual(set(sales.column("store_id").to_pylist()), store_ids)
+        campaign_ids = set(sales.column("campaign_id").to_pylist())
+        self.assertIn(None, campaign_ids)
+        campaign_rows = pq.read_table(os.path.join(out, "campaigns_O1.parquet")).column("campaign_id").to_pylist()
+        self.assertEqual(campaign_ids - {None}, set(campaign_rows))
+
+
+class TestBinaryOutput(unittest.TestCase):
+    def expected_records(self, out):
+        # Star-schema CSV rows in the binary record layout
+        epoch = datetime(1970, 1, 1)
+        with open(os.path.join(out, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            rows = list(csv.reader(f))[1:]
+        records = []
+        for day, time, product_id, price, quantity, revenue, store_id, campaign_id in rows:
+            h, m, sec = map(int, time.split(":"))
+            records.append(((datetime.strptime(day, "%Y-%m-%d") - epoch).days, h * 3600 + m * 60 + sec,
+                            int(product_id), int(store_id), int(quantity), round(float(price) * 100),
+                            int(campaign_id or 0)))
+        return records
+
+    def check_binary(self, **settings):
+        from sales_binary import SalesBinaryFile
+        star = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000, STAR_SCHEMA=True, **settings)
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000, OUTPUT_FORMAT="binary", **settings)
+        for name in ["categories_O1", "products_O1", "stores_O1", "campaigns_O1"]:
+            with open(os.path.join(out, name + ".csv"), "rb") as f, open(os.path.join(star, name + ".csv"), "rb") as g:
+                self.assertEqual(f.read(), g.read())
+        expected = self.expected_records(star)
+        with SalesBinaryFile(os.path.join(out, "sales_data_O1.bin")) as sales:
+            self.assertEqual(len(sales), 3000)
+            self.assertEqual(list(sales), expected)
+            self.assertEqual(sales[1234], expected[1234])
+            self.assertEqual(sales[-1], expected[-1])
+            view = sales.view()
+            self.assertEqual(view[1234, 2], expected[1234][2])
+            prices = sales.column("price_cents")
+            self.assertEqual(prices.tolist(), [record[5] for record in expected])
+            self.assertFalse(prices.flags.owndata)  # a view into the mapping, not a copy
+            del view, prices
+
+    def test_row_by_row(self):
+        self.check_binary()
+
+    def test_vectorized(self):
+        self.check_binary(VECTORIZED=True, VECTOR_BLOCK_SIZE=1000)
+
+    def test_shards_and_pipeline(self):
+        self.check_binary(NUM_SHARDS=3)
+        self.check_binary(PIPELINED=True, PIPELINE_BATCH_ROWS=700)
+
+    def test_incremental_append(self):
+        from sales_binary import SalesBinaryFile
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=2000, OUTPUT_FORMAT="binary")
+        self.addCleanup(setattr, DataGenerator_o1, "OUTPUT_FORMAT", DataGenerator_o1.OUTPUT_FORMAT)
+        DataGenerator_o1.OUTPUT_FORMAT = "binary"
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(out)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_o1.generate_incremental(datetime(2025, 1, 1).date(), datetime(2025, 1, 1).date(),
+                                                  num_records=50)
+        with SalesBinaryFile("sales_data_O1.bin") as sales:
+            self.assertEqual(len(sales), 2050)
+            self.assertEqual(sales[-1][0], (datetime(2025, 1, 1) - datetime(1970, 1, 1)).days)
+
+    def test_not_a_sales_file(self):
+        from sales_binary import SalesBinaryFile
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, "sales.csv")
+        with open(path, "w") as f:
+            f.write("date,time,product_name,unit_price,quantity,revenue,store_name,campaign\r\n")
+        with self.assertRaises(ValueError):
+            SalesBinaryFile(path)
+
+
+class TestSQLiteOutput(unittest.TestCase):
+    def check_sqlite(self, **settings):
+        import sqlite3
+        plain = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000, **settings)
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=3000, OUTPUT_FORMAT="sqlite", **settings)
+        conn = sqlite3.connect(os.path.join(out, "data_O1.sqlite"))
+        self.addCleanup(conn.close)
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        self.assertEqual(tables, {"categories", "products", "stores", "product_popularity", "sales"})
+        indexes = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        self.assertEqual(indexes, {"idx_sales_date", "idx_sales_product_name", "idx_sales_store_name"})
+
+        # Same rows as the CSV file, with "no campaign" as NULL
+        with open(os.path.join(plain, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            expected = [row[:3] + [float(row[3]), int(row[4]), float(row[5]), row[6], row[7] or None]
+                        for row in list(csv.reader(f))[1:]]
+        rows = [list(row) for row in conn.execute("SELECT * FROM sales ORDER BY rowid")]
+        self.assertEqual(rows, expected)
+        with open(os.path.join(plain, "stores_O1.csv"), newline="", encoding="utf-8") as f:
+            self.assertEqual([list(row) for row in conn.execute("SELECT * FROM stores")], list(csv.reader(f))[1:])
+
+    def test_row_by_row(self):
+        self.check_sqlite()
+
+    def test_vectorized_pipelined(self):
+        self.check_sqlite(VECTORIZED=True, VECTOR_BLOCK_SIZE=1000, PIPELINED=True)
+
+    def test_incremental_append(self):
+        import sqlite3
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=2000, OUTPUT_FORMAT="sqlite", STAR_SCHEMA=True)
+        for name, value in [("OUTPUT_FORMAT", "sqlite"), ("STAR_SCHEMA", True)]:
+            self.addCleanup(setattr, DataGenerator_o1, name, getattr(DataGenerator_o1, name))
+            setattr(DataGenerator_o1, name, value)
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(out)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_o1.generate_incremental(datetime(2025, 1, 1).date(), datetime(2025, 1, 1).date(),
+                                                  num_records=50)
+        conn = sqlite3.connect("data_O1.sqlite")
+        self.addCleanup(conn.close)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0], 2050)
+        # Star-schema ids join back to the dimension tables
+        unmatched = conn.execute("SELECT COUNT(*) FROM sales LEFT JOIN stores USING (store_id) "
+                                 "WHERE stores.store_name IS NULL").fetchone()[0]
+        self.assertEqual(unmatched, 0)
+
+    def test_needs_single_process(self):
+        with self.assertRaises(RuntimeError):
+            run_main_in_tempdir(self, NUM_SALES_RECORDS=100, OUTPUT_FORMAT="sqlite", NUM_SHARDS=2)
+
+
+class TestRollups(unittest.TestCase):
+    def test_row_by_row(self):
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, ROLLUPS=True)
+        assert_rollups_match_sales(self, out)
+        with open(os.path.join(out, "rollup_campaign_O1.csv"), newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0][-2:], ["revenue_per_sale", "uplift"])
+        self.assertEqual(rows[1][:2], ["0", ""])
+        self.assertEqual(rows[1][-1], "0.0000")
+
+    def test_vectorized(self):
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, ROLLUPS=True, VECTORIZED=True, VECTOR_BLOCK_SIZE=900)
+        assert_rollups_match_sales(self, out)
+
+    def test_shards_and_pipeline(self):
+        assert_rollups_match_sales(self, run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, ROLLUPS=True, NUM_SHARDS=3))
+        assert_rollups_match_sales(self, run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, ROLLUPS=True, PIPELINED=True,
+                                                             PIPELINE_BATCH_ROWS=500))
+
+    def test_large_grid_keeps_only_cells_with_sales(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        import numpy as np
+        rollup = DataGenerator_o1.Rollup()
+        rollup.add_many(np.array([7 * 10 ** 9, 3, 7 * 10 ** 9]), np.array([1, 2, 3]), np.array([100, 250, 5]))
+        rollup.add(3, 4, 1)
+        other = DataGenerator_o1.Rollup()
+        other.load_state(json.loads(json.dumps(rollup.state())))
+        rollup.merge(other)
+        self.assertEqual(rollup.cells(), [(3, 4, 12, 502), (7 * 10 ** 9, 4, 8, 210)])
+        # 20k stores x 366 days, a few thousand of them with sales
+        assert_rollups_match_sales(self, run_main_in_tempdir(
+            self, NUM_SALES_RECORDS=3000, ROLLUPS=True, SCALED_DIMENSIONS=True, NUM_STORES=20000,
+            NUM_PRODUCTS=1000, VECTORIZED=True, VECTOR_BLOCK_SIZE=700))
+
+    def test_incremental_adds_up(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, ROLLUPS=True)
+        self.addCleanup(setattr, DataGenerator_o1, "ROLLUPS", DataGenerator_o1.ROLLUPS)
+        DataGenerator_o1.ROLLUPS = True
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(out)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_o1.generate_incremental(datetime(2024, 12, 30).date(), datetime(2025, 1, 2).date(),
+                                                  num_records=300)
+        assert_rollups_match_sales(self)
+
+
+class TestSummaryStats(unittest.TestCase):
+    def assert_stats_match_sales(self, directory="."):
+        # Moments exact, quantiles within 3% of rank, distinct counts and top products as counted in the sales
+        with open(os.path.join(directory, "summary_stats_O1.json")) as f:
+            report = json.load(f)
+        with open(os.path.join(directory, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            sales = list(csv.reader(f))[1:]
+        self.assertEqual(report["rows"], len(sales))
+        for name, column in [("unit_price", 3), ("quantity", 4), ("revenue", 5)]:
+            values = sorted(float(row[column]) for row in sales)
+            stats = report["columns"][name]
+            self.assertEqual(stats["count"], len(values))
+            self.assertAlmostEqual(stats["mean"], statistics.fmean(values), places=6)
+            self.assertAlmostEqual(stats["variance"] / statistics.variance(values), 1.0, places=9)
+            self.assertEqual((stats["min"], stats["max"]), (values[0], values[-1]))
+            for label, value in stats["quantiles"].items():
+                rank = bisect.bisect_left(values, value) / len(values)
+                high = bisect.bisect_right(values, value) / len(values)
+                fraction = int(label[1:]) / 100
+                self.assertTrue(rank - 0.03 <= fraction <= high + 0.03, (name, label, value, rank, high))
+        for name, column in [("product", 2), ("store", 6)]:
+            counts = Counter(row[column] for row in sales)
+            self.assertEqual(report["distinct"][name], len(counts))
+            for item in report["top"][name]:
+                self.assertEqual(item["count"], counts[item["value"]])
+            self.assertEqual([item["count"] for item in report["top"][name]],
+                             sorted(counts.values(), reverse=True)[:len(report["top"][name])])
+
+    def test_row_by_row(self):
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, SUMMARY_STATS=True)
+        self.assert_stats_match_sales(out)
+
+    def test_vectorized_with_rollups(self):
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, SUMMARY_STATS=True, ROLLUPS=True,
+                                  VECTORIZED=True, VECTOR_BLOCK_SIZE=900)
+        self.assert_stats_match_sales(out)
+        assert_rollups_match_sales(self, out)
+
+    def test_shards_are_merged(self):
+        self.assert_stats_match_sales(run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, SUMMARY_STATS=True,
+                                                          NUM_SHARDS=3))
+
+    def test_incremental_merges_report(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        out = run_main_in_tempdir(self, NUM_SALES_RECORDS=4000, SUMMARY_STATS=True)
+        self.addCleanup(setattr, DataGenerator_o1, "SUMMARY_STATS", DataGenerator_o1.SUMMARY_STATS)
+        DataGenerator_o1.SUMMARY_STATS = True
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(out)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_o1.generate_incremental(datetime(2024, 12, 30).date(), datetime(2025, 1, 2).date(),
+                                                  num_records=300)
+        self.assert_stats_match_sales()
+
+    def test_memory_does_not_grow_with_rows(self):
+        from stream_stats import SalesStats
+        rng = random.Random(5)
+        stats = SalesStats(batch_rows=1000)
+        sizes = []
+        for batch in range(200):
+            for _ in range(1000):
+                price = round(rng.lognormvariate(3, 1), 2)
+                quantity = rng.randint(1, 9)
+                stats.add(price, quantity, price * quantity, f"P{rng.randrange(5000)}", f"S{rng.randrange(300)}")
+            if batch in (19, 199):
+                sizes.append(len(json.dumps(stats.state())))
+        # 10x the rows, a few more KLL compactors at most
+        self.assertLess(sizes[1], sizes[0] * 1.2)
+        report = stats.report()
+        self.assertEqual(report["rows"], 200000)
+        self.assertAlmostEqual(report["distinct"]["product"] / 5000, 1.0, delta=0.03)
+        self.assertAlmostEqual(report["distinct"]["store"], 300, delta=3)
+        median = report["columns"]["unit_price"]["quantiles"]["p50"]
+        self.assertAlmostEqual(median / math.exp(3), 1.0, delta=0.05)
+
+    def test_merge_and_state_round_trip(self):
+        from stream_stats import SalesStats
+        rows = [(float(i % 97), i % 7 + 1, float(i % 97) * (i % 7 + 1), f"P{i % 13}", f"S{i % 5}")
+                for i in range(6000)]
+        whole, parts = SalesStats(), [SalesStats(), SalesStats()]
+        for i, row in enumerate(rows):
+            whole.add(*row)
+            parts[i % 2].add(*row)
+        restored = SalesStats()
+        restored.load_state(json.loads(json.dumps(parts[0].state())))
+        restored.merge(parts[1])
+        merged, expected = restored.report(), whole.report()
+        self.assertEqual(merged["rows"], expected["rows"])
+        self.assertEqual(merged["distinct"], expected["distinct"])
+        self.assertEqual(merged["top"], expected["top"])
+        for name in ("unit_price", "quantity", "revenue"):
+            self.assertAlmostEqual(merged["columns"][name]["mean"], expected["columns"][name]["mean"])
+            self.assertAlmostEqual(merged["columns"][name]["variance"], expected["columns"][name]["variance"])
+
+
+class TestScaledDimensions(unittest.TestCase):
+    def test_id_permutation_is_a_bijection(self):
+        from scaled_dimensions import IdPermutation, code, id_space
+        for size in (1, 10, 1000, 34 ** 3):
+            permutation = IdPermutation(size, random.Random(size))
+            numbers = [permutation(i) for i in range(size)]
+            self.assertEqual(sorted(numbers), list(range(size)))
+            self.assertEqual([permutation.inverse(n) for n in numbers], list(range(size)))
+        self.assertEqual(id_space(45), (1000, 3))
+        self.assertEqual(code(34 ** 5 - 1, 5), "ZZZZZ")
+        self.assertEqual(code(35, 4), "0011")
+
+    def test_names_are_unique(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        random.seed(3)
+        stores = DataGenerator_o1.generate_stores_scaled(20000)
+        self.assertEqual(len({store[0] for store in stores}), 20000)
+        self.assertTrue(all(store[3] in DataGenerator_o1.COUNTRIES_GDP for store in stores))
+        cat_map, products = DataGenerator_o1.generate_products_scaled(50000)
+        self.assertEqual(len({product[1] for product in products}), 50000)
+        self.assertEqual([product[0] for product in products], list(range(1, 50001)))
+        self.assertEqual({product[2] for product in products}, set(cat_map))
+        self.assertTrue(all(1 <= product[3] <= product[4] for product in products))
+
+    def test_sales_use_the_scaled_dimensions(self):
+        out = run_main_in_tempdir(self, SCALED_DIMENSIONS=True, NUM_STORES=3000, NUM_PRODUCTS=8000,
+                                  NUM_SALES_RECORDS=3000, VECTORIZED=True)
+        with open(os.path.join(out, "stores_O1.csv"), newline="", encoding="utf-8") as f:
+            stores = {row[0] for row in list(csv.reader(f))[1:]}
+        with open(os.path.join(out, "products_O1.csv"), newline="", encoding="utf-8") as f:
+            products = {row[1] for row in list(csv.reader(f))[1:]}
+        with open(os.path.join(out, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            sales = list(csv.reader(f))[1:]
+        self.assertEqual((len(stores), len(products)), (3000, 8000))
+        self.assertTrue(all(sale[2] in products and sale[6] in stores for sale in sales))
+        self.assertGreater(len({sale[2] for sale in sales}), 1000)
+
+
+class TestZipfPopularity(unittest.TestCase):
+    def assert_frequencies(self, counts, expected, draws):
+        # Chi-square per degree of freedom well below what a wrong distribution gives
+        chi2 = sum((counts[i] - draws * p) ** 2 / (draws * p) for i, p in expected.items())
+        self.assertLess(chi2 / max(1, len(expected) - 1), 2.0)
+
+    def test_ranks_follow_zipf(self):
+        from popularity import ZipfSampler
+        import numpy as np
+        for n, exponent in [(30, 1.2), (200, 0.8), (10, 1.0)]:
+            sampler = ZipfSampler(n, exponent)
+            weights = [r ** -exponent for r in range(1, n + 1)]
+            self.assertAlmostEqual(sampler.total_weight(), math.fsum(weights), places=9)
+            expected = {r: w / math.fsum(weights) for r, w in enumerate(weights, start=1)}
+            rng = random.Random(n)
+            self.assert_frequencies(Counter(sampler.sample(rng) for _ in range(60000)), expected, 60000)
+            ranks = sampler.sample_many(np.random.default_rng(n), 60000)
+            self.assert_frequencies(Counter(ranks.tolist()), expected, 60000)
+
+    def test_constant_memory_for_huge_catalogues(self):
+        from popularity import ZipfSampler
+        sampler = ZipfSampler(10 ** 7, 1.1)
+        # Only a handful of floats, whatever the number of ranks
+        self.assertTrue(all(isinstance(value, (int, float)) for value in vars(sampler).values()))
+        rng = random.Random(1)
+        ranks = [sampler.sample(rng) for _ in range(50000)]
+        self.assertTrue(all(1 <= r <= 10 ** 7 for r in ranks))
+        self.assertAlmostEqual(ranks.count(1) / 50000, 1 / sampler.total_weight(), delta=0.01)
+
+    def test_top_sellers_are_boosted(self):
+        from popularity import ZipfPopularity
+        categories = [i % 4 for i in range(400)]
+        popularity = ZipfPopularity(categories, 1.0, boost=4.0, top_sellers=2, rng=random.Random(2))
+        self.assertEqual(sorted(categories[i] for i in popularity.top_items), [0, 0, 1, 1, 2, 2, 3, 3])
+        weights = {}
+        for item in range(400):
+            weight = popularity.zipf.weight(popularity.ranks.inverse(item) + 1)
+            weights[item] = weight * 4.0 if item in popularity.top_items else weight
+        total = math.fsum(weights.values())
+        expected = {item: w / total for item, w in weights.items() if w / total > 0.002}
+        rng = random.Random(3)
+        counts = Counter(popularity.sample(rng) for _ in range(100000))
+        self.assert_frequencies(counts, expected, 100000)
+        restored = ZipfPopularity.from_state(json.loads(json.dumps(popularity.state())), categories)
+        self.assertEqual(restored.top_items, popularity.top_items)
+
+    def test_zipf_run_and_incremental_reload(self):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        from popularity import ZipfPopularity
+        out = run_main_in_tempdir(self, POPULARITY_MODEL="zipf", SCALED_DIMENSIONS=True, NUM_PRODUCTS=20000,
+                                  NUM_SALES_RECORDS=5000, VECTORIZED=True)
+        self.assertFalse(os.path.exists(os.path.join(out, "product_popularity_O1.csv")))
+        with open(os.path.join(out, "popularity_model_O1.json")) as f:
+            model = json.load(f)
+        with open(os.path.join(out, "products_O1.csv"), newline="", encoding="utf-8") as f:
+            products = list(csv.reader(f))[1:]
+        popularity = ZipfPopularity.from_state(model, [int(row[2]) for row in products])
+        with open(os.path.join(out, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            best_seller = Counter(row[2] for row in list(csv.reader(f))[1:]).most_common(1)[0][0]
+        self.assertIn(best_seller, [products[i][1] for i in popularity.top_items])
+
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(out)
+        # The model file is only read when the setting asks for Zipf
+        with self.assertRaisesRegex(RuntimeError, "product_popularity_O1"):
+            DataGenerator_o1.load_dimensions()
+        self.addCleanup(setattr, DataGenerator_o1, "POPULARITY_MODEL", DataGenerator_o1.POPULARITY_MODEL)
+        DataGenerator_o1.POPULARITY_MODEL = "zipf"
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_o1.generate_incremental(datetime(2025, 1, 1).date(), datetime(2025, 1, 3).date(),
+                                                  num_records=200)
+        with open("sales_data_O1.csv", newline="", encoding="utf-8") as f:
+            self.assertEqual(len(list(csv.reader(f))), 5201)
+        os.remove("popularity_model_O1.json")
+        with self.assertRaisesRegex(RuntimeError, "popularity_model_O1.json not found"):
+            DataGenerator_o1.load_dimensions()
+
+
+class TestCounterRNG(unittest.TestCase):
+    def test_uniforms_are_random_access(self):
+        from counter_rng import CounterUniforms
+        import numpy as np
+        uniforms = CounterUniforms(7)
+        values = uniforms.uniform(3, np.arange(100000))
+        self.assertEqual(uniforms.uniform(3, np.arange(40, 50)).tolist(), values[40:50].tolist())
+        self.assertEqual([uniforms.uniform_at(3, row) for row in range(40, 50)], values[40:50].tolist())
+        self.assertTrue(((values >= 0) & (values < 1)).all())
+        self.assertAlmostEqual(values.mean(), 0.5, delta=0.01)
+        # Other streams and seeds give unrelated values
+        self.assertLess(abs(np.corrcoef(values, uniforms.uniform(4, np.arange(100000)))[0, 1]), 0.02)
+        self.assertLess(abs(np.corrcoef(values, CounterUniforms(8).uniform(3, np.arange(100000)))[0, 1]), 0.02)
+
+    def read_sales(self, out):
+        with open(os.path.join(out, "sales_data_O1.csv"), newline="", encoding="utf-8") as f:
+            return list(csv.reader(f))[1:]
+
+    def generate_rows(self, out, start, stop, **settings):
+        import OpenAI_o1.DataGenerator_o1 as DataGenerator_o1
+        originals = {name: getattr(DataGenerator_o1, name) for name in settings}
+        cwd = os.getcwd()
+        try:
+            for name, value in settings.items():
+                setattr(DataGenerator_o1, name, value)
+            os.chdir(out)
+            return DataGenerator_o1.generate_rows(start, stop)
+        finally:
+            os.chdir(cwd)
+            for name, value in originals.items():
+                setattr(DataGenerator_o1, name, value)
+
+    def test_generate_rows_matches_full_run(self):
+        for settings in [dict(COUNTER_RNG=True), dict(COUNTER_RNG=True, POPULARITY_MODEL="zipf")]:
+            out = run_main_in_tempdir(self, NUM_SALES_RECORDS=5000, VECTOR_BLOCK_SIZE=1500, **settings)
+            rows = self.read_sales(out)
+            self.assertEqual(len(rows), 5000)
+            for start, stop in [(0, 10), (1234, 1300), (1490, 1510), (4999, 5000), (20, 20)]:
+                self.assertEqual(self.generate_rows(out, start, stop, VECTOR_BLOCK_SIZE=7, **settings),
+                                 rows[start:stop])
+            with self.assertRaises(RuntimeError):
+                self.generate_rows(out, 0, 10, COUNTER_RNG=False)
+
+    def test_same_output_for_any_shard_count(self):
+        single = run_main_in_tempdir(self, COUNTER_RNG=True, NUM_SALES_RECORDS=4000)
+        sharded = run_main_in_tempdir(self, COUNTER_RNG=True, NUM_SALES_RECORDS=4000, NUM_SHARDS=3,
+                                      PARALLEL_WORKERS=2, VECTOR_BLOCK_SIZE=700)
+        with open(os.path.join(single, "sales_data_O1.csv"), "rb") as f:
+            single_bytes = f.read()
+        with open(os.path.join(sharded, "sales_data_O1.csv"), "rb") as f:
+            self.assertEqual(f.read(), single_bytes)
+        rows = self.read_sales(single)
+        campaign_rate = sum(1 for row in rows if row[7]) / len(rows)
+        self.assertAlmostEqual(campaign_rate, 0.1, delta=0.03)
+        for row in rows:
+            datetime.strptime(row[0] + " " + row[1], "%Y-%m-%d %H:%M:%S")
+            self.assertGreaterEqual(int(row[4]), 1)
+            self.assertAlmostEqual(float(row[5]), float(row[3]) * int(row[4]), places=2)
+
+
+class TestRowSerializer(unittest.TestCase):
+    def test_matches_csv_writer(self):
+        # Names that need quoting must come out exactly as csv.writer writes them
+        from row_serializer import SalesRowSerializer, date_strings
+        start = datetime(2024, 1, 1).date()
+        names = ["Plain", "Comma, Inc.", 'Say "hi"', "Line\nbreak", "Ünïcode"]
+        rng = random.Random(1)
+        sales = [(rng.randrange(366), rng.randrange(86400), rng.choice(names), round(rng.uniform(1, 999), 2),
+                  rng.randint(1, 9), round(rng.uniform(1, 9999), 2), rng.choice(names), rng.choice(names + [""]))
+                 for _ in range(2500)]
+
+        expected = io.StringIO(newline="")
+        writer = csv.writer(expected)
+        for day, second, product, price, qty, revenue, store, campaign in sales:
+            sale_dt = datetime(2024, 1, 1) + (datetime(2024, 1, 2) - datetime(2024, 1, 1)) * day
+            writer.writerow([sale_dt.strftime("%Y-%m-%d"), f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}",
+                             product, price, qty, revenue, store, campaign])
+
+        actual = io.StringIO(newline="")
+        rows = SalesRowSerializer(actual, date_strings(start, 366), batch_rows=7)
+        for sale in sales:
+            rows.writerow(*sale)
+        rows.flush()
+        self.assertEqual(actual.getvalue(), expected.getvalue())
+
+
 if __name__ == "__main__":
     unittest.main()
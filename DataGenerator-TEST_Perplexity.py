@@ -0,0 +1,50 @@
+import unittest
+import csv
+import io
+import contextlib
+import Perplexity.DataGenerator_Perplexity as DataGenerator_Perplexity
+from generator_test_support import chdir_to_temp_dir, override, peak_memory
+
+
+class TestStreamingSales(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.stores = DataGenerator_Perplexity.generate_stores()
+        _, cls.products = DataGenerator_Perplexity.generate_products()
+
+    def setUp(self):
+        chdir_to_temp_dir(self)
+        override(self, DataGenerator_Perplexity, CHUNK_SIZE=1000)
+
+    def run_sales(self, num_records):
+        override(self, DataGenerator_Perplexity, NUM_RECORDS=num_records)
+        return DataGenerator_Perplexity.save_sales_data(
+            DataGenerator_Perplexity.generate_sales_data(self.products, self.stores))
+
+    def test_row_count(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(self.run_sales(2500), 2500)
+        with open('sales_data_Perplexity.csv', newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(len(rows), 2501)
+        self.assertEqual(rows[0][0], "Date")
+
+    def test_peak_memory_is_flat(self):
+        small = peak_memory(lambda: self.run_sales(5000))
+        large = peak_memory(lambda: self.run_sales(50000))
+        # 10x the rows must not mean (anywhere near) 10x the memory
+        self.assertLess(large, small * 1.5)
+
+    def test_main_twice_builds_fresh_dimensions(self):
+        override(self, DataGenerator_Perplexity, NUM_RECORDS=100)
+        for _ in range(2):
+            with contextlib.redirect_stdout(io.StringIO()):
+                DataGenerator_Perplexity.main()
+            for filename, rows in [('stores_Perplexity.csv', 10), ('categories_Perplexity.csv', 5),
+                                   ('products_Perplexity.csv', 22)]:
+                with open(filename, newline='', encoding='utf-8') as f:
+                    self.assertEqual(len(list(csv.reader(f))), rows + 1, filename)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+import os
+import importlib.util
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+spec = importlib.util.spec_from_file_location("bench_compare", os.path.join(ROOT, "DataGenerator-BENCH_compare.py"))
+bench_compare = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_compare)
+
+
+class TestBenchmarkChildren(unittest.TestCase):
+    def test_every_generator_runs_as_child(self):
+        # Each generator through `--child` at a tiny row count, the way the comparison runs it
+        for name in bench_compare.GENERATORS:
+            with self.subTest(generator=name):
+                result = bench_compare.run_isolated(name, 50, bench_compare.BENCH_SEED)
+                self.assertNotIn('error', result)
+                self.assertGreater(result['wall_time'], 0)
+                self.assertIsNotNone(result['time_to_first_row'])
+                self.assertIsNotNone(result['sales_sha256'])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import csv
+import io
+import contextlib
+import Copilot.DataGenerator_copilot as DataGenerator_copilot
+import Copilot_v2.DataGenerator_copilot_v2 as DataGenerator_copilot_v2
+from generator_test_support import chdir_to_temp_dir, override, peak_memory
+
+
+class TestStreamingSales(unittest.TestCase):
+    def setUp(self):
+        chdir_to_temp_dir(self)
+        for module in (DataGenerator_copilot, DataGenerator_copilot_v2):
+            override(self, module, CHUNK_SIZE=1000)
+
+    def run_v1(self, num_records):
+        DataGenerator_copilot.generate_sales_data(num_records)
+
+    def run_v2(self, num_records):
+        with contextlib.redirect_stdout(io.StringIO()):
+            products = DataGenerator_copilot_v2.generate_categories_and_products()
+            stores = DataGenerator_copilot_v2.generate_store_data()
+        DataGenerator_copilot_v2.generate_sales_data(num_records, products, stores,
+                                                     ["", "10% off Black Friday", "Summer Sale"])
+
+    def test_row_count(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.run_v1(2500)
+            self.run_v2(2500)
+        for filename in ['sales_data_CP.csv', 'sales_data_CPv2.csv']:
+            with open(filename, newline='') as f:
+                rows = list(csv.reader(f))
+            self.assertEqual(len(rows), 2501)
+            self.assertEqual(rows[0], ["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"])
+
+    def test_peak_memory_is_flat(self):
+        for run in (self.run_v1, self.run_v2):
+            with self.subTest(run=run.__name__):
+                small = peak_memory(lambda: run(5000))
+                large = peak_memory(lambda: run(50000))
+                # 10x the rows must not mean (anywhere near) 10x the memory
+                self.assertLess(large, small * 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
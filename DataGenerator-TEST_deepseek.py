@@ -1,9 +1,14 @@
 import unittest
 import csv
 import os
+import io
+import random
+import contextlib
+import json
 from datetime import datetime
-from collections import defaultdict
+from collections import Counter, defaultdict
 import Deepseek.DataGenerator_deepSeek as DataGenerator_deepSeek
+from generator_test_support import chdir_to_temp_dir, override
 
 class TestSalesDataGenerator(unittest.TestCase):
     @classmethod
@@ -191,6 +196,81 @@ class TestSalesDataGenerator(unittest.TestCase):
                     file_headers = next(reader)
                     self.assertEqual(file_headers, headers)
 
+class TestCountFirstMode(unittest.TestCase):
+    def setUp(self):
+        chdir_to_temp_dir(self)
+        override(self, DataGenerator_deepSeek, NUM_SALES=3000, GENERATION_MODE='count_first', EMIT_COUNTS=True)
+        random.seed(3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_deepSeek.main()
+
+    def test_rows_are_time_ordered(self):
+        with open('sales_data_DS.csv') as f:
+            sales = list(csv.DictReader(f))
+        self.assertEqual(len(sales), 3000)
+        keys = [(s['date'], s['time']) for s in sales]
+        self.assertEqual(keys, sorted(keys))
+        for sale in sales:
+            self.assertAlmostEqual(float(sale['revenue']),
+                                   float(sale['unit_price']) * int(sale['quantity']), places=2)
+
+    def test_counts_match_rows(self):
+        with open('sales_data_DS.csv') as f:
+            sales = list(csv.DictReader(f))
+        with open('sales_counts_DS.csv') as f:
+            counts = list(csv.DictReader(f))
+        expected = defaultdict(int)
+        for sale in sales:
+            expected[(sale['date'], sale['store_name'], sale['product_name'])] += 1
+        got = {(c['date'], c['store_name'], c['product_name']): int(c['sales_count']) for c in counts}
+        self.assertEqual(got, dict(expected))
+
+
+class TestPipelinedMode(unittest.TestCase):
+    def setUp(self):
+        chdir_to_temp_dir(self)
+        override(self, DataGenerator_deepSeek, NUM_SALES=2500, PIPELINE_BATCH_ROWS=400)
+
+    def generate(self, pipelined):
+        override(self, DataGenerator_deepSeek, PIPELINED=pipelined, FSYNC_INTERVAL=0.0 if pipelined else None)
+        random.seed(5)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_deepSeek.main()
+        with open('sales_data_DS.csv', 'rb') as f:
+            return f.read()
+
+    def test_same_bytes_as_direct_writes(self):
+        self.assertEqual(self.generate(True), self.generate(False))
+
+
+class TestSummaryStats(unittest.TestCase):
+    def setUp(self):
+        chdir_to_temp_dir(self)
+        override(self, DataGenerator_deepSeek, NUM_SALES=3000, SUMMARY_STATS=True)
+
+    def check_report(self, mode):
+        # Same rows, mean revenue, distinct stores and best-selling product as the sales file
+        override(self, DataGenerator_deepSeek, GENERATION_MODE=mode)
+        with contextlib.redirect_stdout(io.StringIO()):
+            DataGenerator_deepSeek.main()
+        with open('summary_stats_DS.json') as f:
+            report = json.load(f)
+        with open('sales_data_DS.csv', newline='') as f:
+            sales = list(csv.DictReader(f))
+        self.assertEqual(report['rows'], len(sales))
+        revenue = [float(sale['revenue']) for sale in sales]
+        self.assertAlmostEqual(report['columns']['revenue']['mean'], sum(revenue) / len(revenue), places=6)
+        self.assertEqual(report['distinct']['store'], len({sale['store_name'] for sale in sales}))
+        product_counts = Counter(sale['product_name'] for sale in sales)
+        self.assertEqual(report['top']['product'][0]['count'], max(product_counts.values()))
+
+    def test_per_row(self):
+        self.check_report('per_row')
+
+    def test_count_first(self):
+        self.check_report('count_first')
+
+
 if __name__ == '__main__':
     unittest.main(argv=[''], exit=False)
     print("\nData Quality Analysis:")
@@ -235,4 +315,4 @@ if __name__ == '__main__':
         seasonal_months = SEASONALITY[category]
         total = sum(seasonal_sales.get((category, m), 0) for m in range(1,13))
         seasonal_total = sum(seasonal_sales.get((category, m), 0) for m in seasonal_months)
-        print(f"{category}: {seasonal_total/total:.2%} of sales in seasonal months")
\ No newline at end of file
+        print(f"{category}: {seasonal_total/total:.2%} of sales in seasonal months")
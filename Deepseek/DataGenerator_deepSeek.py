@@ -21,9 +21,39 @@ SOFTWARE.
 import csv
 import random
 from datetime import datetime, timedelta, time
+import os
+import sys
+
+# Shared helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from parallel_compress import open_sales_output
+from row_serializer import SalesRowSerializer, date_strings
+from stream_stats import SalesStats
+from write_pipeline import BackgroundWriter
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the count-first mode
+    np = None
 
 # Configuration
 NUM_SALES = 10000  # Adjust this number as needed
+COMPRESSION = None  # Compress sales_data_DS.csv: None, 'gzip', 'zstd' or 'bz2'
+
+# 'per_row' draws every sale on its own; 'count_first' draws how many sales
+# each (day, store, product) cell gets and then expands the cells into rows
+GENERATION_MODE = 'per_row'
+EMIT_COUNTS = False  # count_first only: also write the cell counts to sales_counts_DS.csv
+SUMMARY_STATS = False  # Also write summary_stats_DS.json (see stream_stats.py)
+
+# per_row only: generate sales in batches of PIPELINE_BATCH_ROWS and let a
+# writer thread format and write them (bounded queue of PIPELINE_QUEUE_BATCHES,
+# WRITE_BUFFER_SIZE file buffer, fsync every FSYNC_INTERVAL seconds if set)
+PIPELINED = False
+PIPELINE_BATCH_ROWS = 10000
+PIPELINE_QUEUE_BATCHES = 8
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+FSYNC_INTERVAL = None
 
 # Categories Configuration
 CATEGORIES = [
@@ -108,30 +138,40 @@ def generate_products():
     return products
 
 # Generate Sales Data
-def generate_sales(stores, products):
+def generate_sales(stores, products, stats=None):
     start_date = datetime(2023, 1, 1)
     end_date = datetime(2023, 12, 31)
     date_range = (end_date - start_date).days
+    dates = date_strings(start_date, date_range + 1)
+    day_months = [(start_date + timedelta(days=d)).month for d in range(date_range + 1)]
     
     store_weights = [store['gdp_weight'] for store in stores]
     store_indices = list(range(len(stores)))
+    category_names = {cat['id']: cat['name'] for cat in CATEGORIES}
     
-    with open('sales_data_DS.csv', 'w', newline='') as file:
+    buffer_size = WRITE_BUFFER_SIZE if PIPELINED else None
+    with open_sales_output('sales_data_DS.csv', COMPRESSION, buffer_size=buffer_size) as file:
         writer = csv.writer(file)
         writer.writerow(['date', 'time', 'product_name', 'unit_price', 
                         'quantity', 'revenue', 'store_name', 'campaign'])
+        rows = SalesRowSerializer(file, dates)
+
+        def write_batch(batch):
+            # Runs on the writer thread in pipelined mode
+            rows.writerows(batch)
+            rows.flush()
+
+        pipe = BackgroundWriter(write_batch, file, max_pending=PIPELINE_QUEUE_BATCHES,
+                                fsync_interval=FSYNC_INTERVAL) if PIPELINED else None
+        batch = []
         
         for i in range(NUM_SALES):
             if i % 1000 == 0:
                 print(f"Generated {i} records...")
             
-            # Random date and time
-            random_date = start_date + timedelta(days=random.randint(0, date_range))
-            random_time = time(
-                random.randint(0, 23),
-                random.randint(0, 59),
-                random.randint(0, 59)
-            )
+            # Random date and time, as day offset and second of the day
+            day = random.randint(0, date_range)
+            second = random.randint(0, 23) * 3600 + random.randint(0, 59) * 60 + random.randint(0, 59)
             
             # Select store based on GDP weights
             store_idx = random.choices(store_indices, weights=store_weights, k=1)[0]
@@ -139,11 +179,11 @@ def generate_sales(stores, products):
             
             # Select product with seasonality adjustment
             product_weights = []
-            month = random_date.month
+            month = day_months[day]
             for product in products:
-                category = next(cat for cat in CATEGORIES if cat['id'] == product['category_id'])
-                season_boost = 2 if (category['name'] in SEASONALITY and 
-                                    month in SEASONALITY[category['name']]) else 1
+                category_name = category_names[product['category_id']]
+                season_boost = 2 if (category_name in SEASONALITY and 
+                                    month in SEASONALITY[category_name]) else 1
                 product_weights.append(product['popularity'] * season_boost)
             
             product_idx = random.choices(range(len(products)), weights=product_weights, k=1)[0]
@@ -160,16 +200,130 @@ def generate_sales(stores, products):
             quantity = random.randint(1, 5)
             revenue = round(unit_price * quantity, 2)
             
-            writer.writerow([
-                random_date.strftime('%Y-%m-%d'),
-                random_time.strftime('%H:%M:%S'),
+            sale = (
+                day,
+                second,
                 product['name'],
                 unit_price,
                 quantity,
                 revenue,
                 store['store_name'],
                 campaign['name'] if campaign else ''
-            ])
+            )
+            if stats is not None:
+                stats.add(unit_price, quantity, revenue, product['name'], store['store_name'])
+            if pipe:
+                batch.append(sale)
+                if len(batch) >= PIPELINE_BATCH_ROWS:
+                    pipe.put(batch)
+                    batch = []
+            else:
+                rows.writerow(*sale)
+
+        if pipe:
+            if batch:
+                pipe.put(batch)
+            pipe.close()
+        rows.flush()
+
+# Generate Sales Data, count-first
+def generate_sales_count_first(stores, products, emit_counts=False, stats=None):
+    """
+    Same model as generate_sales, but the counts come first: for each day one
+    multinomial draw gives the number of sales of every (store, product) cell,
+    using the GDP weights and the seasonal boost of that month. The cells are
+    then expanded into rows with sorted times, so the output is in time order.
+    """
+    if np is None:
+        raise RuntimeError("count_first mode requires NumPy (pip install numpy)")
+    rng = np.random.default_rng(random.getrandbits(64))
+
+    start_date = datetime(2023, 1, 1)
+    end_date = datetime(2023, 12, 31)
+    num_days = (end_date - start_date).days + 1
+    dates = date_strings(start_date, num_days)
+
+    # Cell probabilities per month: store weight x seasonal product weight
+    category_names = {cat['id']: cat['name'] for cat in CATEGORIES}
+    store_p = np.array([store['gdp_weight'] for store in stores], dtype=float)
+    store_p /= store_p.sum()
+    cell_p = {}
+    for month in range(1, 13):
+        product_w = np.array([
+            product['popularity'] * (2 if month in SEASONALITY.get(category_names[product['category_id']], []) else 1)
+            for product in products
+        ], dtype=float)
+        cell_p[month] = np.outer(store_p, product_w / product_w.sum()).ravel()
+
+    # Sales per day, uniform over the date range like the per-row mode
+    day_counts = rng.multinomial(NUM_SALES, np.full(num_days, 1.0 / num_days))
+    num_products = len(products)
+    written = 0
+
+    with open_sales_output('sales_data_DS.csv', COMPRESSION) as file:
+        writer = csv.writer(file)
+        writer.writerow(['date', 'time', 'product_name', 'unit_price', 
+                        'quantity', 'revenue', 'store_name', 'campaign'])
+        rows = SalesRowSerializer(file, dates)
+        counts_file = open('sales_counts_DS.csv', 'w', newline='') if emit_counts else None
+        if counts_file:
+            counts_writer = csv.writer(counts_file)
+            counts_writer.writerow(['date', 'store_name', 'product_name', 'sales_count'])
+        try:
+            for day, n_sales in enumerate(day_counts.tolist()):
+                if n_sales == 0:
+                    continue
+                sale_date = start_date + timedelta(days=day)
+                date_str = dates[day]
+
+                counts = rng.multinomial(n_sales, cell_p[sale_date.month])
+                cells = np.flatnonzero(counts)
+                if counts_file:
+                    for cell, count in zip(cells.tolist(), counts[cells].tolist()):
+                        store_idx, product_idx = divmod(cell, num_products)
+                        counts_writer.writerow([date_str, stores[store_idx]['store_name'],
+                                                products[product_idx]['name'], count])
+
+                # Expand cells into rows: shuffle them over the day's sorted times
+                row_cells = rng.permutation(np.repeat(cells, counts[cells]))
+                seconds = np.sort(rng.integers(0, 86400, n_sales))
+                quantities = rng.integers(1, 6, n_sales)
+                has_campaign = rng.random(n_sales) < 0.1
+                campaign_idx = rng.integers(0, len(CAMPAIGNS), n_sales)
+
+                for cell, second, quantity, with_campaign, c_idx in zip(
+                        row_cells.tolist(), seconds.tolist(), quantities.tolist(),
+                        has_campaign.tolist(), campaign_idx.tolist()):
+                    store_idx, product_idx = divmod(cell, num_products)
+                    product = products[product_idx]
+
+                    # Apply campaign discount
+                    campaign = CAMPAIGNS[c_idx] if with_campaign else None
+                    unit_price = product['unit_price']
+                    if campaign:
+                        unit_price = round(unit_price * (1 - campaign['discount']), 2)
+                    revenue = round(unit_price * quantity, 2)
+
+                    rows.writerow(
+                        day,
+                        second,
+                        product['name'],
+                        unit_price,
+                        quantity,
+                        revenue,
+                        stores[store_idx]['store_name'],
+                        campaign['name'] if campaign else ''
+                    )
+                    if stats is not None:
+                        stats.add(unit_price, quantity, revenue, product['name'], stores[store_idx]['store_name'])
+
+                if (written + n_sales) // 1000 > written // 1000:
+                    print(f"Generated {written + n_sales} records...")
+                written += n_sales
+            rows.flush()
+        finally:
+            if counts_file:
+                counts_file.close()
 
 # Save supporting data files
 def save_supporting_data(categories, products, stores):
@@ -212,7 +366,13 @@ def main():
     stores = generate_stores()
     products = generate_products()
     
-    generate_sales(stores, products)
+    stats = SalesStats() if SUMMARY_STATS else None
+    if GENERATION_MODE == 'count_first':
+        generate_sales_count_first(stores, products, emit_counts=EMIT_COUNTS, stats=stats)
+    else:
+        generate_sales(stores, products, stats=stats)
+    if stats is not None:
+        stats.write('summary_stats_DS.json')
     save_supporting_data(CATEGORIES, products, stores)
     
     print("\nData generation complete!")
@@ -19,10 +19,46 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
+import argparse
 import csv
+import json
+import os
+import sys
 import random
+import shutil
 import datetime
+import hashlib
+import io
 import math
+import tempfile
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the vectorized mode
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is only needed for Parquet output
+    pa = None
+    pq = None
+
+# Shared helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from counter_rng import CounterUniforms
+from external_sort import merge_sorted, sort_lines
+from parallel_compress import open_sales_input, open_sales_output, compressed_path
+from popularity import ZipfPopularity
+from row_serializer import SalesRowSerializer, TIME_STRINGS, csv_field, date_strings
+from scaled_dimensions import CODE_ALPHABET, IdPermutation, code, id_space
+from shard_manifest import manifest_path, read_manifests, shard_manifest, verify_shards
+from sales_binary import SALES_FIELDS, SalesBinaryWriter, concatenate as concatenate_binary, record_dtype
+from sqlite_sink import SQLiteLoader, column_types, read_table, table_counts
+from stream_stats import SalesStats
+from write_pipeline import BackgroundWriter, fsync_file
 
 # -------------------------
 # CONFIGURATION
@@ -30,6 +66,161 @@ import math
 
 NUM_SALES_RECORDS = 50000  # Total sales records to generate
 PROGRESS_INTERVAL = 1000   # Print progress every X records
+RANDOM_SEED = 42           # Master seed, for reproducibility
+
+# Vectorized mode generates whole blocks of rows as NumPy arrays and writes
+# each block in one go. Much faster for very large runs; needs NumPy.
+VECTORIZED = False
+VECTOR_BLOCK_SIZE = 250000  # Rows per NumPy block
+
+# Counter-based mode: every sales row is a pure function of RANDOM_SEED and
+# its row number (counter_rng.py) instead of the next draws of one stream,
+# so any slice of the sales can be regenerated on its own with
+# generate_rows(start, stop) or --rows START STOP, in time proportional to
+# the slice. Shards are row ranges of the same sequence: the output does not
+# depend on NUM_SHARDS, the pool size or the block size. Generates blocks
+# like the vectorized mode (needs NumPy), but the rows differ from it.
+COUNTER_RNG = False
+
+# Parallel mode: with NUM_SHARDS > 1 the sales rows are split into shards that
+# are generated in a process pool, each with its own seed derived from
+# RANDOM_SEED. The same seed and shard count always give the same bytes
+# (with COUNTER_RNG, the same bytes for any shard count).
+NUM_SHARDS = 1
+PARALLEL_WORKERS = None   # Pool size (None = number of CPUs)
+KEEP_PART_FILES = False   # Keep sales_data_O1.part-NNNNN.csv instead of concatenating them
+
+# Multi-machine runs: `--shard-index I --shard-count N` makes a node write
+# only shard I of N (the same rows and bytes as part I of a NUM_SHARDS = N
+# run) to sales_data_O1.part-0000I.csv, plus the dimension files and a
+# manifest (shard_manifest.py) with its row range, seed lineage, size and
+# checksum. Nodes need no coordination: the dimensions are identical on all
+# of them. Collect the parts, manifests and one node's dimension files in a
+# directory and run --merge-shards there to verify the set and concatenate
+# it (the parts are removed afterwards unless KEEP_PART_FILES).
+
+# Time-ordered sales: with SORTED_OUTPUT the CSV sales file is sorted by date
+# and time after generation, with an external merge sort (external_sort.py):
+# sorted runs of about SORT_RUN_BYTES of memory are spilled to SORT_TEMP_DIR
+# (None = the system's temp dir) and merged k ways through a heap, so memory
+# stays bounded whatever the size of the file. Sharded runs sort each part in
+# its worker and merge the sorted parts instead of concatenating them; so does
+# --merge-shards. Incremental runs add their rows unsorted.
+SORTED_OUTPUT = False
+SORT_RUN_BYTES = 256 * 1024 * 1024
+SORT_TEMP_DIR = None
+
+# Output format for the sales fact table and the dimension files:
+# 'csv' or 'parquet' (needs pyarrow). Parquet sales rows are buffered and
+# flushed as row groups of PARQUET_ROW_GROUP_SIZE rows, so memory stays bounded.
+# 'binary' writes the sales as fixed-width records (sales_data_O1.bin, see
+# sales_binary.py) with the star-schema dimension files in CSV.
+# 'sqlite' loads every table straight into the database SQLITE_PATH
+# (categories, products, stores, product_popularity, sales), in batches of
+# SQLITE_BATCH_ROWS with journal and fsync off, and indexes the sales date,
+# product and store columns after the load. Single-process runs only.
+OUTPUT_FORMAT = 'csv'
+PARQUET_ROW_GROUP_SIZE = 500000
+SQLITE_PATH = 'data_O1.sqlite'
+SQLITE_BATCH_ROWS = 50000
+SQLITE_COMMIT_ROWS = 1000000
+
+# Compression for the CSV sales file: None, 'gzip', 'zstd' or 'bz2'.
+# Blocks are compressed by background threads while rows are generated.
+COMPRESSION = None
+
+# Pipelined mode: sales are generated in batches of PIPELINE_BATCH_ROWS and
+# handed over a bounded queue (PIPELINE_QUEUE_BATCHES deep) to a writer thread
+# that formats and writes them through a WRITE_BUFFER_SIZE buffer, so disk
+# writes overlap with generation. FSYNC_INTERVAL (seconds, None = never)
+# makes the writer thread fsync the CSV sales file periodically. Single-process
+# runs only; shards always write directly.
+PIPELINED = False
+PIPELINE_BATCH_ROWS = 10000
+PIPELINE_QUEUE_BATCHES = 8
+WRITE_BUFFER_SIZE = 8 * 1024 * 1024
+FSYNC_INTERVAL = None
+
+# Checkpoints for long single-process CSV runs: every CHECKPOINT_INTERVAL sales
+# rows (vectorized mode: at the first block boundary after that) the RNG state,
+# the number of rows written and the synced size of the sales file are saved
+# atomically to sales_data_O1.csv.checkpoint. Running with --resume truncates
+# the sales file to the last checkpoint and carries on from there; the result
+# is byte-identical to an uninterrupted run with the same settings. None = off.
+CHECKPOINT_INTERVAL = None
+CHECKPOINT_SUFFIX = '.checkpoint'
+
+# Sales window of a full run
+SALES_START_DATE = datetime.date(2024, 1, 1)
+SALES_END_DATE = datetime.date(2024, 12, 31)
+
+# Incremental mode (--incremental START END): reload the dimension files of an
+# earlier run and generate sales for the new date range only, at the same
+# daily rate as a full run (NUM_SALES_RECORDS over the sales window) unless a
+# record count is given. The rows are appended to the sales file, or with
+# INCREMENTAL_OUTPUT = 'partition' written to sales_data_O1.YYYYMMDD-YYYYMMDD.csv.
+INCREMENTAL_OUTPUT = 'append'
+
+# Partitioned mode: instead of one sales file, write a Hive-style directory
+# sales_data_O1/year=YYYY/month=MM/day=DD/part-NNNNN.csv (or .parquet) plus
+# sales_data_O1/_manifest.json with the rows and bytes of every partition.
+# Rows are buffered per day (PARTITION_BUFFER_ROWS in total) and each day's
+# rows are written in one go per flush, through at most MAX_OPEN_PARTITIONS
+# open files, least recently used closed first. Parquet partitions are
+# collected in a spill directory instead and written at the end, one part
+# file per partition and run. Single-process runs only; also used by the
+# incremental mode.
+PARTITIONED = False
+MAX_OPEN_PARTITIONS = 64
+PARTITION_BUFFER_ROWS = 100000
+
+# Rollups: while the sales rows are generated, keep running totals (sales,
+# units, revenue in cents) per day and store, per month and category and per
+# campaign, and write them as rollup_daily_store_O1.csv,
+# rollup_monthly_category_O1.csv and rollup_campaign_O1.csv next to the sales
+# file, so no second pass over the sales is needed. Incremental runs add to
+# the existing rollup files.
+ROLLUPS = False
+
+# Summary statistics: while the sales rows are generated, keep mean,
+# variance and quantiles of unit_price, quantity and revenue, distinct counts
+# and the top products and stores, in memory that does not grow with the row
+# count (see stream_stats.py), and write them to SUMMARY_STATS_PATH as JSON.
+# Incremental runs merge into the existing report.
+SUMMARY_STATS = False
+SUMMARY_STATS_PATH = 'summary_stats_O1.json'
+
+# Star-schema mode: stores get a store_id, a campaigns_O1 dimension is written,
+# and the sales rows carry product_id, store_id and campaign_id (empty/null
+# when there is no campaign) instead of the names.
+STAR_SCHEMA = False
+
+# Dimension scaling: with SCALED_DIMENSIONS, NUM_STORES stores and NUM_PRODUCTS
+# products (variants of the CATEGORY_PRODUCTS below, each with its own model
+# code) are generated, e.g. 100k stores and 1M SKUs for load tests. Store
+# numbers and model codes come from a bijection on an ID space
+# (scaled_dimensions.py), so names are unique without any retries and the
+# dimensions are built in O(n). Without it, NUM_STORES stores get random
+# store numbers (fine for a few hundred) and the product list is fixed.
+SCALED_DIMENSIONS = False
+NUM_STORES = 45
+NUM_PRODUCTS = 1000000
+
+# Product popularity: 'random' gives every product a random score 1-100,
+# sampled through an alias table (one entry per product). 'zipf' ranks the
+# products and sells rank r with probability proportional to
+# r^-ZIPF_EXPONENT, and the TOP_SELLERS best-ranked products of each category
+# TOP_SELLER_BOOST times as often (popularity.py). Zipf draws need no table
+# per product: memory and the cost of a draw stay flat up to 10M+ products.
+# Its parameters are saved to POPULARITY_MODEL_PATH instead of
+# product_popularity_O1. Runs that reload the dimensions (--incremental,
+# --merge-shards, --rows) read the weights of the model set here, so keep
+# the setting of the full run.
+POPULARITY_MODEL = 'random'
+ZIPF_EXPONENT = 1.1
+TOP_SELLERS = 1
+TOP_SELLER_BOOST = 3.0
+POPULARITY_MODEL_PATH = 'popularity_model_O1.json'
 
 # Define a list of categories
 # (In a more realistic setup, these could be read from a DB or a more extensive data source.)
@@ -306,25 +497,79 @@ CITY_OPTIONS = {
 }
 
 
+class AliasSampler:
+    """
+    Weighted sampler based on Walker/Vose alias tables.
+
+    The tables are built once in O(n); every draw afterwards is O(1) no matter
+    how many items there are, instead of walking a cumulative sum per draw.
+    """
+
+    def __init__(self, weights):
+        n = len(weights)
+        if n == 0:
+            raise ValueError("AliasSampler needs at least one weight")
+        total = float(sum(weights))
+        if total <= 0 or any(w < 0 for w in weights):
+            raise ValueError("AliasSampler weights must be non-negative with a positive sum")
+
+        self.n = n
+        self.prob = [0.0] * n
+        self.alias = list(range(n))
+
+        # Scale so the average weight is 1, then pair each "small" column
+        # with a "large" one that tops it up.
+        scaled = [w * n / total for w in weights]
+        small = [i for i, w in enumerate(scaled) if w < 1.0]
+        large = [i for i, w in enumerate(scaled) if w >= 1.0]
+        while small and large:
+            small_idx = small.pop()
+            large_idx = large.pop()
+            self.prob[small_idx] = scaled[small_idx]
+            self.alias[small_idx] = large_idx
+            scaled[large_idx] = (scaled[large_idx] + scaled[small_idx]) - 1.0
+            if scaled[large_idx] < 1.0:
+                small.append(large_idx)
+            else:
+                large.append(large_idx)
+        # Whatever is left is 1.0 up to rounding error
+        for i in large + small:
+            self.prob[i] = 1.0
+
+    def sample(self, rng=random):
+        # A single uniform gives both the column and the coin flip
+        u = rng.random() * self.n
+        i = int(u)
+        if u - i < self.prob[i]:
+            return i
+        return self.alias[i]
+
+    def sample_many(self, np_rng, size):
+        # Vectorized version of sample(): returns a NumPy array of indices
+        return self.pick(np_rng.random(size))
+
+    def pick(self, uniforms):
+        # The indices sample_many() gives for an array of uniforms in [0, 1)
+        if not hasattr(self, "_prob_array"):
+            self._prob_array = np.asarray(self.prob, dtype=np.float64)
+            self._alias_array = np.asarray(self.alias, dtype=np.int64)
+        u = uniforms * self.n
+        idx = u.astype(np.int64)
+        return np.where(u - idx < self._prob_array[idx], idx, self._alias_array[idx])
+
+
 def generate_stores(num_stores=45):
-    # We create a list of (country, weighting) from the GDP dict
-    # Then we'll do a weighted selection for countries, pick random city from that country.
+    # We build an alias sampler over the GDP dict once,
+    # then do a weighted selection for countries, pick random city from that country.
     all_countries = list(COUNTRIES_GDP.keys())
-    total_gdp = sum(COUNTRIES_GDP.values())
-    # Weighted distribution for selecting countries
+    country_sampler = AliasSampler(list(COUNTRIES_GDP.values()))
 
     stores = []
     used_store_names = set()
 
     for _ in range(num_stores):
         # Weighted random pick of country
-        r = random.uniform(0, total_gdp)
-        cumulative = 0
-        for country, gdp_val in COUNTRIES_GDP.items():
-            cumulative += gdp_val
-            if r <= cumulative:
-                chosen_country = country
-                break
+        chosen_country = all_countries[country_sampler.sample()]
         # pick random city
         if chosen_country in CITY_OPTIONS:
             city, state = random.choice(CITY_OPTIONS[chosen_country])
@@ -340,11 +585,31 @@ def generate_stores(num_stores=45):
             if store_name not in used_store_names:
                 used_store_names.add(store_name)
                 break
+        else:
+            raise RuntimeError(f"No unique store name left for {city} after 1000 attempts; "
+                               f"use SCALED_DIMENSIONS for {num_stores} stores")
         stores.append((store_name, city, state, chosen_country, continent))
 
     return stores
 
 
+def generate_stores_scaled(num_stores):
+    # Same locations and GDP weighting as generate_stores, but every store
+    # gets its own number from a bijection on 0..space-1: unique by construction
+    all_countries = list(COUNTRIES_GDP.keys())
+    country_sampler = AliasSampler(list(COUNTRIES_GDP.values()))
+    space, _ = id_space(num_stores)
+    store_number = IdPermutation(space)
+
+    stores = []
+    for i in range(num_stores):
+        chosen_country = all_countries[country_sampler.sample()]
+        city, state = random.choice(CITY_OPTIONS.get(chosen_country, [("Unknown City", "Unknown State")]))
+        continent = COUNTRY_CONTINENT.get(chosen_country, "Unknown Continent")
+        stores.append((f"{city} Store #{store_number(i)}", city, state, chosen_country, continent))
+    return stores
+
+
 def expand_products_and_categories():
     # Flatten out the product list for each category
     products = []
@@ -361,6 +626,24 @@ def expand_products_and_categories():
     return cat_map, products
 
 
+def generate_products_scaled(num_products):
+    # num_products SKUs: the CATEGORY_PRODUCTS in turn, each variant with a
+    # price range of its own and a model code that no other product has
+    cat_map = dict(enumerate(CATEGORIES, start=1))
+    base_products = [(cat_idx, name, price_range) for cat_idx, category in cat_map.items()
+                     for name, price_range in CATEGORY_PRODUCTS.get(category, [])]
+    space, digits = id_space(num_products, base=len(CODE_ALPHABET))
+    model_number = IdPermutation(space)
+
+    products = []
+    for i in range(num_products):
+        cat_idx, name, (pmin, pmax) = base_products[i % len(base_products)]
+        scale = random.uniform(0.8, 1.25)
+        products.append((i + 1, f"{name} {code(model_number(i), digits)}", cat_idx,
+                         max(1, round(pmin * scale)), max(1, round(pmax * scale))))
+    return cat_map, products
+
+
 def seasonality_factor(category, month):
     if category in SEASONALITY:
         if month in SEASONALITY[category]:
@@ -368,154 +651,1742 @@ def seasonality_factor(category, month):
     return 1.0
 
 
-def main():
-    random.seed(42)  # For reproducibility if desired
+# Fractional part of a price in cents, formatted the way str() prints a float
+# rounded to 2 decimals (12.0, 12.5, 12.05).
+CENTS_SUFFIX = ['.0'] + [f".{c:02d}".rstrip('0') for c in range(1, 100)]
+
+
+class SalesContext:
+    """
+    Everything the sales generators need, built once per run from the
+    dimension data: the weighted samplers, the date window with its date
+    strings and months, and (lazily) the NumPy lookup tables of the
+    vectorized mode.
+    """
+
+    def __init__(self, stores, products, cat_map, product_popularity, start_date, end_date):
+        self.stores = stores
+        self.products = products
+        self.cat_map = cat_map
+        self.start_date = start_date
+        self.delta_days = (end_date - start_date).days + 1
+        # Per day offset: 'YYYY-MM-DD' and month, so rows never build date objects
+        self.date_strs = date_strings(start_date, self.delta_days)
+        self.day_months = [(start_date + datetime.timedelta(days=d)).month for d in range(self.delta_days)]
+
+        # We also build a weighting for each store based on the country GDP so that
+        # stores in higher GDP countries appear more often in the dataset.
+        # Alias tables are built once per run so every draw is O(1).
+        self.store_sampler = AliasSampler([COUNTRIES_GDP.get(store[3], 1.0) for store in stores])
+        # product_popularity: a score per product id, or a ZipfPopularity
+        if isinstance(product_popularity, ZipfPopularity):
+            self.product_sampler = product_popularity
+        else:
+            self.product_sampler = AliasSampler([product_popularity[p[0]] for p in products])
+        self._tables = None
+        self._fields = {}
+
+    def sale_fields(self, star=False):
+        """
+        CSV text of the product, store and campaign columns, indexed like
+        products, stores and 1-based campaigns (0 = no campaign): escaped
+        names, or the surrogate keys in star-schema mode.
+        """
+        if star not in self._fields:
+            if star:
+                self._fields[star] = ([str(p[0]) for p in self.products],
+                                      [str(store_id) for store_id in range(1, len(self.stores) + 1)],
+                                      [""] + [str(c) for c in range(1, len(CAMPAIGN_NAMES) + 1)])
+            else:
+                self._fields[star] = ([csv_field(p[1]) for p in self.products],
+                                      [csv_field(st[0]) for st in self.stores],
+                                      [""] + [csv_field(c) for c in CAMPAIGN_NAMES])
+        return self._fields[star]
+
+    def vector_tables(self):
+        # Lookup tables used by the vectorized mode
+        if self._tables is not None:
+            return self._tables
+        if np is None:
+            raise RuntimeError("Vectorized mode requires NumPy (pip install numpy)")
+
+        cat_index = {cat_id: idx for idx, cat_id in enumerate(self.cat_map)}
+        # season[category, month] -> demand multiplier
+        season = np.ones((len(self.cat_map), 13), dtype=np.float64)
+        for cat_id, cat_name in self.cat_map.items():
+            for month in range(1, 13):
+                season[cat_index[cat_id], month] = seasonality_factor(cat_name, month)
+
+        self._tables = {
+            "season": season,
+            "day_month": np.array(self.day_months, dtype=np.int64),
+            "product_cat": np.array([cat_index[p[2]] for p in self.products], dtype=np.int64),
+            "product_min": np.array([p[3] for p in self.products], dtype=np.float64),
+            "product_max": np.array([p[4] for p in self.products], dtype=np.float64),
+            # Pre-formatted strings so each row is a handful of lookups
+            "date_str": np.array(self.date_strs, dtype=object),
+            "time_str": np.array(TIME_STRINGS, dtype=object),
+        }
+        for star, suffix in [(False, "str"), (True, "id_str")]:
+            product_fields, store_fields, campaign_fields = self.sale_fields(star)
+            self._tables["product_" + suffix] = np.array(product_fields, dtype=object)
+            self._tables["store_" + suffix] = np.array(store_fields, dtype=object)
+            self._tables["campaign_" + suffix] = np.array(campaign_fields, dtype=object)
+        return self._tables
+
+
+def write_sales_rows(writer, num_records, ctx, rng=random, progress=True, start=0, checkpoint=None):
+    # Row-by-row generation: one sale per loop iteration, handed to
+    # writer.write_sale() as a day offset, a second of the day, product and
+    # store indices and a 1-based campaign index (0 = none).
+    # Rows 1..start are taken as already written (rng must be in the state
+    # it had after them); checkpoint(rows, rng_state) is called every
+    # CHECKPOINT_INTERVAL rows.
+    products, cat_map = ctx.products, ctx.cat_map
+    day_months = ctx.day_months
+
+    for i in range(start + 1, num_records + 1):
+        # pick a store with weighted probability
+        store = ctx.store_sampler.sample(rng)
+
+        # pick a product with popularity weighting
+        product = ctx.product_sampler.sample(rng)
+        pid, pname, cat_id, pmin, pmax = products[product]
+
+        # figure out date/time
+        day_offset = rng.randint(0, ctx.delta_days - 1)
+        hour = rng.randint(0, 23)
+        minute = rng.randint(0, 59)
+        second = rng.randint(0, 59)
+
+        # incorporate seasonality
+        month = day_months[day_offset]
+        cat_name = cat_map[cat_id]
+        s_factor = seasonality_factor(cat_name, month)
+
+        # pick quantity in a realistic manner
+        # base quantity 1-3
+        # plus factor from seasonality
+        base_qty = rng.randint(1, 3)
+        # scale up occasionally
+        if rng.random() < 0.05:
+            base_qty += rng.randint(1, 5)
+        quantity = int(round(base_qty * s_factor))
+        if quantity < 1:
+            quantity = 1
+
+        # pick a random unit price in [pmin, pmax]
+        unit_price = round(rng.uniform(pmin, pmax), 2)
+
+        # campaign?
+        campaign = 0
+        if rng.random() < CAMPAIGN_PROBABILITY:
+            campaign = rng.randrange(len(CAMPAIGN_NAMES)) + 1  # same draw as rng.choice(CAMPAIGN_NAMES)
+
+        # compute revenue
+        revenue = round(unit_price * quantity, 2)
+
+        # write the row
+        writer.write_sale(day_offset, hour * 3600 + minute * 60 + second,
+                          product, unit_price, quantity, revenue, store, campaign)
+
+        # progress
+        if progress and i % PROGRESS_INTERVAL == 0:
+            print(f"Generated {i} sales records...")
+
+        if checkpoint and i % CHECKPOINT_INTERVAL == 0 and i < num_records:
+            checkpoint(i, rng.getstate())
+
+
+def generate_sales_block(np_rng, size, ctx):
+    """
+    Generate `size` sales rows at once as a dict of NumPy columns.
+
+    Follows the same rules as write_sales_rows(); prices and revenue are
+    kept as integer cents.
+    """
+    tables = ctx.vector_tables()
+    day = np_rng.integers(0, ctx.delta_days, size)
+    second = np_rng.integers(0, 86400, size)
+    store = ctx.store_sampler.sample_many(np_rng, size)
+    product = ctx.product_sampler.sample_many(np_rng, size)
+
+    # quantity: base 1-3, occasionally scaled up, then seasonality
+    s_factor = tables["season"][tables["product_cat"][product], tables["day_month"][day]]
+    base_qty = np_rng.integers(1, 4, size)
+    bump = np_rng.random(size) < 0.05
+    base_qty += np.where(bump, np_rng.integers(1, 6, size), 0)
+    quantity = np.maximum(np.rint(base_qty * s_factor).astype(np.int64), 1)
+
+    price = np_rng.uniform(tables["product_min"][product], tables["product_max"][product])
+    price_cents = np.rint(price * 100).astype(np.int64)
+
+    # campaign 0 means "no campaign", otherwise 1-based index into CAMPAIGN_NAMES
+    has_campaign = np_rng.random(size) < CAMPAIGN_PROBABILITY
+    campaign = np.where(has_campaign, np_rng.integers(1, len(CAMPAIGN_NAMES) + 1, size), 0)
+
+    return {
+        "day": day,
+        "second": second,
+        "product": product,
+        "store": store,
+        "quantity": quantity,
+        "price_cents": price_cents,
+        "revenue_cents": price_cents * quantity,
+        "campaign": campaign,
+    }
+
+
+def format_sales_block(block, ctx, star=False):
+    # Render a block as CSV text (same layout and line endings as csv.writer)
+    tables = ctx.vector_tables()
+    key = "id_str" if star else "str"
+    price_whole, price_frac = np.divmod(block["price_cents"], 100)
+    rev_whole, rev_frac = np.divmod(block["revenue_cents"], 100)
+    suffix = CENTS_SUFFIX
+    return "".join([
+        f"{d},{t},{p},{pw}{suffix[pf]},{q},{rw}{suffix[rf]},{st},{c}\r\n"
+        for d, t, p, pw, pf, q, rw, rf, st, c in zip(
+            tables["date_str"][block["day"]].tolist(),
+            tables["time_str"][block["second"]].tolist(),
+            tables["product_" + key][block["product"]].tolist(),
+            price_whole.tolist(),
+            price_frac.tolist(),
+            block["quantity"].tolist(),
+            rev_whole.tolist(),
+            rev_frac.tolist(),
+            tables["store_" + key][block["store"]].tolist(),
+            tables["campaign_" + key][block["campaign"]].tolist(),
+        )
+    ])
+
+
+# Random values per row in counter-based mode, numbered by stream. The
+# product sampler gets streams from PRODUCT_STREAM on (a Zipf draw may need
+# several uniforms per row).
+DAY_STREAM, SECOND_STREAM, STORE_STREAM, QUANTITY_STREAM, BUMP_STREAM, BUMP_SIZE_STREAM, PRICE_STREAM, \
+    CAMPAIGN_STREAM, CAMPAIGN_PICK_STREAM = range(9)
+PRODUCT_STREAM = 100
+
+
+def generate_sales_range(ctx, seed, start, stop):
+    """
+    Sales rows start..stop-1 (0-based) of a counter-based run, as a block
+    of NumPy columns like generate_sales_block(). Each row only depends on
+    the seed and its row number.
+    """
+    tables = ctx.vector_tables()
+    uniforms = CounterUniforms(seed)
+    rows = np.arange(start, stop, dtype=np.uint64)
+
+    def uniform(stream):
+        return uniforms.uniform(stream, rows)
+
+    def integers(stream, low, high):
+        # Integers in [low, high)
+        return low + (uniform(stream) * (high - low)).astype(np.int64)
+
+    day = integers(DAY_STREAM, 0, ctx.delta_days)
+    second = integers(SECOND_STREAM, 0, 86400)
+    store = ctx.store_sampler.pick(uniform(STORE_STREAM))
+    if isinstance(ctx.product_sampler, ZipfPopularity):
+        product = ctx.product_sampler.sample_many(
+            None, rows.size, lambda stream, positions: uniforms.uniform(PRODUCT_STREAM + stream, rows[positions]))
+    else:
+        product = ctx.product_sampler.pick(uniform(PRODUCT_STREAM))
+
+    # Same rules as generate_sales_block()
+    s_factor = tables["season"][tables["product_cat"][product], tables["day_month"][day]]
+    base_qty = integers(QUANTITY_STREAM, 1, 4)
+    bump = uniform(BUMP_STREAM) < 0.05
+    base_qty += np.where(bump, integers(BUMP_SIZE_STREAM, 1, 6), 0)
+    quantity = np.maximum(np.rint(base_qty * s_factor).astype(np.int64), 1)
+
+    price_min, price_max = tables["product_min"][product], tables["product_max"][product]
+    price_cents = np.rint((price_min + uniform(PRICE_STREAM) * (price_max - price_min)) * 100).astype(np.int64)
+
+    has_campaign = uniform(CAMPAIGN_STREAM) < CAMPAIGN_PROBABILITY
+    campaign = np.where(has_campaign, integers(CAMPAIGN_PICK_STREAM, 1, len(CAMPAIGN_NAMES) + 1), 0)
+
+    return {
+        "day": day,
+        "second": second,
+        "product": product,
+        "store": store,
+        "quantity": quantity,
+        "price_cents": price_cents,
+        "revenue_cents": price_cents * quantity,
+        "campaign": campaign,
+    }
+
+
+def write_sales_counter(writer, stop, ctx, seed, progress=True, start=0, checkpoint=None):
+    # Write rows start..stop-1 of a counter-based run, block by block;
+    # checkpoint(rows, None) as in write_sales_vectorized()
+    if np is None:
+        raise RuntimeError("Counter-based mode requires NumPy (pip install numpy)")
+    written = last_checkpoint = start
+    while written < stop:
+        size = min(VECTOR_BLOCK_SIZE, stop - written)
+        writer.write_block(generate_sales_range(ctx, seed, written, written + size))
+        written += size
+        if progress:
+            print(f"Generated {written} sales records...")
+        if checkpoint and written - last_checkpoint >= CHECKPOINT_INTERVAL and written < stop:
+            checkpoint(written, None)
+            last_checkpoint = written
+
+
+def write_sales_vectorized(writer, num_records, ctx, seed, progress=True, start=0, rng_state=None,
+                           checkpoint=None):
+    # Generate and write the sales rows block by block. To continue a run,
+    # pass the rows already written and the bit generator state after them.
+    if np is None:
+        raise RuntimeError("Vectorized mode requires NumPy (pip install numpy)")
+    np_rng = np.random.default_rng(seed)
+    if rng_state is not None:
+        np_rng.bit_generator.state = rng_state
+    written = last_checkpoint = start
+    while written < num_records:
+        size = min(VECTOR_BLOCK_SIZE, num_records - written)
+        block = generate_sales_block(np_rng, size, ctx)
+        writer.write_block(block)
+        written += size
+        if progress:
+            print(f"Generated {written} sales records...")
+        if checkpoint and written - last_checkpoint >= CHECKPOINT_INTERVAL and written < num_records:
+            checkpoint(written, np_rng.bit_generator.state)
+            last_checkpoint = written
+
+
+SALES_HEADER = ["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"]
+STAR_SALES_HEADER = ["date", "time", "product_id", "unit_price", "quantity", "revenue", "store_id", "campaign_id"]
+# Low-cardinality sales columns that Parquet stores dictionary encoded
+PARQUET_DICTIONARY_COLUMNS = ["product_name", "store_name", "campaign", "product_id", "store_id", "campaign_id"]
+
+
+class CsvSalesWriter:
+    """
+    Sales writer for CSV output. Takes single sales (write_sale, serialized
+    with the precomputed date/time tables) and whole NumPy blocks from the
+    vectorized mode (write_block). Product, store and campaign are written
+    as names, or as their ids with `star`.
+    """
+
+    def __init__(self, path, ctx, compression=None, header=True, buffer_size=None, append=False,
+                 report=True, star=None):
+        self.ctx = ctx
+        self.star = STAR_SCHEMA if star is None else star
+        self.path = compressed_path(path, compression)
+        self.file = open_sales_output(path, compression, encoding='utf-8', buffer_size=buffer_size,
+                                      append=append, report=report)
+        if header:
+            csv.writer(self.file).writerow(STAR_SALES_HEADER if self.star else SALES_HEADER)
+        self._rows = SalesRowSerializer(self.file, ctx.date_strs)
+        self._write_escaped = self._rows.write_escaped
+        self._products, self._stores, self._campaigns = ctx.sale_fields(self.star)
+
+    def write_sale(self, day, second, product, unit_price, quantity, revenue, store, campaign):
+        self._write_escaped(day, second, self._products[product], unit_price, quantity, revenue,
+                            self._stores[store], self._campaigns[campaign])
+
+    def write_block(self, block):
+        self._rows.flush()
+        self.file.write(format_sales_block(block, self.ctx, self.star))
+
+    def flush(self):
+        # Hand any serialized rows still held back to the file
+        self._rows.flush()
+
+    def checkpoint(self, state):
+        # Get every row written so far onto disk (compressed output is cut at
+        # a block boundary), then save `state` with the file size it goes with
+        self._rows.flush()
+        self.file.flush()
+        raw = self.file.buffer.raw
+        if hasattr(raw, "sync"):
+            raw.sync()
+        fsync_file(self.file)
+        write_json_atomic(self.path + CHECKPOINT_SUFFIX,
+                         dict(state, file_offset=os.fstat(self.file.fileno()).st_size))
+
+    def close(self):
+        self._rows.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetSalesWriter:
+    """
+    Sales writer for Parquet output. Rows are buffered and flushed as Arrow
+    record batches, one row group per PARQUET_ROW_GROUP_SIZE rows.
+    Repeated text columns (or the id columns with `star`) are dictionary
+    encoded and "no campaign" is null.
+    """
+
+    def __init__(self, path, ctx, star=None):
+        if pa is None:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        self.ctx = ctx
+        self.path = path
+        self.star = STAR_SCHEMA if star is None else star
+        if self.star:
+            key_type = pa.int32()
+            self._products = pa.array([p[0] for p in ctx.products], pa.int32())
+            self._stores = pa.array(range(1, len(ctx.stores) + 1), pa.int32())
+            self._campaigns = pa.array(range(1, len(CAMPAIGN_NAMES) + 1), pa.int32())
+        else:
+            key_type = pa.dictionary(pa.int32(), pa.string())
+            self._products = pa.array([p[1] for p in ctx.products], pa.string())
+            self._stores = pa.array([st[0] for st in ctx.stores], pa.string())
+            self._campaigns = pa.array(CAMPAIGN_NAMES, pa.string())
+        header = STAR_SALES_HEADER if self.star else SALES_HEADER
+        types = [pa.date32(), pa.time32("s"), key_type, pa.float64(), pa.int32(), pa.float64(), key_type, key_type]
+        self.schema = pa.schema(list(zip(header, types)))
+        self._writer = pq.ParquetWriter(path, self.schema,
+                                        use_dictionary=[name for name in header if name in PARQUET_DICTIONARY_COLUMNS])
+        self._rows = []
+        self._epoch_day = ctx.start_date.toordinal() - datetime.date(1970, 1, 1).toordinal()
+
+    def _record_batch(self, day, second, product, unit_price, quantity, revenue, store, campaign):
+        # Columns as Arrow arrays; product, store and campaign are 0-based indices
+        # into the dimensions (campaign null = no campaign). Names become
+        # dictionary arrays over the dimension lists, ids are looked up with take()
+        if self.star:
+            product, store, campaign = (self._products.take(product), self._stores.take(store),
+                                        self._campaigns.take(campaign))
+        else:
+            product = pa.DictionaryArray.from_arrays(product, self._products)
+            store = pa.DictionaryArray.from_arrays(store, self._stores)
+            campaign = pa.DictionaryArray.from_arrays(campaign, self._campaigns)
+        return pa.record_batch([day.cast(pa.date32()), second.cast(pa.time32("s")), product,
+                                unit_price, quantity, revenue, store, campaign], schema=self.schema)
+
+    def write_sale(self, *sale):
+        self._rows.append(sale)
+        if len(self._rows) >= PARQUET_ROW_GROUP_SIZE:
+            self.flush()
+
+    def flush(self):
+        # Turn the buffered sales (as written by write_sales_rows) into a record batch
+        if not self._rows:
+            return
+        columns = list(zip(*self._rows))
+        self._rows = []
+        epoch_day = self._epoch_day
+        batch = self._record_batch(
+            pa.array([epoch_day + d for d in columns[0]], pa.int32()),
+            pa.array(columns[1], pa.int32()),
+            pa.array(columns[2], pa.int32()),
+            pa.array(columns[3], pa.float64()),
+            pa.array(columns[4], pa.int32()),
+            pa.array(columns[5], pa.float64()),
+            pa.array(columns[6], pa.int32()),
+            pa.array([c - 1 if c else None for c in columns[7]], pa.int32()),
+        )
+        self._writer.write_batch(batch)
+
+    def write_block(self, block):
+        # Vectorized blocks map straight onto Arrow arrays without any string work
+        self.flush()
+        campaign = block["campaign"]
+        batch = self._record_batch(
+            pa.array((block["day"] + self._epoch_day).astype(np.int32)),
+            pa.array(block["second"].astype(np.int32)),
+            pa.array(block["product"].astype(np.int32)),
+            pa.array(block["price_cents"] / 100.0),
+            pa.array(block["quantity"].astype(np.int32)),
+            pa.array(block["revenue_cents"] / 100.0),
+            pa.array(block["store"].astype(np.int32)),
+            pa.array((campaign - 1).astype(np.int32), mask=campaign == 0),
+        )
+        self._writer.write_table(pa.Table.from_batches([batch]), row_group_size=PARQUET_ROW_GROUP_SIZE)
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class BinarySalesWriter:
+    """
+    Sales writer for the fixed-width binary format (sales_binary). Records
+    always carry ids, absolute day numbers and prices in cents; vectorized
+    blocks become one structured array each and are written in one go.
+    """
+
+    def __init__(self, path, ctx, append=False):
+        self.ctx = ctx
+        self.path = path
+        self._epoch_day = ctx.start_date.toordinal() - datetime.date(1970, 1, 1).toordinal()
+        self._product_ids = [p[0] for p in ctx.products]
+        self._writer = SalesBinaryWriter(path, append=append, metadata={
+            "generator": "DataGenerator_o1",
+            "dimensions": {"product_id": "products_O1.csv", "store_id": "stores_O1.csv",
+                           "campaign_id": "campaigns_O1.csv"},
+        })
+        self.file = self._writer.file
+        self._write = self._writer.write
+
+    def write_sale(self, day, second, product, unit_price, quantity, revenue, store, campaign):
+        self._write(self._epoch_day + day, second, self._product_ids[product], store + 1, quantity,
+                    round(unit_price * 100), campaign)
+
+    def write_block(self, block):
+        records = np.empty(len(block["day"]), record_dtype(SALES_FIELDS))
+        records["day"] = block["day"] + self._epoch_day
+        records["second"] = block["second"]
+        records["product_id"] = np.asarray(self._product_ids)[block["product"]]
+        records["store_id"] = block["store"] + 1
+        records["quantity"] = block["quantity"]
+        records["price_cents"] = block["price_cents"]
+        records["campaign_id"] = block["campaign"]
+        self._writer.write_records(records)
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteSalesWriter:
+    """
+    Sales writer that loads the rows into the `sales` table of a SQLite
+    database (sqlite_sink). Names (or ids with `star`) are stored as they
+    are, "no campaign" as NULL. Indexes on date, product and store are built
+    after the last row, and the load rate is printed on close.
+    """
+
+    def __init__(self, path, ctx, star=None, append=False):
+        self.ctx = ctx
+        self.path = path
+        self.star = STAR_SCHEMA if star is None else star
+        self.header = STAR_SALES_HEADER if self.star else SALES_HEADER
+        key = "INTEGER" if self.star else "TEXT"
+        types = ["TEXT", "TEXT", key, "REAL", "INTEGER", "REAL", key, key]
+        self._loader = SQLiteLoader(path, SQLITE_BATCH_ROWS, SQLITE_COMMIT_ROWS)
+        self._loader.create_table("sales", list(zip(self.header, types)), replace=not append)
+        if self.star:
+            self._products = [p[0] for p in ctx.products]
+            self._stores = list(range(1, len(ctx.stores) + 1))
+            self._campaigns = [None] + list(range(1, len(CAMPAIGN_NAMES) + 1))
+        else:
+            self._products = [p[1] for p in ctx.products]
+            self._stores = [st[0] for st in ctx.stores]
+            self._campaigns = [None] + CAMPAIGN_NAMES
+        self._dates = ctx.date_strs
+        self._insert = self._loader.insert
+        self._columns = None
+
+    def write_sale(self, day, second, product, unit_price, quantity, revenue, store, campaign):
+        self._insert("sales", (self._dates[day], TIME_STRINGS[second], self._products[product], unit_price,
+                               quantity, revenue, self._stores[store], self._campaigns[campaign]))
+
+    def write_block(self, block):
+        if self._columns is None:
+            self._columns = [np.array(values, dtype=object) for values in
+                             (self._dates, TIME_STRINGS, self._products, self._stores, self._campaigns)]
+        dates, times, products, stores, campaigns = self._columns
+        self._loader.insert_many("sales", zip(
+            dates[block["day"]].tolist(),
+            times[block["second"]].tolist(),
+            products[block["product"]].tolist(),
+            (block["price_cents"] / 100).tolist(),
+            block["quantity"].tolist(),
+            (block["revenue_cents"] / 100).tolist(),
+            stores[block["store"]].tolist(),
+            campaigns[block["campaign"]].tolist(),
+        ))
+
+    def flush(self):
+        self._loader.flush()
+
+    def close(self):
+        loader = self._loader
+        if loader.conn is None:
+            return
+        loader.create_indexes("sales", [self.header[0], self.header[2], self.header[6]])
+        loader.close()
+        rows = loader.rows["sales"]
+        print(f"Loaded {rows} sales rows into {self.path} in {loader.load_time:.2f} s "
+              f"({rows / max(loader.load_time, 1e-9):,.0f} rows/sec), indexes built in {loader.index_time:.2f} s")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SummarySalesWriter:
+    """
+    Front end for a sales writer that adds every sale and block to each of
+    `summaries` (name -> SalesRollups, SalesStatistics) on the way through;
+    single sales are added in batches of `batch_rows`. Checkpoints carry
+    the summaries' state.
+    """
+
+    def __init__(self, writer, summaries, batch_rows=10000):
+        self.writer = writer
+        self.summaries = summaries
+        self.path = writer.path
+        self.batch_rows = batch_rows
+        self._sales = []
+        self._write_sale = writer.write_sale
+
+    def write_sale(self, *sale):
+        self._sales.append(sale)
+        if len(self._sales) >= self.batch_rows:
+            self.flush_summaries()
+        self._write_sale(*sale)
+
+    def flush_summaries(self):
+        if self._sales:
+            for summary in self.summaries.values():
+                summary.add_sales(self._sales)
+            self._sales = []
+
+    def write_block(self, block):
+        self.flush_summaries()
+        for summary in self.summaries.values():
+            summary.add_block(block)
+        self.writer.write_block(block)
+
+    def checkpoint(self, state):
+        self.flush_summaries()
+        self.writer.checkpoint(dict(state, summaries={name: summary.state()
+                                                      for name, summary in self.summaries.items()}))
+
+    def close(self):
+        self.flush_summaries()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PipelinedSalesWriter:
+    """
+    Front end for any of the sales writers that moves formatting and
+    writing to a background thread. write_sale() collects sales into batches
+    of `batch_rows`; write_block() hands over vectorized blocks as they are.
+    The wrapped writer is only ever called from the writer thread.
+    """
+
+    def __init__(self, writer, batch_rows=None, queue_batches=None, fsync_interval=None):
+        self.writer = writer
+        self.path = writer.path
+        self.batch_rows = batch_rows or PIPELINE_BATCH_ROWS
+        self._sales = []
+        file = getattr(writer, "file", None)  # Parquet writers have nothing to fsync
+        self._pipe = BackgroundWriter(self._consume, file,
+                                      max_pending=queue_batches or PIPELINE_QUEUE_BATCHES,
+                                      fsync_interval=fsync_interval if file is not None else None)
+
+    def _consume(self, batch):
+        kind, data = batch
+        if kind == "block":
+            self.writer.write_block(data)
+        elif kind == "flush":
+            self.writer.flush()
+        elif kind == "checkpoint":
+            self.writer.checkpoint(data)
+        else:
+            write_sale = self.writer.write_sale
+            for sale in data:
+                write_sale(*sale)
+
+    def write_sale(self, *sale):
+        self._sales.append(sale)
+        if len(self._sales) >= self.batch_rows:
+            self._pipe.put(("sales", self._sales))
+            self._sales = []
+
+    def write_block(self, block):
+        if self._sales:
+            self._pipe.put(("sales", self._sales))
+            self._sales = []
+        self._pipe.put(("block", block))
 
-    # Generate stores
-    stores = generate_stores(45)
+    def checkpoint(self, state):
+        # Taken by the writer thread once everything before it is written
+        if self._sales:
+            self._pipe.put(("sales", self._sales))
+            self._sales = []
+        self._pipe.put(("checkpoint", state))
 
-    # Expand categories and products
-    cat_map, products = expand_products_and_categories()
+    def close(self):
+        try:
+            if self._sales:
+                self._pipe.put(("sales", self._sales))
+                self._sales = []
+            # Everything reaches the file before the final fsync
+            self._pipe.put(("flush", None))
+            self._pipe.close()
+        finally:
+            self.writer.close()
 
-    # Save categories to categories_O1.csv
-    with open('categories_O1.csv', 'w', newline='', encoding='utf-8') as f_cat:
-        writer = csv.writer(f_cat)
-        writer.writerow(["category_id", "category_name"])
-        for cat_id, cat_name in cat_map.items():
-            writer.writerow([cat_id, cat_name])
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PartitionedSalesWriter:
+    """
+    Sales writer for a Hive-style layout under `root`, one directory per
+    sale date: year=YYYY/month=MM/day=DD. Sales (and the rows of vectorized
+    blocks) are buffered per day offset; a flush writes each day's rows in
+    one go. CSV and binary partitions have a part writer each, kept in an LRU
+    of at most `max_open` open files; a partition that is opened again is
+    appended to. Parquet files cannot be appended to, so there a flush adds
+    the rows to a raw spill file per partition and close() turns every spill
+    file into a single Parquet part, one partition at a time: one new part
+    file per partition and run, whatever the number of partitions.
+
+    On close, _manifest.json lists every partition's files, rows and bytes.
+    Partitions already in the manifest (from an earlier incremental run) are
+    kept and updated, not replaced.
+    """
+
+    # Columns of a spill record: a vectorized block's, prices in cents
+    SPILL_FIELDS = [("day", "<i4"), ("second", "<i4"), ("product", "<i4"), ("quantity", "<i4"),
+                    ("price_cents", "<i8"), ("revenue_cents", "<i8"), ("store", "<i4"), ("campaign", "<i4")]
+
+    def __init__(self, root, ctx, output_format=None, compression=None, max_open=None, buffer_rows=None,
+                 star=None):
+        self.root = self.path = root
+        self.ctx = ctx
+        self.star = STAR_SCHEMA if star is None else star
+        self.output_format = output_format or OUTPUT_FORMAT
+        if self.output_format == 'sqlite':
+            raise RuntimeError("Partitioned output needs CSV, Parquet or binary files")
+        self.compression = compression if self.output_format == 'csv' else None
+        self.max_open = max_open or MAX_OPEN_PARTITIONS
+        self.buffer_rows = buffer_rows or PARTITION_BUFFER_ROWS
+        self._open = OrderedDict()  # day offset -> part writer, least recently used first
+        self._buffers = defaultdict(list)  # day offset -> sales waiting to be written
+        self._blocks = defaultdict(list)  # day offset -> block rows waiting to be written
+        self._buffered = 0
+        self._rows = defaultdict(int)  # day offset -> sales written in this run
+        self._spill_dir = None  # Parquet: rows per partition until close()
+        self.opened = 0  # part files opened, including reopens after eviction
+
+    def partition_dir(self, day):
+        sale_date = self.ctx.start_date + datetime.timedelta(days=day)
+        return os.path.join(self.root, f"year={sale_date.year:04d}",
+                            f"month={sale_date.month:02d}", f"day={sale_date.day:02d}")
+
+    def _writer(self, day):
+        writer = self._open.get(day)
+        if writer is not None:
+            self._open.move_to_end(day)
+            return writer
+        if len(self._open) >= self.max_open:
+            _, oldest = self._open.popitem(last=False)
+            oldest.close()
+
+        directory = self.partition_dir(day)
+        os.makedirs(directory, exist_ok=True)
+        if self.output_format == 'parquet':
+            # Parquet files cannot be reopened for writing: start the next part
+            part = sum(1 for name in os.listdir(directory) if name.startswith("part-"))
+            writer = ParquetSalesWriter(os.path.join(directory, f"part-{part:05d}.parquet"), self.ctx, self.star)
+        elif self.output_format == 'binary':
+            writer = BinarySalesWriter(os.path.join(directory, "part-00000.bin"), self.ctx, append=True)
+        else:
+            base = os.path.join(directory, "part-00000.csv")
+            path = compressed_path(base, self.compression)
+            exists = os.path.exists(path) and os.path.getsize(path) > 0
+            writer = CsvSalesWriter(base, self.ctx, self.compression, header=not exists, append=exists,
+                                    report=False, star=self.star)
+        self._open[day] = writer
+        self.opened += 1
+        return writer
+
+    def write_sale(self, day, *sale):
+        self._buffers[day].append((day,) + sale)
+        self._buffered += 1
+        if self._buffered >= self.buffer_rows:
+            self.flush()
+
+    def write_block(self, block):
+        # Split a vectorized block by day, keeping the row order within each day
+        order = np.argsort(block["day"], kind="stable")
+        days = block["day"][order]
+        for rows in np.split(order, np.flatnonzero(np.diff(days)) + 1):
+            if len(rows) == 0:
+                continue
+            day = int(block["day"][rows[0]])
+            self._blocks[day].append({name: column[rows] for name, column in block.items()})
+        self._buffered += len(order)
+        if self._buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self):
+        # Write the buffered sales, one partition at a time in date order
+        for day in sorted(set(self._buffers) | set(self._blocks)):
+            sales, blocks = self._buffers.get(day, []), self._blocks.get(day, [])
+            if blocks:
+                blocks = [{name: np.concatenate([b[name] for b in blocks]) for name in blocks[0]}]
+            if self.output_format == 'parquet':
+                self._spill(day, sales, blocks)
+            else:
+                writer = self._writer(day)
+                for sale in sales:
+                    writer.write_sale(*sale)
+                for block in blocks:
+                    writer.write_block(block)
+            self._rows[day] += len(sales) + sum(len(block["day"]) for block in blocks)
+        self._buffers.clear()
+        self._blocks.clear()
+        self._buffered = 0
+
+    def _spill(self, day, sales, blocks):
+        # Append rows to the partition's spill file, as records of SPILL_FIELDS
+        parts = []
+        if sales:
+            days, second, product, unit_price, quantity, revenue, store, campaign = zip(*sales)
+            parts.append({"day": days, "second": second, "product": product, "quantity": quantity,
+                          "price_cents": np.rint(np.array(unit_price) * 100),
+                          "revenue_cents": np.rint(np.array(revenue) * 100), "store": store,
+                          "campaign": campaign})
+        parts.extend(blocks)
+        if self._spill_dir is None:
+            os.makedirs(self.root, exist_ok=True)
+            self._spill_dir = tempfile.mkdtemp(prefix="_spill-", dir=self.root)
+        with open(os.path.join(self._spill_dir, f"{day:06d}.bin"), "ab") as f:
+            for part in parts:
+                records = np.empty(len(part["day"]), self.SPILL_FIELDS)
+                for name, _ in self.SPILL_FIELDS:
+                    records[name] = part[name]
+                records.tofile(f)
+
+    def _write_spilled(self):
+        # One Parquet part per spilled partition, read back one at a time
+        for day in sorted(self._rows):
+            path = os.path.join(self._spill_dir, f"{day:06d}.bin")
+            records = np.fromfile(path, self.SPILL_FIELDS)
+            self._writer(day).write_block({name: records[name] for name, _ in self.SPILL_FIELDS})
+            self._open.pop(day).close()
+            os.remove(path)
+        shutil.rmtree(self._spill_dir, ignore_errors=True)
+        self._spill_dir = None
+
+    def close(self):
+        self.flush()
+        while self._open:
+            self._open.popitem(last=False)[1].close()
+        if self._spill_dir is not None:
+            self._write_spilled()
+        self.write_manifest()
+
+    def write_manifest(self):
+        manifest_path = os.path.join(self.root, "_manifest.json")
+        previous = read_json(manifest_path) or {}
+        partitions = {entry["path"]: entry for entry in previous.get("partitions", [])}
+        for day, rows in self._rows.items():
+            directory = self.partition_dir(day)
+            files = sorted(name for name in os.listdir(directory) if name.startswith("part-"))
+            relative = os.path.relpath(directory, self.root).replace(os.sep, "/")
+            partitions[relative] = {
+                "path": relative,
+                "date": (self.ctx.start_date + datetime.timedelta(days=day)).isoformat(),
+                "files": files,
+                "rows": partitions.get(relative, {}).get("rows", 0) + rows,
+                "bytes": sum(os.path.getsize(os.path.join(directory, name)) for name in files),
+            }
+        entries = [partitions[path] for path in sorted(partitions)]
+        write_json_atomic(manifest_path, {
+            "table": os.path.basename(self.root),
+            "format": self.output_format,
+            "compression": self.compression,
+            "partition_keys": ["year", "month", "day"],
+            "total_rows": sum(entry["rows"] for entry in entries),
+            "total_bytes": sum(entry["bytes"] for entry in entries),
+            "partitions": entries,
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Rollup:
+    """
+    Sales count, units and revenue in cents per cell, kept only for the
+    cells with sales in them ({cell: [sales, units, cents]}), so memory and
+    the cost of an update follow the sales, not the size of the grid (days x
+    stores can be millions of cells). Revenue is summed in integer cents, so
+    the totals are exact.
+    """
+
+    def __init__(self):
+        self.totals = {}
+
+    def add(self, cell, quantity, revenue_cents, sales=1):
+        cell_totals = self.totals.get(cell)
+        if cell_totals is None:
+            self.totals[cell] = [sales, quantity, revenue_cents]
+        else:
+            cell_totals[0] += sales
+            cell_totals[1] += quantity
+            cell_totals[2] += revenue_cents
+
+    def add_many(self, cells, quantity, revenue_cents):
+        # NumPy arrays of cells, units and cents: summed per distinct cell of
+        # the block first, then one update per cell
+        unique, inverse = np.unique(cells, return_inverse=True)
+        sales = np.bincount(inverse, minlength=unique.size)
+        units = np.bincount(inverse, weights=quantity, minlength=unique.size).astype(np.int64)
+        cents = np.bincount(inverse, weights=revenue_cents, minlength=unique.size).astype(np.int64)
+        add = self.add
+        for cell, n, q, r in zip(unique.tolist(), sales.tolist(), units.tolist(), cents.tolist()):
+            add(cell, q, r, n)
+
+    def merge(self, other):
+        for cell, (n, q, r) in other.totals.items():
+            self.add(cell, q, r, n)
+
+    def cells(self):
+        # (cell, sales, units, cents) of every cell with sales in it, by cell
+        return [(cell, n, q, r) for cell, (n, q, r) in sorted(self.totals.items())]
+
+    def state(self):
+        # A copy as [cell, sales, units, cents] rows
+        return [list(row) for row in self.cells()]
+
+    def load_state(self, state):
+        self.totals = {cell: [n, q, r] for cell, n, q, r in state}
+
+
+def format_cents(cents):
+    return f"{cents // 100}.{cents % 100:02d}"
+
+
+class SalesRollups:
+    """
+    The rollup tables of one run, kept up to date sale by sale (add) or
+    block by block (add_block): day x store, month x category and campaign
+    (0 = no campaign). Cells are indexed day * stores + store and
+    month * categories + category, months counted from the first month of
+    the sales window.
+    """
+
+    def __init__(self, ctx):
+        self.ctx = ctx
+        self.num_stores = len(ctx.stores)
+        self.categories = sorted(ctx.cat_map)
+        category_slot = {cat_id: slot for slot, cat_id in enumerate(self.categories)}
+        self.product_category = [category_slot[p[2]] for p in ctx.products]
+        start = ctx.start_date
+        self.month_of_day = []
+        for d in range(ctx.delta_days):
+            day = start + datetime.timedelta(days=d)
+            self.month_of_day.append((day.year - start.year) * 12 + day.month - start.month)
+        self.num_months = self.month_of_day[-1] + 1
+        self._arrays = None  # NumPy copies of month_of_day and product_category for add_block
+        self.day_store = Rollup()
+        self.month_category = Rollup()
+        self.campaign = Rollup()
+
+    def tables(self):
+        return {"day_store": self.day_store, "month_category": self.month_category, "campaign": self.campaign}
+
+    def add(self, day, store, product, quantity, revenue_cents, campaign):
+        self.day_store.add(day * self.num_stores + store, quantity, revenue_cents)
+        self.month_category.add(self.month_of_day[day] * len(self.categories) + self.product_category[product],
+                                quantity, revenue_cents)
+        self.campaign.add(campaign, quantity, revenue_cents)
+
+    def add_sales(self, sales):
+        # A batch of write_sale() argument tuples; with NumPy, folded in as one block
+        if np is None:
+            for day, _, product, _, quantity, revenue, store, campaign in sales:
+                self.add(day, store, product, quantity, round(revenue * 100), campaign)
+            return
+        day, _, product, _, quantity, revenue, store, campaign = (np.array(column) for column in zip(*sales))
+        self.add_block({"day": day, "store": store, "product": product, "quantity": quantity,
+                        "revenue_cents": np.rint(revenue * 100).astype(np.int64), "campaign": campaign})
+
+    def add_block(self, block):
+        if self._arrays is None:
+            self._arrays = np.array(self.month_of_day), np.array(self.product_category)
+        month_of_day, product_category = self._arrays
+        quantity, revenue = block["quantity"], block["revenue_cents"]
+        self.day_store.add_many(block["day"] * self.num_stores + block["store"], quantity, revenue)
+        month_cells = month_of_day[block["day"]] * len(self.categories) + product_category[block["product"]]
+        self.month_category.add_many(month_cells, quantity, revenue)
+        self.campaign.add_many(block["campaign"], quantity, revenue)
+
+    def merge(self, other):
+        for name, rollup in self.tables().items():
+            rollup.merge(other.tables()[name])
+
+    def state(self):
+        # Copies as plain lists, for checkpoints and for sending shard totals between
+        # processes (a pipelined checkpoint is saved while the totals keep growing)
+        return {name: rollup.state() for name, rollup in self.tables().items()}
+
+    def load_state(self, state):
+        for name, rollup in self.tables().items():
+            rollup.load_state(state[name])
+
+    def rows(self):
+        """
+        {file: (key header, {key: [sales, units, cents]})} for the rollup
+        files; keys are absolute dates and months, so totals of different
+        runs (e.g. incremental ones) can be added up.
+        """
+        ctx, num_categories = self.ctx, len(self.categories)
+        start = ctx.start_date
+        daily = {}
+        for cell, n, q, r in self.day_store.cells():
+            day, store = divmod(cell, self.num_stores)
+            daily[(ctx.date_strs[day], store + 1, ctx.stores[store][0])] = [n, q, r]
+        monthly = {}
+        for cell, n, q, r in self.month_category.cells():
+            month, slot = divmod(cell, num_categories)
+            year, month = divmod(start.year * 12 + start.month - 1 + month, 12)
+            cat_id = self.categories[slot]
+            monthly[(f"{year:04d}-{month + 1:02d}", cat_id, ctx.cat_map[cat_id])] = [n, q, r]
+        campaigns = {(c, ([""] + CAMPAIGN_NAMES)[c]): [n, q, r] for c, n, q, r in self.campaign.cells()}
+        return {
+            "rollup_daily_store_O1.csv": (["date", "store_id", "store_name"], daily),
+            "rollup_monthly_category_O1.csv": (["month", "category_id", "category_name"], monthly),
+            "rollup_campaign_O1.csv": (["campaign_id", "campaign"], campaigns),
+        }
+
+    def write(self, merge=False):
+        # Write the rollup files; with `merge`, add to the totals already in them
+        for path, (key_header, totals) in self.rows().items():
+            if merge and os.path.exists(path):
+                with open(path, newline='', encoding='utf-8') as f:
+                    for row in list(csv.reader(f))[1:]:
+                        key = tuple(int(value) if value.isdigit() else value for value in row[:len(key_header)])
+                        n, q, revenue = row[len(key_header):len(key_header) + 3]
+                        whole, cents = revenue.split(".")
+                        previous = [int(n), int(q), int(whole) * 100 + int(cents)]
+                        totals[key] = [a + b for a, b in zip(totals.get(key, [0, 0, 0]), previous)]
+            header = key_header + ["sales", "quantity", "revenue"]
+            rows = [list(key) + [n, q, format_cents(r)] for key, (n, q, r) in sorted(totals.items())]
+            if path == "rollup_campaign_O1.csv":
+                # Revenue per sale, and its change against sales without a campaign
+                header += ["revenue_per_sale", "uplift"]
+                no_campaign = totals.get((0, ""))
+                base_rate = no_campaign[2] / no_campaign[0] if no_campaign else None
+                for row in rows:
+                    rate = int(row[-1].replace(".", "")) / row[-3]
+                    row += [f"{rate / 100:.2f}", f"{rate / base_rate - 1:.4f}" if base_rate else ""]
+            with open(path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                writer.writerows(rows)
+
+
+class SalesStatistics:
+    """
+    Summary statistics of the sales rows (stream_stats.SalesStats), fed
+    with the same batches and blocks as SalesRollups. Prices and revenue
+    are in currency units, products and stores counted by name.
+    """
+
+    def __init__(self, ctx, path=None):
+        self.path = path or SUMMARY_STATS_PATH
+        self.product_names = [p[1] for p in ctx.products]
+        self.store_names = [st[0] for st in ctx.stores]
+        self.stats = SalesStats(seed=RANDOM_SEED)
+
+    def _add_counts(self, name, names, counts):
+        # {index: rows} -> rows per name
+        by_name = defaultdict(int)
+        for idx, n in counts:
+            by_name[names[idx]] += n
+        self.stats.add_counts(name, by_name)
+
+    def add_sales(self, sales):
+        # A batch of write_sale() argument tuples
+        _, _, product, unit_price, quantity, revenue, store, _ = zip(*sales)
+        self.stats.add_columns(unit_price, quantity, revenue)
+        self._add_counts("product", self.product_names, Counter(product).items())
+        self._add_counts("store", self.store_names, Counter(store).items())
+
+    def add_block(self, block):
+        self.stats.add_columns((block["price_cents"] / 100).tolist(), block["quantity"].tolist(),
+                               (block["revenue_cents"] / 100).tolist())
+        for name, names in (("product", self.product_names), ("store", self.store_names)):
+            counts = np.bincount(block[name], minlength=len(names)).tolist()
+            self._add_counts(name, names, ((idx, n) for idx, n in enumerate(counts) if n))
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+
+    def state(self):
+        return self.stats.state()
+
+    def load_state(self, state):
+        self.stats.load_state(state)
+
+    def write(self, merge=False):
+        # Write the report; with `merge`, the sketches of an earlier report are merged in first.
+        # The report keeps the sketch state for that, next to the figures
+        if merge and os.path.exists(self.path):
+            previous = SalesStats(seed=RANDOM_SEED)
+            previous.load_state(read_json(self.path)["state"])
+            self.stats.merge(previous)
+        report = self.stats.report()
+        write_json_atomic(self.path, dict(report, state=self.stats.state()))
+        revenue = report["columns"]["revenue"]
+        print(f"Summary statistics of {report['rows']} sales written to {self.path} "
+              f"(revenue mean {revenue['mean']:.2f}, median {revenue['quantiles']['p50']})")
+        return report
+
+
+# Running summaries of the sales, by the name their state is stored under
+SUMMARY_TYPES = {"rollups": SalesRollups, "stats": SalesStatistics}
+
+
+def summary_names():
+    return [name for name, enabled in (("rollups", ROLLUPS), ("stats", SUMMARY_STATS)) if enabled]
+
+
+def sales_summaries(ctx, names=None):
+    # name -> empty summary, for the summaries enabled in the settings or listed in `names`
+    return {name: SUMMARY_TYPES[name](ctx) for name in (summary_names() if names is None else names)}
+
+
+def write_summaries(summaries, merge=False):
+    for summary in summaries.values():
+        summary.write(merge=merge)
+
+
+def output_path(base, output_format=None, compression=None):
+    # File name for an output table in the configured format
+    output_format = output_format or OUTPUT_FORMAT
+    if output_format == 'parquet':
+        return f"{base}.parquet"
+    if output_format == 'binary':
+        return f"{base}.bin"
+    if output_format == 'sqlite':
+        return SQLITE_PATH  # one database for all tables
+    return compressed_path(f"{base}.csv", compression)
+
+
+def sqlite_table(base):
+    # 'sales_data_O1' -> 'sales', 'stores_O1' -> 'stores'
+    return 'sales' if base == 'sales_data_O1' else base.removesuffix('_O1')
+
+
+def dimension_format():
+    # Dimension tables go next to Parquet or SQLite sales, in CSV otherwise
+    return OUTPUT_FORMAT if OUTPUT_FORMAT in ('parquet', 'sqlite') else 'csv'
+
+
+def star_schema():
+    # Binary sales only carry ids, so they always come with the star-schema dimensions
+    return STAR_SCHEMA or OUTPUT_FORMAT == 'binary'
+
+
+def open_sales_writer(base, ctx, output_format=None, compression=None, header=True, pipelined=False,
+                      append=False, partitioned=False, star=None, summaries=None):
+    # Sales writer for `base` + the extension of the output format,
+    # or for the directory `base` in partitioned mode; sales are added
+    # to the `summaries` (see sales_summaries) if given
+    if partitioned:
+        writer = PartitionedSalesWriter(base, ctx, output_format, compression, star=star)
+    elif (output_format or OUTPUT_FORMAT) == 'parquet':
+        if append:
+            raise RuntimeError("Parquet sales files cannot be appended to")
+        writer = ParquetSalesWriter(output_path(base, 'parquet'), ctx, star)
+    elif (output_format or OUTPUT_FORMAT) == 'binary':
+        writer = BinarySalesWriter(output_path(base, 'binary'), ctx, append=append)
+    elif (output_format or OUTPUT_FORMAT) == 'sqlite':
+        writer = SQLiteSalesWriter(output_path(base, 'sqlite'), ctx, star, append=append)
+    else:
+        writer = CsvSalesWriter(output_path(base, 'csv'), ctx, compression, header,
+                                buffer_size=WRITE_BUFFER_SIZE if pipelined else None, append=append, star=star)
+    if pipelined:
+        writer = PipelinedSalesWriter(writer, fsync_interval=FSYNC_INTERVAL)
+    if summaries:
+        writer = SummarySalesWriter(writer, summaries)
+    return writer
+
+
+def write_dimension(base, header, rows):
+    # Write a dimension table (categories, products, stores) in the configured format
+    path = output_path(base, dimension_format())
+    rows = [list(row) for row in rows]
+    if dimension_format() == 'sqlite':
+        table = sqlite_table(base)
+        with SQLiteLoader(path) as loader:
+            loader.create_table(table, column_types(header, rows))
+            loader.insert_many(table, rows)
+        return path
+    if dimension_format() == 'parquet':
+        if pa is None:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        columns = list(zip(*rows)) if rows else [[] for _ in header]
+        pq.write_table(pa.table({name: list(col) for name, col in zip(header, columns)}), path)
+        return path
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    return path
+
+
+def run_fingerprint(ctx):
+    # Settings and dimension data a checkpoint is only valid for.
+    # The dimensions are hashed in slices: with a million products their
+    # repr in one piece would be a few hundred MB
+    dimensions = hashlib.blake2b(repr((ctx.start_date, ctx.delta_days)).encode(), digest_size=16)
+    sampler = ctx.product_sampler
+    if isinstance(sampler, ZipfPopularity):
+        dimensions.update(repr(sampler.state()).encode())
+        tables = (ctx.stores, ctx.products)
+    else:
+        tables = (ctx.stores, ctx.products, sampler.prob, sampler.alias)
+    for table in tables:
+        for start in range(0, len(table), 10000):
+            dimensions.update(repr(table[start:start + 10000]).encode())
+    return {
+        "num_records": NUM_SALES_RECORDS,
+        "seed": RANDOM_SEED,
+        "vectorized": VECTORIZED,
+        "vector_block_size": VECTOR_BLOCK_SIZE if VECTORIZED and not COUNTER_RNG else None,
+        "counter_rng": COUNTER_RNG,
+        "compression": COMPRESSION,
+        "checkpoint_interval": CHECKPOINT_INTERVAL,
+        "star_schema": STAR_SCHEMA,
+        "rollups": ROLLUPS,
+        "summary_stats": SUMMARY_STATS,
+        "sorted_output": SORTED_OUTPUT,
+        "dimensions": dimensions.hexdigest(),
+    }
+
+
+def write_json_atomic(path, data):
+    # Atomic replace: a crash leaves either the old file or the new one
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=1)
+        fsync_file(f)
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_sales(ctx, resume=False):
+    # Single-process sales generation, checkpointed if CHECKPOINT_INTERVAL is set
+    sales_path = output_path('sales_data_O1', compression=COMPRESSION)
+    checkpoint_path = sales_path + CHECKPOINT_SUFFIX
+    if (CHECKPOINT_INTERVAL or resume) and (OUTPUT_FORMAT != 'csv' or PARTITIONED):
+        raise RuntimeError("Checkpoints need a single CSV sales file")
+    if PARTITIONED and os.path.isdir('sales_data_O1'):
+        shutil.rmtree('sales_data_O1')  # a full run replaces the whole table
+
+    fingerprint = run_fingerprint(ctx)
+    state = read_json(checkpoint_path) if resume else None
+    start, rng_state = 0, None
+    if resume and state is None:
+        print(f"No checkpoint found at {checkpoint_path}, starting from the beginning")
+    if state is not None:
+        changed = [key for key in fingerprint if state.get(key) != fingerprint[key]]
+        if changed:
+            raise RuntimeError(f"{checkpoint_path} was written with different settings ({', '.join(changed)}), "
+                               f"cannot resume")
+        if not os.path.exists(sales_path) or os.path.getsize(sales_path) < state["file_offset"]:
+            raise RuntimeError(f"{sales_path} is shorter than its checkpoint, cannot resume")
+        os.truncate(sales_path, state["file_offset"])
+        start, rng_state = state["rows"], state["rng_state"]
+        print(f"Resuming {sales_path} after {start} sales records")
+
+    summaries = sales_summaries(ctx)
+    if state is not None:
+        for name, summary in summaries.items():
+            summary.load_state(state["summaries"][name])
+
+    with open_sales_writer('sales_data_O1', ctx, compression=COMPRESSION, header=state is None,
+                           pipelined=PIPELINED, append=state is not None, partitioned=PARTITIONED,
+                           summaries=summaries) as writer:
+        def save_checkpoint(rows, rng_state):
+            writer.checkpoint(dict(fingerprint, rows=rows, rng_state=rng_state))
+
+        checkpoint = save_checkpoint if CHECKPOINT_INTERVAL else None
+
+        if COUNTER_RNG:
+            write_sales_counter(writer, NUM_SALES_RECORDS, ctx, counter_seed(RANDOM_SEED), start=start,
+                                checkpoint=checkpoint)
+        elif VECTORIZED:
+            write_sales_vectorized(writer, NUM_SALES_RECORDS, ctx, RANDOM_SEED, start=start,
+                                   rng_state=rng_state, checkpoint=checkpoint)
+        else:
+            if rng_state is not None:
+                version, internal, gauss_next = rng_state
+                random.setstate((version, tuple(internal), gauss_next))
+            write_sales_rows(writer, NUM_SALES_RECORDS, ctx, start=start, checkpoint=checkpoint)
+
+    write_summaries(summaries)
+
+    # The run is complete, nothing left to resume (sorting rewrites the file,
+    # so the checkpoint goes first)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    if SORTED_OUTPUT:
+        sort_sales_file(sales_path, COMPRESSION)
+
+
+def sort_sales_file(path, compression=None, header=True):
+    # Sort the CSV sales file at `path` by date and time, in place and in bounded memory
+    sorted_path = path + '.sorting'
+    with open_sales_input(path, compression, encoding='utf-8') as f_in, \
+            open_sales_output(sorted_path, compression, encoding='utf-8') as f_out:
+        if header:
+            f_out.write(f_in.readline())
+        rows = sort_lines(f_in, f_out, run_bytes=SORT_RUN_BYTES, temp_dir=SORT_TEMP_DIR)
+    os.replace(compressed_path(sorted_path, compression), path)
+    print(f"Sorted {rows} sales records in {path} by date and time")
+
+
+def merge_sorted_parts(part_paths, path, compression=None):
+    # k-way merge of time-sorted CSV part files into `path`; only the first part has the header
+    merged_path = path + '.merging'
+    files = [open_sales_input(part, compression, encoding='utf-8') for part in part_paths]
+    try:
+        with open_sales_output(merged_path, compression, encoding='utf-8') as f_out:
+            f_out.write(files[0].readline())
+            merge_sorted(files, f_out)
+    finally:
+        for f in files:
+            f.close()
+    os.replace(compressed_path(merged_path, compression), path)
+
+
+def read_dimension(base):
+    # Rows of a dimension table written by write_dimension(), without the header
+    path = output_path(base, dimension_format())
+    if not os.path.exists(path):
+        raise RuntimeError(f"{path} not found; run a full generation first")
+    if dimension_format() == 'sqlite':
+        return read_table(path, sqlite_table(base))
+    if dimension_format() == 'parquet':
+        if pa is None:
+            raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)")
+        table = pq.read_table(path)
+        return [list(row.values()) for row in table.to_pylist()]
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))[1:]
+
+
+def _number(value):
+    # Prices were written from ints or floats; read them back the same way
+    value = str(value)
+    return int(value) if value.lstrip('-').isdigit() else float(value)
+
+
+def load_dimensions():
+    """
+    Reload the categories, products, stores and popularity weights of an
+    earlier run, in the shapes expand_products_and_categories(),
+    generate_stores() and main() build them. POPULARITY_MODEL says which
+    weights to read, so it must match the setting of that run.
+    """
+    cat_map = {int(cat_id): name for cat_id, name in read_dimension('categories_O1')}
+    products = [(int(pid), name, int(cat_id), _number(pmin), _number(pmax))
+                for pid, name, cat_id, pmin, pmax in read_dimension('products_O1')]
+    # Star-schema store files start with the store_id, which is the position + 1
+    stores = [tuple(row[1:] if star_schema() else row) for row in read_dimension('stores_O1')]
+    if POPULARITY_MODEL == 'zipf':
+        if not os.path.exists(POPULARITY_MODEL_PATH):
+            raise RuntimeError(f"{POPULARITY_MODEL_PATH} not found; run a full generation with "
+                               "POPULARITY_MODEL = 'zipf' first")
+        product_popularity = ZipfPopularity.from_state(read_json(POPULARITY_MODEL_PATH), [p[2] for p in products])
+    elif POPULARITY_MODEL == 'random':
+        product_popularity = {int(pid): int(score) for pid, score in read_dimension('product_popularity_O1')}
+    else:
+        raise ValueError(f"Unknown POPULARITY_MODEL {POPULARITY_MODEL!r}, expected 'random' or 'zipf'")
+    return cat_map, products, stores, product_popularity
+
+
+def derive_seed(master_seed, *path):
+    # 64-bit seed from the master seed and a path of labels, e.g. ("shard", 3)
+    key = "/".join(str(part) for part in (master_seed,) + path)
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+def counter_seed(master_seed):
+    # Seed of the counter-based sales rows of a full run
+    return derive_seed(master_seed, "rows")
+
+
+def shard_seed_path(shard_index):
+    """
+    Labels the seed of a shard is derived from (see derive_seed). Sequential
+    shards get independent streams from the master seed and the shard index
+    only (in the spirit of NumPy's SeedSequence.spawn), so a shard's seed
+    never depends on how the others are scheduled; counter-based shards are
+    row ranges of one sequence.
+    """
+    return ("rows",) if COUNTER_RNG else ("shard", shard_index)
+
+
+def shard_sizes(num_records, num_shards):
+    # Split the record count as evenly as possible, larger shards first
+    base, extra = divmod(num_records, num_shards)
+    return [base + (1 if i < extra else 0) for i in range(num_shards)]
+
+
+def shard_part_base(shard_index):
+    return f"sales_data_O1.part-{shard_index:05d}"
+
+
+def _generate_shard(ctx, shard_index, num_records, seed, vectorized, output_format, compression, header, star,
+                    summary_names, first_row=None, sort_output=False):
+    # Worker entry point: write one shard to its own part file (with
+    # `first_row`: rows first_row.. of the counter-based run seeded `seed`),
+    # sorted by date and time with `sort_output`.
+    # Returns the path and the state of the shard's summaries (by name)
+    summaries = sales_summaries(ctx, summary_names)
+    with open_sales_writer(shard_part_base(shard_index), ctx, output_format, compression, header,
+                           star=star, summaries=summaries) as writer:
+        if first_row is not None:
+            write_sales_counter(writer, first_row + num_records, ctx, seed, progress=False, start=first_row)
+        elif vectorized:
+            write_sales_vectorized(writer, num_records, ctx, seed, progress=False)
+        else:
+            write_sales_rows(writer, num_records, ctx, rng=random.Random(seed), progress=False)
+    if sort_output:
+        sort_sales_file(writer.path, compression, header)
+    return writer.path, {name: summary.state() for name, summary in summaries.items()}
+
+
+def concatenate_parts(part_paths, path):
+    # Join part files in order. CSV parts (plain or compressed) are simply
+    # appended byte for byte, only the first one carries the header; binary
+    # parts get one header for all records; Parquet parts are copied one row
+    # group at a time so memory stays bounded
+    if path.endswith('.bin'):
+        concatenate_binary(part_paths, path)
+        return
+    if path.endswith('.parquet'):
+        writer = None
+        for part in part_paths:
+            part_file = pq.ParquetFile(part)
+            if writer is None:
+                schema = part_file.schema_arrow
+                writer = pq.ParquetWriter(path, schema, use_dictionary=[
+                    name for name in schema.names if name in PARQUET_DICTIONARY_COLUMNS])
+            for group in range(part_file.num_row_groups):
+                writer.write_table(part_file.read_row_group(group))
+        if writer is not None:
+            writer.close()
+        return
+
+    with open(path, 'wb') as f_sales:
+        for part in part_paths:
+            with open(part, 'rb') as f_part:
+                shutil.copyfileobj(f_part, f_sales, 1024 * 1024)
+
+
+def write_sales_sharded(ctx, num_records, num_shards, master_seed):
+    # Generate the shards in a process pool, then concatenate them in shard order.
+    # Counter-based shards are consecutive row ranges of one run
+    sizes = shard_sizes(num_records, num_shards)
+    first_rows = [sum(sizes[:idx]) for idx in range(num_shards)]
+    with ProcessPoolExecutor(max_workers=PARALLEL_WORKERS) as pool:
+        futures = [
+            # Part files are self-contained when kept; otherwise only the first has the header
+            pool.submit(_generate_shard, ctx, idx, size, derive_seed(master_seed, *shard_seed_path(idx)),
+                        VECTORIZED, OUTPUT_FORMAT, COMPRESSION, KEEP_PART_FILES or idx == 0, STAR_SCHEMA,
+                        summary_names(), first_rows[idx] if COUNTER_RNG else None, SORTED_OUTPUT)
+            for idx, size in enumerate(sizes)
+        ]
+        part_paths = []
+        summaries = sales_summaries(ctx)
+        for idx, future in enumerate(futures):
+            path, shard_states = future.result()
+            part_paths.append(path)
+            for name, summary in summaries.items():
+                shard_summary = SUMMARY_TYPES[name](ctx)
+                shard_summary.load_state(shard_states[name])
+                summary.merge(shard_summary)
+            print(f"Shard {idx + 1}/{num_shards} done ({sizes[idx]} sales records)")
+
+    write_summaries(summaries)
+
+    if KEEP_PART_FILES:
+        return part_paths
+
+    sales_path = output_path('sales_data_O1', compression=COMPRESSION)
+    if SORTED_OUTPUT:
+        merge_sorted_parts(part_paths, sales_path, COMPRESSION)
+    else:
+        concatenate_parts(part_paths, sales_path)
+    for path in part_paths:
+        os.remove(path)
+    return [sales_path]
+
+
+def write_sales_shard(ctx, shard_index, shard_count, dimension_paths):
+    """
+    Write shard `shard_index` of `shard_count` of the full run and its
+    manifest, for runs spread over several machines. The part file has the
+    same bytes as in a NUM_SHARDS = shard_count run (only shard 0 has the CSV
+    header), so the merged parts are the same as that run's sales file.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise ValueError(f"Shard index {shard_index} is outside 0..{shard_count - 1}")
+    sizes = shard_sizes(NUM_SALES_RECORDS, shard_count)
+    first_row, rows = sum(sizes[:shard_index]), sizes[shard_index]
+    seed_path = shard_seed_path(shard_index)
+    seed = derive_seed(RANDOM_SEED, *seed_path)
+    path, summary_states = _generate_shard(ctx, shard_index, rows, seed, VECTORIZED, OUTPUT_FORMAT, COMPRESSION,
+                                           shard_index == 0, STAR_SCHEMA, summary_names(),
+                                           first_row if COUNTER_RNG else None, SORTED_OUTPUT)
+    manifest = shard_manifest(path, shard_index, shard_count, first_row, rows, NUM_SALES_RECORDS,
+                              {"master_seed": RANDOM_SEED, "path": list(seed_path), "seed": seed},
+                              dict(run_fingerprint(ctx), output_format=OUTPUT_FORMAT),
+                              dimension_paths, summaries=summary_states)
+    write_json_atomic(manifest_path(shard_part_base(shard_index)), manifest)
+    print(f"Shard {shard_index + 1}/{shard_count} done (sales records {first_row}..{first_row + rows - 1})")
+    return path
+
+
+def merge_shards():
+    """
+    Verify the shard parts and manifests in the current directory (written
+    by --shard-index/--shard-count runs) and concatenate them into the
+    sales file. Summaries of the shards are merged and written as well.
+    Returns the path of the sales file.
+    """
+    manifests = verify_shards(read_manifests('.', 'sales_data_O1.part-'))
+    run = manifests[0]["run"]
+    sales_path = output_path('sales_data_O1', run["output_format"], run["compression"])
+    part_paths = [manifest["part"] for manifest in manifests]
+    if run["sorted_output"]:
+        merge_sorted_parts(part_paths, sales_path, run["compression"])
+    else:
+        concatenate_parts(part_paths, sales_path)
+
+    names = list(manifests[0]["summaries"])
+    if names:
+        cat_map, products, stores, product_popularity = load_dimensions()
+        ctx = SalesContext(stores, products, cat_map, product_popularity, SALES_START_DATE, SALES_END_DATE)
+        summaries = sales_summaries(ctx, names)
+        for manifest in manifests:
+            for name, summary in summaries.items():
+                shard_summary = SUMMARY_TYPES[name](ctx)
+                shard_summary.load_state(manifest["summaries"][name])
+                summary.merge(shard_summary)
+        write_summaries(summaries)
+
+    if not KEEP_PART_FILES:
+        for manifest in manifests:
+            os.remove(manifest["part"])
+            os.remove(manifest_path(shard_part_base(manifest["shard_index"])))
+    print(f"Merged {len(manifests)} shards ({manifests[0]['total_rows']} sales records) into {sales_path}")
+    return sales_path
+
+
+def incremental_records(start_date, end_date):
+    # Same sales per day as a full run over SALES_START_DATE..SALES_END_DATE
+    full_days = (SALES_END_DATE - SALES_START_DATE).days + 1
+    new_days = (end_date - start_date).days + 1
+    return max(1, round(NUM_SALES_RECORDS * new_days / full_days))
+
+
+def generate_incremental(start_date, end_date, num_records=None, output=None):
+    """
+    Add sales for start_date..end_date to an existing data set without
+    regenerating (or reading) the existing sales. The work done is
+    proportional to the new rows only. The seed comes from RANDOM_SEED and
+    the date range, so regenerating the same range gives the same rows.
+    Returns the path written to.
+    """
+    if end_date < start_date:
+        raise ValueError(f"Empty date range {start_date}..{end_date}")
+    output = output or INCREMENTAL_OUTPUT
+    if output not in ('append', 'partition'):
+        raise ValueError(f"Unknown INCREMENTAL_OUTPUT {output!r}, expected 'append' or 'partition'")
+    if num_records is None:
+        num_records = incremental_records(start_date, end_date)
+
+    cat_map, products, stores, product_popularity = load_dimensions()
+    ctx = SalesContext(stores, products, cat_map, product_popularity, start_date, end_date)
+    seed = derive_seed(RANDOM_SEED, "range", start_date.isoformat(), end_date.isoformat())
+
+    if PARTITIONED:
+        # New days become new partitions of the sales_data_O1 table
+        base, append = 'sales_data_O1', False
+    elif output == 'partition':
+        base, append = f"sales_data_O1.{start_date:%Y%m%d}-{end_date:%Y%m%d}", False
+    else:
+        base, append = 'sales_data_O1', True
+    if OUTPUT_FORMAT == 'sqlite':
+        base, append = 'sales_data_O1', True  # new rows always go into the sales table
+    elif append and OUTPUT_FORMAT == 'parquet':
+        raise RuntimeError("Parquet sales files cannot be appended to; use INCREMENTAL_OUTPUT = 'partition'")
+    # A new file (or an empty one) gets the header, an existing one just more rows
+    path = output_path(base, compression=COMPRESSION)
+    header = not (append and os.path.exists(path) and os.path.getsize(path) > 0)
+
+    summaries = sales_summaries(ctx)
+    with open_sales_writer(base, ctx, compression=COMPRESSION, header=header, pipelined=PIPELINED,
+                           append=append, partitioned=PARTITIONED, summaries=summaries) as writer:
+        if COUNTER_RNG:
+            write_sales_counter(writer, num_records, ctx, seed)
+        elif VECTORIZED:
+            write_sales_vectorized(writer, num_records, ctx, seed)
+        else:
+            write_sales_rows(writer, num_records, ctx, rng=random.Random(seed))
+    write_summaries(summaries, merge=True)
+
+    print(f"Added {num_records} sales records for {start_date}..{end_date} to {writer.path}")
+    return writer.path
+
+
+def generate_rows(start, stop, ctx=None):
+    """
+    Sales rows start..stop-1 (0-based, header not counted) of the full
+    counter-based run, as lists of strings like csv.reader() gives them
+    from the sales file. Nothing before `start` is generated, so this takes
+    time proportional to stop - start. Without `ctx` the dimensions of the
+    existing data set are loaded.
+    """
+    if not COUNTER_RNG:
+        raise RuntimeError("generate_rows() needs COUNTER_RNG = True; sequential runs can only be replayed "
+                           "from the first row")
+    if not 0 <= start <= stop:
+        raise ValueError(f"Invalid row range {start}..{stop}")
+    if ctx is None:
+        cat_map, products, stores, product_popularity = load_dimensions()
+        ctx = SalesContext(stores, products, cat_map, product_popularity, SALES_START_DATE, SALES_END_DATE)
+    rows = []
+    for block_start in range(start, stop, VECTOR_BLOCK_SIZE):
+        block = generate_sales_range(ctx, counter_seed(RANDOM_SEED), block_start,
+                                     min(block_start + VECTOR_BLOCK_SIZE, stop))
+        rows.extend(csv.reader(io.StringIO(format_sales_block(block, ctx, star_schema()), newline='')))
+    return rows
+
+
+def main(resume=False, shard=None):
+    # shard: (index, count) to write only that shard of a multi-machine run
+    random.seed(RANDOM_SEED)  # For reproducibility if desired
+
+    if SCALED_DIMENSIONS:
+        # NUM_STORES stores and NUM_PRODUCTS products, unique names by construction
+        stores = generate_stores_scaled(NUM_STORES)
+        cat_map, products = generate_products_scaled(NUM_PRODUCTS)
+    else:
+        # Generate stores
+        stores = generate_stores(NUM_STORES)
+
+        # Expand categories and products
+        cat_map, products = expand_products_and_categories()
+
+    # Save categories to categories_O1.csv (or .parquet)
+    dimension_paths = [write_dimension('categories_O1', ["category_id", "category_name"], cat_map.items())]
 
     # Save products to products_O1.csv (product_id, product_name, category_id, min_price, max_price)
-    with open('products_O1.csv', 'w', newline='', encoding='utf-8') as f_prod:
-        writer = csv.writer(f_prod)
-        writer.writerow(["product_id", "product_name", "category_id", "min_price", "max_price"])
-        for p in products:
-            writer.writerow(p)
+    dimension_paths.append(write_dimension(
+        'products_O1', ["product_id", "product_name", "category_id", "min_price", "max_price"], products))
 
     # Save stores to stores_O1.csv
     # store name, city, state, country, continent
-    with open('stores_O1.csv', 'w', newline='', encoding='utf-8') as f_stores:
-        writer = csv.writer(f_stores)
-        writer.writerow(["store_name", "city", "state", "country", "continent"])
-        for store in stores:
-            writer.writerow(store)
-
-    # We'll build a product popularity weighting
-    # Let's say half of the products are top sellers with a higher probability
-    # We'll simply create a distribution by assigning random popularity scores.
-
-    product_popularity = {}
-    for pid, pname, cat_id, pmin, pmax in products:
-        # random popularity score 1-100, with some distribution
-        popularity_score = random.randint(1, 100)
-        product_popularity[pid] = popularity_score
-
-    # We'll also build a weighting for each store based on the country GDP so that
-    # stores in higher GDP countries appear more often in the dataset.
-    store_gdp_weights = []
-    for store in stores:
-        # store is (store_name, city, state, country, continent)
-        country = store[3]
-        gdp_val = COUNTRIES_GDP.get(country, 1.0)
-        store_gdp_weights.append(gdp_val)
-
-    total_store_weight = sum(store_gdp_weights)
+    # (star schema: store_id first, and the campaigns get a dimension of their own)
+    if star_schema():
+        dimension_paths.append(write_dimension(
+            'stores_O1', ["store_id", "store_name", "city", "state", "country", "continent"],
+            [(store_id,) + store for store_id, store in enumerate(stores, start=1)]))
+        dimension_paths.append(write_dimension(
+            'campaigns_O1', ["campaign_id", "campaign_name"], enumerate(CAMPAIGN_NAMES, start=1)))
+    else:
+        dimension_paths.append(write_dimension(
+            'stores_O1', ["store_name", "city", "state", "country", "continent"], stores))
+
+    if POPULARITY_MODEL == 'zipf':
+        # Zipf ranks with per-category top sellers; only the model parameters are saved
+        product_popularity = ZipfPopularity([p[2] for p in products], ZIPF_EXPONENT, TOP_SELLER_BOOST, TOP_SELLERS)
+        write_json_atomic(POPULARITY_MODEL_PATH, product_popularity.state())
+        dimension_paths.append(POPULARITY_MODEL_PATH)
+    elif POPULARITY_MODEL == 'random':
+        # We'll build a product popularity weighting
+        # Let's say half of the products are top sellers with a higher probability
+        # We'll simply create a distribution by assigning random popularity scores.
+
+        product_popularity = {}
+        for pid, pname, cat_id, pmin, pmax in products:
+            # random popularity score 1-100, with some distribution
+            popularity_score = random.randint(1, 100)
+            product_popularity[pid] = popularity_score
+
+        # Saved so incremental runs can reload the weights
+        dimension_paths.append(write_dimension(
+            'product_popularity_O1', ["product_id", "popularity"], product_popularity.items()))
+        if os.path.exists(POPULARITY_MODEL_PATH):
+            os.remove(POPULARITY_MODEL_PATH)  # left over from a Zipf run
+    else:
+        raise ValueError(f"Unknown POPULARITY_MODEL {POPULARITY_MODEL!r}, expected 'random' or 'zipf'")
+
+    # We'll pick random dates in a certain range, e.g., 1 year
+    # from Jan 1, 2024 to Dec 31, 2024 (SALES_START_DATE..SALES_END_DATE).
+    ctx = SalesContext(stores, products, cat_map, product_popularity, SALES_START_DATE, SALES_END_DATE)
 
     # We'll generate the sales_data_O1.csv now
     # date, time, product name, unit price, quantity, revenue, store name, optional sales campaign
+    if SORTED_OUTPUT and (OUTPUT_FORMAT != 'csv' or PARTITIONED):
+        raise RuntimeError("SORTED_OUTPUT needs a single CSV sales file (OUTPUT_FORMAT = 'csv', not partitioned)")
+    if shard is not None:
+        if resume or CHECKPOINT_INTERVAL or PARTITIONED or OUTPUT_FORMAT == 'sqlite' or NUM_SHARDS > 1:
+            raise RuntimeError("A shard of a multi-machine run cannot use checkpoints, --resume, partitioned or "
+                               "SQLite output or NUM_SHARDS > 1")
+        write_sales_shard(ctx, *shard, dimension_paths)
+    elif NUM_SHARDS > 1:
+        if resume or CHECKPOINT_INTERVAL or PARTITIONED or OUTPUT_FORMAT == 'sqlite':
+            raise RuntimeError("Checkpoints, --resume, partitioned and SQLite output need a single-process run "
+                               "(NUM_SHARDS = 1)")
+        write_sales_sharded(ctx, NUM_SALES_RECORDS, NUM_SHARDS, RANDOM_SEED)
+    else:
+        write_sales(ctx, resume)
 
-    # We'll pick random dates in a certain range, e.g., 1 year
-    # from Jan 1, 2024 to Dec 31, 2024.
-    start_date = datetime.date(2024, 1, 1)
-    end_date = datetime.date(2024, 12, 31)
-    delta_days = (end_date - start_date).days + 1
-
-    # Pre-generate date list for efficiency?
-    # or just pick random day offset
-
-    with open('sales_data_O1.csv', 'w', newline='', encoding='utf-8') as f_sales:
-        writer = csv.writer(f_sales)
-        writer.writerow(["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"])
-
-        for i in range(1, NUM_SALES_RECORDS + 1):
-            # pick a store with weighted probability
-            r = random.uniform(0, total_store_weight)
-            cumulative = 0.0
-            chosen_store_index = 0
-            for idx, weight in enumerate(store_gdp_weights):
-                cumulative += weight
-                if r <= cumulative:
-                    chosen_store_index = idx
-                    break
-            chosen_store = stores[chosen_store_index]
-
-            # pick a product with popularity weighting
-            # sum of popularity
-            total_popularity = sum(product_popularity.values())
-            r2 = random.uniform(0, total_popularity)
-            cum2 = 0.0
-            chosen_product = None
-            for p in products:
-                pid, pname, cat_id, pmin, pmax = p
-                cum2 += product_popularity[pid]
-                if r2 <= cum2:
-                    chosen_product = p
-                    break
-
-            if not chosen_product:
-                chosen_product = random.choice(products)
-            pid, pname, cat_id, pmin, pmax = chosen_product
-
-            # figure out date/time
-            day_offset = random.randint(0, delta_days - 1)
-            sale_date = start_date + datetime.timedelta(days=day_offset)
-            sale_time = datetime.time(
-                hour=random.randint(0, 23),
-                minute=random.randint(0, 59),
-                second=random.randint(0, 59)
-            )
-
-            # incorporate seasonality
-            month = sale_date.month
-            cat_name = cat_map[cat_id]
-            s_factor = seasonality_factor(cat_name, month)
-
-            # pick quantity in a realistic manner
-            # base quantity 1-3
-            # plus factor from seasonality
-            base_qty = random.randint(1, 3)
-            # scale up occasionally
-            if random.random() < 0.05:
-                base_qty += random.randint(1, 5)
-            quantity = int(round(base_qty * s_factor))
-            if quantity < 1:
-                quantity = 1
-
-            # pick a random unit price in [pmin, pmax]
-            unit_price = round(random.uniform(pmin, pmax), 2)
-
-            # campaign?
-            campaign = ""
-            if random.random() < CAMPAIGN_PROBABILITY:
-                campaign = random.choice(CAMPAIGN_NAMES)
-
-            # compute revenue
-            revenue = round(unit_price * quantity, 2)
-
-            # write the row
-            writer.writerow([
-                sale_date.isoformat(),
-                sale_time.strftime("%H:%M:%S"),
-                pname,
-                unit_price,
-                quantity,
-                revenue,
-                chosen_store[0],
-                campaign,
-            ])
-
-            # progress
-            if i % PROGRESS_INTERVAL == 0:
-                print(f"Generated {i} sales records...")
+    if OUTPUT_FORMAT == 'sqlite':
+        # Every table must hold exactly what was generated
+        expected = {"categories": len(cat_map), "products": len(products), "stores": len(stores),
+                    "sales": NUM_SALES_RECORDS}
+        counts = table_counts(SQLITE_PATH, expected)
+        wrong = [f"{table}: {counts[table]} rows, expected {rows}" for table, rows in expected.items()
+                 if counts[table] != rows]
+        if wrong:
+            raise RuntimeError(f"Row counts in {SQLITE_PATH} do not match: {'; '.join(wrong)}")
+        print(f"Verified row counts in {SQLITE_PATH}")
 
     # Summarize
     print("Generation complete.")
@@ -528,5 +2399,34 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the O1 sales data set.")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run from its last checkpoint")
+    parser.add_argument("--incremental", nargs=2, metavar=("START", "END"), type=datetime.date.fromisoformat,
+                        help="only add sales for START..END (YYYY-MM-DD) to the existing data set")
+    parser.add_argument("--records", type=int,
+                        help="with --incremental: number of sales records (default: same daily rate as a full run)")
+    parser.add_argument("--partition", action="store_true",
+                        help="with --incremental: write a new sales file instead of appending")
+    parser.add_argument("--shard-index", type=int,
+                        help="with --shard-count: only write this shard (0-based) of a multi-machine run")
+    parser.add_argument("--shard-count", type=int, help="number of shards of a multi-machine run")
+    parser.add_argument("--merge-shards", action="store_true",
+                        help="verify the shard parts and manifests in the current directory and merge them")
+    parser.add_argument("--rows", nargs=2, metavar=("START", "STOP"), type=int,
+                        help="print sales rows START..STOP-1 of the existing counter-based data set as CSV")
+    args = parser.parse_args()
+    if (args.shard_index is None) != (args.shard_count is None):
+        parser.error("--shard-index and --shard-count go together")
+    if args.rows:
+        csv.writer(sys.stdout).writerows(generate_rows(*args.rows))
+        sys.exit(0)
+    if args.merge_shards:
+        merge_shards()
+    elif args.incremental:
+        generate_incremental(*args.incremental, num_records=args.records,
+                             output='partition' if args.partition else None)
+    else:
+        main(resume=args.resume,
+             shard=None if args.shard_index is None else (args.shard_index, args.shard_count))
     print("\ndata generation by DataGeneration-o1.py")
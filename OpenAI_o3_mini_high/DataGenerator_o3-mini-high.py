@@ -1,12 +1,37 @@
 import csv
 import random
+from bisect import bisect
+from itertools import accumulate
 from datetime import datetime, timedelta
+import os
+import sys
+
+# Shared helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from external_sort import ExternalSorter
+from parallel_compress import open_sales_output
+from row_serializer import SalesRowSerializer, date_strings
+from scaled_dimensions import IdPermutation, id_space
+from stream_stats import SalesStats
 
 # -----------------------------
 # Configuration and Data Setup
 # -----------------------------
 
 NUM_SALES_RECORDS = 10000  # Total number of sales records to generate
+COMPRESSION = None  # Compress sales_data_O3MH.csv: None, "gzip", "zstd" or "bz2"
+SUMMARY_STATS = False  # Also write summary_stats_O3MH.json (see stream_stats.py)
+# Write the sales ordered by date and time: rows are sorted in runs of about
+# SORT_RUN_BYTES of memory, spilled to SORT_TEMP_DIR (None = the system's temp
+# dir) and merged into sales_data_O3MH.csv at the end (see external_sort.py)
+SORTED_OUTPUT = False
+SORT_RUN_BYTES = 256 * 1024 * 1024
+SORT_TEMP_DIR = None
+NUM_STORES = 45  # Number of stores to generate
+# Unique store names by construction (a number per store from a bijection, see
+# scaled_dimensions.py) instead of retried random suffixes; needed beyond a few
+# hundred stores
+SCALED_DIMENSIONS = False
 
 # Define categories with seasonal parameters (if any)
 categories = [
@@ -166,13 +191,6 @@ campaign_names = [
 # Helper Functions
 # -----------------------------
 
-def random_date(start, end):
-    """Return a random datetime between start and end."""
-    delta = end - start
-    int_delta = int(delta.total_seconds())
-    random_second = random.randrange(int_delta)
-    return start + timedelta(seconds=random_second)
-
 def generate_products(categories, product_definitions):
     """
     Build a list of product records. Each record is a dict with:
@@ -210,21 +228,21 @@ def generate_products(categories, product_definitions):
             prod_id += 1
     return products
 
+STORE_ADJECTIVES = ["Global", "Urban", "Modern", "Elite", "Prime", "Sunrise", "Aurora",
+                    "Epic", "Grand", "Metro", "Infinity", "Pioneer", "Cosmic", "Royal", "Dynamic"]
+STORE_NOUNS = ["Mart", "Store", "Outlet", "Emporium", "Depot", "Shop", "Corner", "Bazaar", "Market", "Express"]
+
 def generate_stores(num_stores, cities):
     """
     Generate a list of unique store records. Each record is a dict with:
     store_name, city, state, country, continent.
     Store names are created by combining a random adjective and noun.
     """
-    adjectives = ["Global", "Urban", "Modern", "Elite", "Prime", "Sunrise", "Aurora",
-                  "Epic", "Grand", "Metro", "Infinity", "Pioneer", "Cosmic", "Royal", "Dynamic"]
-    nouns = ["Mart", "Store", "Outlet", "Emporium", "Depot", "Shop", "Corner", "Bazaar", "Market", "Express"]
-
     stores = []
     used_names = set()
 
     while len(stores) < num_stores:
-        name = f"{random.choice(adjectives)} {random.choice(nouns)}"
+        name = f"{random.choice(STORE_ADJECTIVES)} {random.choice(STORE_NOUNS)}"
         # Ensure the store name is unique; if not, add a random number
         if name in used_names:
             name = f"{name} {random.randint(1,99)}"
@@ -241,6 +259,62 @@ def generate_stores(num_stores, cities):
         stores.append(store_record)
     return stores
 
+def generate_stores_scaled(num_stores, cities):
+    """
+    Like generate_stores, for any number of stores: each name gets a store
+    number from a bijection on 0..space-1, so names never collide and no
+    retries are needed. O(num_stores) time and memory.
+    """
+    space, _ = id_space(num_stores)
+    store_number = IdPermutation(space)
+    stores = []
+    for i in range(num_stores):
+        city_info = random.choice(cities)
+        stores.append({
+            "store_name": f"{random.choice(STORE_ADJECTIVES)} {random.choice(STORE_NOUNS)} #{store_number(i)}",
+            "city": city_info["city"],
+            "state": city_info["state"],
+            "country": city_info["country"],
+            "continent": city_info["continent"],
+        })
+    return stores
+
+class SeasonalSamplingCache:
+    """
+    Precomputed cumulative weight tables for weighted product and store picks.
+
+    Product weights only depend on the month, so the 12 month-specific tables
+    (popularity times seasonal multiplier) and the GDP-based store table are
+    built once. Each draw is then a single bisect, exactly like
+    random.choices() does internally, but without rebuilding the weights and
+    their cumulative sums on every call.
+    """
+
+    def __init__(self, products, stores):
+        self.products = products
+        self.stores = stores
+        self.product_cum_weights = {}
+        for month in range(1, 13):
+            prod_weights = []
+            for prod in products:
+                multiplier = prod["seasonal_multiplier"] if month in prod["seasonal_months"] else 1.0
+                prod_weights.append(prod["popularity"] * multiplier)
+            self.product_cum_weights[month] = list(accumulate(prod_weights))
+        self.store_cum_weights = list(accumulate(GDP_DICT.get(store["country"], 1) for store in stores))
+
+    @staticmethod
+    def _pick(population, cum_weights):
+        total = cum_weights[-1] + 0.0
+        return population[bisect(cum_weights, random.random() * total, 0, len(cum_weights) - 1)]
+
+    def choose_product(self, month):
+        """Pick a product weighted by popularity and the seasonal boost of `month`."""
+        return self._pick(self.products, self.product_cum_weights[month])
+
+    def choose_store(self):
+        """Pick a store weighted by the GDP of its country."""
+        return self._pick(self.stores, self.store_cum_weights)
+
 # -----------------------------
 # Main Generation Script
 # -----------------------------
@@ -248,7 +322,10 @@ def generate_stores(num_stores, cities):
 def main():
     # Generate product and store records
     products = generate_products(categories, product_definitions)
-    stores = generate_stores(45, cities)  # 45 unique stores
+    if SCALED_DIMENSIONS:
+        stores = generate_stores_scaled(NUM_STORES, cities)
+    else:
+        stores = generate_stores(NUM_STORES, cities)  # 45 unique stores by default
 
     # Write categories_O3MH.csv
     with open("categories_O3MH.csv", mode="w", newline="") as cat_file:
@@ -285,32 +362,31 @@ def main():
     # Prepare to generate sales data
     sales_start_date = datetime(2024, 1, 1, 0, 0, 0)
     sales_end_date = datetime(2024, 12, 31, 23, 59, 59)
+    sales_seconds = int((sales_end_date - sales_start_date).total_seconds())
+    sales_days = sales_seconds // 86400 + 1
+    day_months = [(sales_start_date + timedelta(days=d)).month for d in range(sales_days)]
     
-    # Pre-calculate store weights based on country GDP
-    store_weights = []
-    for store in stores:
-        weight = GDP_DICT.get(store["country"], 1)
-        store_weights.append(weight)
-
-    # Open sales_data_O3MH.csv for writing
-    with open("sales_data_O3MH.csv", mode="w", newline="") as sales_file:
+    # Pre-calculate the month-specific product tables and the store table based on country GDP
+    sampling_cache = SeasonalSamplingCache(products, stores)
+
+    # Open sales_data_O3MH.csv for writing (compressed in background threads if COMPRESSION is set)
+    with open_sales_output("sales_data_O3MH.csv", COMPRESSION) as sales_file, \
+            ExternalSorter(run_bytes=SORT_RUN_BYTES, temp_dir=SORT_TEMP_DIR) as sorter:
         writer = csv.writer(sales_file)
         writer.writerow(["date", "time", "product_name", "unit_price", "quantity", "revenue", "store_name", "campaign"])
+        # Rows go through the serializer: date/time strings come from lookup tables.
+        # For time-ordered output they are collected by the sorter instead
+        rows = SalesRowSerializer(sorter if SORTED_OUTPUT else sales_file, date_strings(sales_start_date, sales_days))
+        stats = SalesStats() if SUMMARY_STATS else None
 
         # Generate each sales record
         for i in range(1, NUM_SALES_RECORDS + 1):
-            # Choose a random sale datetime within 2024
-            sale_dt = random_date(sales_start_date, sales_end_date)
-            sale_date_str = sale_dt.strftime("%Y-%m-%d")
-            sale_time_str = sale_dt.strftime("%H:%M:%S")
-            month = sale_dt.month
+            # Choose a random sale second within 2024 (one draw over all its seconds), as day + second of day
+            sale_day, sale_second = divmod(random.randrange(sales_seconds), 86400)
+            month = day_months[sale_day]
 
-            # Determine effective weights for products based on base popularity and seasonal boost
-            prod_weights = []
-            for prod in products:
-                multiplier = prod["seasonal_multiplier"] if month in prod["seasonal_months"] else 1.0
-                prod_weights.append(prod["popularity"] * multiplier)
-            chosen_product = random.choices(products, weights=prod_weights, k=1)[0]
+            # Pick a product using the cached weights (base popularity and seasonal boost) for this month
+            chosen_product = sampling_cache.choose_product(month)
 
             # Determine unit price for the chosen product (round to 2 decimals)
             unit_price = round(random.uniform(chosen_product["min_price"], chosen_product["max_price"]), 2)
@@ -324,7 +400,7 @@ def main():
             revenue = round(unit_price * quantity, 2)
 
             # Select a store weighted by the GDP of its country
-            chosen_store = random.choices(stores, weights=store_weights, k=1)[0]
+            chosen_store = sampling_cache.choose_store()
 
             # Decide whether to include a promotional campaign.
             # (For November/December use a higher probability.)
@@ -335,18 +411,27 @@ def main():
             campaign = random.choice(campaign_names) if random.random() < campaign_prob else ""
 
             # Write the sales record row
-            writer.writerow([sale_date_str,
-                             sale_time_str,
-                             chosen_product["product_name"],
-                             unit_price,
-                             quantity,
-                             revenue,
-                             chosen_store["store_name"],
-                             campaign])
+            rows.writerow(sale_day,
+                          sale_second,
+                          chosen_product["product_name"],
+                          unit_price,
+                          quantity,
+                          revenue,
+                          chosen_store["store_name"],
+                          campaign)
+            if stats is not None:
+                stats.add(unit_price, quantity, revenue, chosen_product["product_name"], chosen_store["store_name"])
             
             # Print progress every 1000 records
             if i % 1000 == 0:
                 print(f"{i} sales records generated...")
+        rows.flush()
+        if SORTED_OUTPUT:
+            sorter.merge(sales_file)
+            print("Sales records sorted by date and time")
+
+    if stats is not None:
+        stats.write("summary_stats_O3MH.json")
 
     # -----------------------------
     # Summary of Generation
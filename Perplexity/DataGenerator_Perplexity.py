@@ -1,7 +1,14 @@
 import csv
 import random
-from datetime import datetime, timedelta
+from datetime import date as Date, datetime, timedelta
 from faker import Faker
+import os
+import sys
+
+# Shared helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from row_serializer import TIME_STRINGS
+from sales_csv import write_sales_csv
 
 # Initialize Faker for generating fake data
 fake = Faker()
@@ -11,6 +18,11 @@ NUM_RECORDS = 10000
 NUM_CATEGORIES = 10
 NUM_PRODUCTS = 50
 NUM_STORES = 45
+COMPRESSION = None  # Compress sales_data_Perplexity.csv: None, 'gzip', 'zstd' or 'bz2'
+SALES_WINDOW_YEARS = 2  # Sales dates fall between this many years ago and today
+DATETIME_BATCH_SIZE = 10000  # Dates/times sampled per batch
+CHUNK_SIZE = 10000  # Sales rows written per chunk; memory stays flat whatever NUM_RECORDS is
+SUMMARY_STATS = False  # Also write summary_stats_Perplexity.json (see stream_stats.py)
 
 # Product categories and their corresponding products
 categories = {
@@ -21,12 +33,9 @@ categories = {
     "Toys": ["Action Figure", "Board Game", "Puzzle", "Doll"],
 }
 
-# Store information
-stores = []
-store_names = set()
-
 # Generate unique store names and their details
 def generate_stores():
+    """Return a new list of stores, [name, city, state, country, continent] each."""
     cities = [
         ("New York", "NY", "USA"),
         ("London", "", "UK"),
@@ -50,6 +59,8 @@ def generate_stores():
         'Africa': ['South Africa', 'Nigeria']
     }
 
+    stores = []
+    store_names = set()
     for city, state, country in cities:
         continent = next((k for k, v in continents.items() if country in v), "")
         store_name = f"{fake.company()} Store"
@@ -59,44 +70,25 @@ def generate_stores():
         
         stores.append([store_name, city, state, country, continent])
         store_names.add(store_name)
-
-generate_stores()
-
-# Save stores to CSV
-with open('stores_Perplexity.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Store Name", "City", "State", "Country", "Continent"])
-    writer.writerows(stores)
+    return stores
 
 # Generate product categories and products
-product_categories = []
-products = []
-
-for category_name, product_list in categories.items():
-    product_categories.append([category_name])
-    for product in product_list:
-        products.append({
-            'name': product,
-            'category': category_name,
-            'min_price': random.uniform(10.0, 500.0),
-            'max_price': random.uniform(501.0, 1500.0)
-        })
-
-# Save categories to CSV
-with open('categories_Perplexity.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Category Name"])
-    writer.writerows(product_categories)
-
-# Save products to CSV with their categories
-with open('products_Perplexity.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Product Name", "Category"])
-    for product in products:
-        writer.writerow([product['name'], product['category']])
+def generate_products():
+    """Return new lists of the category rows and of the products (dicts with their price range)."""
+    product_categories = []
+    products = []
+    for category_name, product_list in categories.items():
+        product_categories.append([category_name])
+        for product in product_list:
+            products.append({
+                'name': product,
+                'category': category_name,
+                'min_price': random.uniform(10.0, 500.0),
+                'max_price': random.uniform(501.0, 1500.0)
+            })
+    return product_categories, products
 
 # Generate sales data with seasonality and campaigns
-sales_data = []
 campaigns = ["10% off Black Friday", "Summer Sale", None]
 gdp_weights = {
     'USA': 21.43,
@@ -106,10 +98,41 @@ gdp_weights = {
     'France': 2.78,
 }
 
-def generate_sales_data():
+class FastDateTimeProvider:
+    """
+    Drop-in for fake.date_between(start_date='-2y', end_date='today') and
+    fake.time() in the sales loop. The date window is resolved once, and
+    day and second offsets are sampled in batches from precomputed tables
+    instead of going through Faker's parsing and provider machinery per call.
+    """
+
+    def __init__(self, years=SALES_WINDOW_YEARS, batch_size=DATETIME_BATCH_SIZE):
+        # Same window as Faker's '-2y' (a year counts as 365.24 days), both ends included
+        end_date = Date.today()
+        start_date = end_date - timedelta(days=int(365.24 * years))
+        num_days = (end_date - start_date).days + 1
+        self.dates = [start_date + timedelta(days=d) for d in range(num_days)]
+        self.batch_size = batch_size
+        self._batch = iter(())
+
+    def _refill(self):
+        self._batch = zip(random.choices(self.dates, k=self.batch_size),
+                          random.choices(TIME_STRINGS, k=self.batch_size))
+
+    def date_time(self):
+        """Return a random (date, 'HH:MM:SS') pair inside the window."""
+        pair = next(self._batch, None)
+        if pair is None:
+            self._refill()
+            pair = next(self._batch)
+        return pair
+
+
+def generate_sales_data(products, stores):
+    """Yield the sales rows one by one; nothing is kept in memory."""
+    date_times = FastDateTimeProvider()
     for i in range(NUM_RECORDS):
-        date = fake.date_between(start_date='-2y', end_date='today')
-        time = fake.time()
+        date, time = date_times.date_time()
         
         # Select a random product and its price range
         product = random.choice(products)
@@ -126,7 +149,10 @@ def generate_sales_data():
         # Determine sales campaign randomly
         campaign_name = random.choice(campaigns)
         
-        sales_data.append([
+        if (i + 1) % 1000 == 0:
+            print(f"Generated {i + 1} records...")
+        
+        yield [
             date,
             time,
             product['name'],
@@ -135,25 +161,54 @@ def generate_sales_data():
             round(revenue, 2),
             store_info[0],
             campaign_name,
-        ])
-        
-        if (i + 1) % 1000 == 0:
-            print(f"Generated {i + 1} records...")
-
-generate_sales_data()
-
-# Save sales data to CSV
-with open('sales_data_Perplexity.csv', mode='w', newline='') as file:
-    writer = csv.writer(file)
-    writer.writerow(["Date", "Time", "Product Name", "Unit Price", 
-                     "Quantity Sold", "Revenue", 
-                     "Store Name", "Sales Campaign"])
-    writer.writerows(sales_data)
-
-# Summary of generated data
-print("Data Generation Complete!")
-print(f"Total Categories: {len(categories)}")
-print(f"Total Products: {len(products)}")
-print(f"Total Stores: {len(stores)}")
-print(f"Total Sales Records: {len(sales_data)}")
-print("\nData generation by DataGenerator_Perplexity.py")
+        ]
+
+def save_sales_data(rows):
+    """
+    Stream `rows` to the sales CSV in chunks of CHUNK_SIZE (see sales_csv.py);
+    returns the row count. With SUMMARY_STATS the summary is written too.
+    """
+    return write_sales_csv('sales_data_Perplexity.csv',
+                           ["Date", "Time", "Product Name", "Unit Price",
+                            "Quantity Sold", "Revenue",
+                            "Store Name", "Sales Campaign"],
+                           rows, COMPRESSION, CHUNK_SIZE,
+                           stats_path='summary_stats_Perplexity.json' if SUMMARY_STATS else None)
+
+def main():
+    stores = generate_stores()
+
+    # Save stores to CSV
+    with open('stores_Perplexity.csv', mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Store Name", "City", "State", "Country", "Continent"])
+        writer.writerows(stores)
+
+    product_categories, products = generate_products()
+
+    # Save categories to CSV
+    with open('categories_Perplexity.csv', mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Category Name"])
+        writer.writerows(product_categories)
+
+    # Save products to CSV with their categories
+    with open('products_Perplexity.csv', mode='w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(["Product Name", "Category"])
+        for product in products:
+            writer.writerow([product['name'], product['category']])
+
+    # Generate and save sales data to CSV
+    num_sales = save_sales_data(generate_sales_data(products, stores))
+
+    # Summary of generated data
+    print("Data Generation Complete!")
+    print(f"Total Categories: {len(categories)}")
+    print(f"Total Products: {len(products)}")
+    print(f"Total Stores: {len(stores)}")
+    print(f"Total Sales Records: {num_sales}")
+    print("\nData generation by DataGenerator_Perplexity.py")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Counter-based random numbers: random access into a generated data set.
+
+A sequential generator (random.seed(42), one stream for the whole run) can
+only reach row 40,000,000 by drawing everything before it. Here every
+uniform is a hash of (seed, row, stream) instead - the SplitMix64 finalizer
+applied twice, keyed per seed and stream - so each row is a pure function
+of its index. Any range of rows can be generated on its own in time
+proportional to its length, and the rows come out the same whatever order,
+block size, process or machine they are generated in.
+
+`stream` numbers the random values a row needs (day, second, store, ...);
+values of different streams or rows are independent for all practical
+purposes of synthetic data.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the array version
+    np = None
+
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+MIX1 = 0xBF58476D1CE4E5B9
+MIX2 = 0x94D049BB133111EB
+TO_UNIT = 1.0 / (1 << 53)  # 53 random bits -> float in [0, 1)
+
+
+def mix64(x):
+    # SplitMix64 finalizer on a Python int (mod 2^64)
+    x = ((x ^ (x >> 30)) * MIX1) & MASK64
+    x = ((x ^ (x >> 27)) * MIX2) & MASK64
+    return x ^ (x >> 31)
+
+
+def _mix64_array(x):
+    # mix64() on a uint64 array; NumPy wraps the products mod 2^64
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(MIX1)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(MIX2)
+    return x ^ (x >> np.uint64(31))
+
+
+class CounterUniforms:
+    """Uniform floats in [0, 1) as a function of (seed, row, stream)."""
+
+    def __init__(self, seed):
+        self.seed = seed & MASK64
+        self._keys = {}
+
+    def key(self, stream):
+        key = self._keys.get(stream)
+        if key is None:
+            key = self._keys[stream] = mix64((mix64(self.seed) + stream * GOLDEN_GAMMA) & MASK64)
+        return key
+
+    def uniform_at(self, stream, row):
+        # One value, in pure Python
+        return (mix64((row * GOLDEN_GAMMA + self.key(stream)) & MASK64) >> 11) * TO_UNIT
+
+    def uniform(self, stream, rows):
+        # The values of `stream` for an array of row numbers, as float64
+        if np is None:
+            raise RuntimeError("Counter-based generation requires NumPy (pip install numpy)")
+        x = np.asarray(rows, dtype=np.uint64) * np.uint64(GOLDEN_GAMMA) + np.uint64(self.key(stream))
+        return (_mix64_array(x) >> np.uint64(11)).astype(np.float64) * TO_UNIT
@@ -0,0 +1,163 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+External merge sort of sales rows by date and time.
+
+The generators draw sale dates at random, so the sales files come out in no
+particular order. Sorting a file far larger than memory goes in two phases:
+lines are collected until about `run_bytes` are buffered, sorted in memory
+and spilled to a temporary run file; then the runs are merged through a
+heap (heapq.merge), reading each one sequentially, into the output. With
+more than `merge_width` runs, groups of neighbouring runs are merged first,
+so the number of open files stays bounded too. Memory is about `run_bytes`
+while sorting and `merge_width` read buffers while merging, whatever the
+size of the file.
+
+Every sales line starts with 'YYYY-MM-DD,HH:MM:SS', which sorts
+chronologically as text; that prefix is the default key. The sort is
+stable: rows with the same second keep their original order, so the output
+is fully determined by the input.
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+
+DEFAULT_RUN_BYTES = 256 * 1024 * 1024   # Approximate memory per sorted run
+DEFAULT_MERGE_WIDTH = 64                # Runs merged at once
+READ_BUFFER_SIZE = 1024 * 1024          # Read buffer per run while merging
+
+# Approximate memory of a buffered line besides its characters: the str
+# object, its list slot and the key computed while sorting
+LINE_OVERHEAD = 128
+
+
+def sales_time_key(line):
+    # 'YYYY-MM-DD,HH:MM:SS,...': the first 19 characters sort chronologically
+    return line[:19]
+
+
+class ExternalSorter:
+    """
+    Collects lines (add_lines(), or write() like a text file) and writes
+    them to `out` in key order with merge(). Sorted runs are spilled to a
+    temporary directory inside `temp_dir` (None = the system default), which
+    is removed by close(). Input small enough for a single run never touches
+    the disk.
+    """
+
+    def __init__(self, key=sales_time_key, run_bytes=DEFAULT_RUN_BYTES, temp_dir=None,
+                 merge_width=DEFAULT_MERGE_WIDTH):
+        if merge_width < 2:
+            raise ValueError("merge_width must be at least 2")
+        self.key = key
+        self.run_bytes = run_bytes
+        self.temp_dir = temp_dir
+        self.merge_width = merge_width
+        self.runs = []  # paths of the spilled runs, in input order
+        self.rows = 0
+        self._dir = None
+        self._files = 0  # temporary files created so far
+        self._lines = []
+        self._size = 0
+        self._partial = ""
+
+    def add_lines(self, lines):
+        # Lines including their line endings
+        buffered = self._lines
+        for line in lines:
+            buffered.append(line)
+            self._size += len(line) + LINE_OVERHEAD
+            if self._size >= self.run_bytes:
+                self._spill()
+                buffered = self._lines
+
+    def write(self, text):
+        # Text file interface (e.g. for csv.writer or SalesRowSerializer); a
+        # line split over several calls is put back together
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        self.add_lines([line + "\n" for line in lines])
+
+    def _run_path(self):
+        if self._dir is None:
+            self._dir = tempfile.mkdtemp(prefix="sales-sort-", dir=self.temp_dir)
+        self._files += 1
+        return os.path.join(self._dir, f"run-{self._files:06d}")
+
+    def _spill(self):
+        self._lines.sort(key=self.key)
+        path = self._run_path()
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            f.writelines(self._lines)
+        self.runs.append(path)
+        self.rows += len(self._lines)
+        self._lines = []
+        self._size = 0
+
+    def _merge_runs(self, paths, out):
+        files = [open(path, newline="", encoding="utf-8", buffering=READ_BUFFER_SIZE) for path in paths]
+        try:
+            out.writelines(heapq.merge(*files, key=self.key))
+        finally:
+            for f in files:
+                f.close()
+        for path in paths:
+            os.remove(path)
+
+    def merge(self, out):
+        """Write all lines to the text file `out` in key order; returns the number of lines."""
+        if self._partial:
+            self.add_lines([self._partial])
+            self._partial = ""
+        if not self.runs:
+            # Everything fits in one run: sort in memory, no temporary files
+            self._lines.sort(key=self.key)
+            out.writelines(self._lines)
+            rows, self._lines, self._size = len(self._lines), [], 0
+            return rows
+        if self._lines:
+            self._spill()
+        runs = self.runs
+        while len(runs) > self.merge_width:
+            # Merge neighbouring groups of runs; keeping the groups in input
+            # order keeps the sort stable
+            merged = []
+            for start in range(0, len(runs), self.merge_width):
+                group = runs[start:start + self.merge_width]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                path = self._run_path()
+                with open(path, "w", newline="", encoding="utf-8") as f:
+                    self._merge_runs(group, f)
+                merged.append(path)
+            runs = merged
+        self._merge_runs(runs, out)
+        self.runs = []
+        rows, self.rows = self.rows, 0
+        return rows
+
+    def close(self):
+        if self._dir is not None:
+            shutil.rmtree(self._dir, ignore_errors=True)
+            self._dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sort_lines(lines, out, key=sales_time_key, run_bytes=DEFAULT_RUN_BYTES, temp_dir=None,
+               merge_width=DEFAULT_MERGE_WIDTH):
+    # Write the lines of the iterable `lines` to `out` in key order, in bounded memory
+    with ExternalSorter(key, run_bytes, temp_dir, merge_width) as sorter:
+        sorter.add_lines(lines)
+        return sorter.merge(out)
+
+
+def merge_sorted(files, out, key=sales_time_key):
+    # k-way merge of text files (or line iterables) that are each sorted already
+    out.writelines(heapq.merge(*files, key=key))
@@ -0,0 +1,41 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Fixtures shared by the generator test scripts (DataGenerator-TEST_*.py).
+
+Each helper takes the running unittest.TestCase and registers its own
+cleanup on it, so a test leaves no files, working directory or module
+settings behind.
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import tracemalloc
+
+
+def peak_memory(func):
+    # Peak Python heap allocation (bytes) while func() runs
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def chdir_to_temp_dir(testcase):
+    # Run the rest of the test in a fresh temp dir; returns its path
+    tmp = tempfile.TemporaryDirectory()
+    testcase.addCleanup(tmp.cleanup)
+    testcase.addCleanup(os.chdir, os.getcwd())
+    os.chdir(tmp.name)
+    return tmp.name
+
+
+def override(testcase, module, **settings):
+    # Set module-level settings (e.g. CHUNK_SIZE=1000) until the test ends
+    for name, value in settings.items():
+        testcase.addCleanup(setattr, module, name, getattr(module, name))
+        setattr(module, name, value)
@@ -0,0 +1,191 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Compressed streaming output for the sales_data_*.csv files.
+
+Text written to the file is cut into independent blocks that are compressed
+by background threads (zlib, bz2 and zstandard all release the GIL) and
+written in order as concatenated gzip members, bz2 streams or zstd frames.
+Standard tools (gzip -d, bzip2 -d, zstd -d, pandas) read these files as one
+stream, and row generation never waits on the compressor unless the queue of
+pending blocks is full.
+"""
+
+import bz2
+import gzip
+import io
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:  # zstandard is only needed for 'zstd' output
+    zstandard = None
+
+COMPRESSION_SUFFIXES = {
+    'gzip': '.gz',
+    'zstd': '.zst',
+    'bz2': '.bz2',
+}
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024  # Uncompressed bytes per block
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3, 'bz2': 9}
+
+
+def compressed_path(path, compression):
+    # 'sales_data_O1.csv' -> 'sales_data_O1.csv.gz' etc.
+    if not compression:
+        return path
+    if compression not in COMPRESSION_SUFFIXES:
+        raise ValueError(f"Unknown compression {compression!r}, expected one of {sorted(COMPRESSION_SUFFIXES)}")
+    return path + COMPRESSION_SUFFIXES[compression]
+
+
+class ParallelCompressedWriter(io.RawIOBase):
+    """
+    Binary file that compresses fixed-size blocks on a thread pool and writes
+    the compressed blocks to `path` in their original order.
+    """
+
+    def __init__(self, path, compression, level=None, block_size=DEFAULT_BLOCK_SIZE, workers=None,
+                 append=False):
+        super().__init__()
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression {compression!r}, expected one of {sorted(COMPRESSION_SUFFIXES)}")
+        if compression == 'zstd' and zstandard is None:
+            raise RuntimeError("zstd output requires the zstandard package (pip install zstandard)")
+        self.path = path
+        self.compression = compression
+        self.level = DEFAULT_LEVELS[compression] if level is None else level
+        self.block_size = block_size
+        workers = workers or os.cpu_count() or 1
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._max_pending = 2 * workers  # backpressure: bounded number of blocks in flight
+        self._pending = deque()
+        self._buffer = bytearray()
+        self._local = threading.local()
+        # Appending adds more members/streams/frames, which still read as one stream
+        self._file = open(path, 'ab' if append else 'wb')
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def writable(self):
+        return True
+
+    def fileno(self):
+        # The compressed file on disk (lets callers fsync it)
+        return self._file.fileno()
+
+    def write(self, data):
+        self._buffer += data
+        self.bytes_in += len(data)
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block)
+        return len(data)
+
+    def _compress(self, block):
+        if self.compression == 'gzip':
+            return gzip.compress(block, compresslevel=self.level, mtime=0)
+        if self.compression == 'bz2':
+            return bz2.compress(block, compresslevel=self.level)
+        # zstd compressors are not thread safe, keep one per worker thread
+        compressor = getattr(self._local, 'zstd', None)
+        if compressor is None:
+            compressor = self._local.zstd = zstandard.ZstdCompressor(level=self.level)
+        return compressor.compress(block)
+
+    def _submit(self, block):
+        self._pending.append(self._pool.submit(self._compress, block))
+        while len(self._pending) > self._max_pending:
+            self._write_oldest()
+
+    def _write_oldest(self):
+        compressed = self._pending.popleft().result()
+        self._file.write(compressed)
+        self.bytes_out += len(compressed)
+
+    def sync(self):
+        # Compress what is buffered as a block of its own and write out
+        # everything pending, so the file on disk ends at a block boundary
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        while self._pending:
+            self._write_oldest()
+        self._file.flush()
+
+    def close(self):
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer = bytearray()
+            while self._pending:
+                self._write_oldest()
+        finally:
+            self._pool.shutdown()
+            self._file.close()
+            self.elapsed = time.perf_counter() - self._started
+            super().close()
+
+    def report(self):
+        ratio = self.bytes_in / self.bytes_out if self.bytes_out else 0.0
+        throughput = self.bytes_in / self.elapsed / 1e6 if self.elapsed else 0.0
+        return (f"{os.path.basename(self.path)}: {self.bytes_in / 1e6:.1f} MB -> "
+                f"{self.bytes_out / 1e6:.1f} MB (ratio {ratio:.2f}x, {throughput:.1f} MB/s)")
+
+
+class _ReportingTextWrapper(io.TextIOWrapper):
+    # Text layer over ParallelCompressedWriter that prints the stats on close
+    def close(self):
+        if self.closed:
+            return
+        raw = self.buffer.raw
+        super().close()
+        print(f"Compressed {raw.report()}")
+
+
+def open_sales_output(path, compression=None, encoding=None, level=None,
+                      block_size=DEFAULT_BLOCK_SIZE, workers=None, buffer_size=None, append=False,
+                      report=True):
+    """
+    Open `path` for csv.writer, compressed if `compression` is 'gzip', 'zstd'
+    or 'bz2' (the matching suffix is added to the file name). Without
+    compression this is a plain open(path, 'w', newline=''). `buffer_size`
+    sets the size of the write buffer (default: Python's for plain files,
+    1 MB in front of the compressor). With `append` the text is added to
+    the end of an existing file instead of replacing it. Compressed files
+    print their size and ratio on close unless `report` is false.
+    """
+    if not compression:
+        return open(path, 'a' if append else 'w', newline='', encoding=encoding, buffering=buffer_size or -1)
+    raw = ParallelCompressedWriter(compressed_path(path, compression), compression,
+                                   level=level, block_size=block_size, workers=workers, append=append)
+    wrapper = _ReportingTextWrapper if report else io.TextIOWrapper
+    return wrapper(io.BufferedWriter(raw, buffer_size=buffer_size or 1024 * 1024),
+                   encoding=encoding, newline='')
+
+
+def open_sales_input(path, compression=None, encoding=None):
+    """
+    Open a file written by open_sales_output() for reading as text, without
+    newline translation. `path` is the file on disk, i.e. with the suffix of
+    its compression.
+    """
+    if not compression:
+        return open(path, newline='', encoding=encoding)
+    if compression == 'gzip':
+        return gzip.open(path, 'rt', newline='', encoding=encoding)
+    if compression == 'bz2':
+        return bz2.open(path, 'rt', newline='', encoding=encoding)
+    if zstandard is None:
+        raise RuntimeError("zstd input requires the zstandard package (pip install zstandard)")
+    raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), read_across_frames=True, closefd=True)
+    return io.TextIOWrapper(io.BufferedReader(raw), encoding=encoding, newline='')
@@ -0,0 +1,205 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Zipf (power-law) product popularity for catalogues of any size.
+
+ZipfSampler draws popularity rank r in 1..n with probability proportional
+to r^-exponent by rejection-inversion (Hörmann and Derflinger, "Rejection-
+inversion to generate variates from monotone discrete distributions", 1996):
+a uniform is mapped through the inverse integral of a continuous hat
+function and accepted or rejected against the exact weight. There is no
+table of weights, so memory and the cost of a draw are the same for 50
+products or 10M.
+
+ZipfPopularity maps ranks to products through a bijection
+(scaled_dimensions.IdPermutation), so the bestsellers are spread over the
+catalogue instead of being its first rows, and makes the best-ranked
+products of each category top sellers, `boost` times as popular. The boost
+is a second, small mixture component next to the Zipf draw, so a draw
+stays O(1).
+"""
+
+import math
+import random
+from bisect import bisect
+from itertools import accumulate
+
+from scaled_dimensions import IdPermutation
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for sample_many()
+    np = None
+
+
+def _log1p_over_x(x):
+    # log(1 + x) / x, also near 0
+    if abs(x) > 1e-8:
+        return math.log1p(x) / x
+    return 1.0 - x * (0.5 - x * (1.0 / 3.0 - 0.25 * x))
+
+
+def _expm1_over_x(x):
+    # (exp(x) - 1) / x, also near 0
+    if abs(x) > 1e-8:
+        return math.expm1(x) / x
+    return 1.0 + x * 0.5 * (1.0 + x / 3.0 * (1.0 + 0.25 * x))
+
+
+class ZipfSampler:
+    """Ranks 1..n, P(r) proportional to r^-exponent (exponent > 0)."""
+
+    def __init__(self, n, exponent):
+        if n < 1:
+            raise ValueError("ZipfSampler needs at least one rank")
+        if exponent <= 0:
+            raise ValueError("Zipf exponent must be positive")
+        self.n = n
+        self.exponent = exponent
+        self.h_integral_x1 = self.h_integral(1.5) - 1.0
+        self.h_integral_n = self.h_integral(n + 0.5)
+        self.s = 2.0 - self.h_integral_inverse(self.h_integral(2.5) - self.h(2.0))
+
+    def h(self, x):
+        return math.exp(-self.exponent * math.log(x))
+
+    def h_integral(self, x):
+        # Integral of the hat function x^-exponent, shifted so H(1) = 0
+        log_x = math.log(x)
+        return _expm1_over_x((1.0 - self.exponent) * log_x) * log_x
+
+    def h_integral_inverse(self, x):
+        t = max(x * (1.0 - self.exponent), -1.0)
+        return math.exp(_log1p_over_x(t) * x)
+
+    def sample(self, rng=random):
+        while True:
+            u = self.h_integral_n + rng.random() * (self.h_integral_x1 - self.h_integral_n)
+            x = self.h_integral_inverse(u)
+            k = min(max(int(x + 0.5), 1), self.n)
+            if k - x <= self.s or u >= self.h_integral(k + 0.5) - self.h(k):
+                return k
+
+    def sample_many(self, np_rng, size, uniforms=None):
+        """
+        Vectorized sample(): a NumPy array of ranks; rejected draws are
+        redrawn. `uniforms(attempt, positions)`, if given, supplies the
+        uniforms for the given positions of the result instead of np_rng.
+        """
+        if np is None:
+            raise RuntimeError("ZipfSampler.sample_many requires NumPy (pip install numpy)")
+        if uniforms is None:
+            def uniforms(attempt, positions):
+                return np_rng.random(positions.size)
+        one_minus = 1.0 - self.exponent
+        ranks = np.empty(size, dtype=np.int64)
+        todo = np.arange(size)
+        attempt = 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            while todo.size:
+                u = self.h_integral_n + uniforms(attempt, todo) * (self.h_integral_x1 - self.h_integral_n)
+                t = np.maximum(u * one_minus, -1.0)
+                x = np.exp(np.where(np.abs(t) > 1e-8, np.log1p(t) / t,
+                                    1.0 - t * (0.5 - t * (1.0 / 3.0 - 0.25 * t))) * u)
+                k = np.clip((x + 0.5).astype(np.int64), 1, self.n)
+                log_k = np.log(k + 0.5)
+                e = one_minus * log_k
+                h_integral_k = np.where(np.abs(e) > 1e-8, np.expm1(e) / e,
+                                        1.0 + e * 0.5 * (1.0 + e / 3.0 * (1.0 + 0.25 * e))) * log_k
+                accept = (k - x <= self.s) | (u >= h_integral_k - np.exp(-self.exponent * np.log(k)))
+                ranks[todo[accept]] = k[accept]
+                todo = todo[~accept]
+                attempt += 1
+        return ranks
+
+    def weight(self, rank):
+        return rank ** -self.exponent
+
+    def total_weight(self):
+        # Generalized harmonic number H(n, exponent): the first terms summed,
+        # the rest by Euler-Maclaurin (error far below float precision)
+        s, n = self.exponent, self.n
+        m = min(n, 1000)
+        total = math.fsum(r ** -s for r in range(1, m))
+        if s == 1.0:
+            integral = math.log(n / m)
+        else:
+            integral = (n ** (1.0 - s) - m ** (1.0 - s)) / (1.0 - s)
+        return total + integral + (m ** -s + n ** -s) / 2 + s * (m ** (-s - 1) - n ** (-s - 1)) / 12
+
+
+class ZipfPopularity:
+    """
+    Product sampler over products 0..n-1, n = len(item_categories): Zipf
+    ranks mapped to products by `ranks`, and the `top_sellers` best-ranked
+    products of every category `boost` times as popular. Finding the top
+    sellers walks down the ranks until every category has them; nothing
+    per product is kept.
+    """
+
+    def __init__(self, item_categories, exponent, boost=1.0, top_sellers=1, ranks=None, rng=random):
+        if boost < 1.0:
+            raise ValueError("Top-seller boost must be at least 1")
+        n = len(item_categories)
+        self.zipf = ZipfSampler(n, exponent)
+        self.ranks = ranks or IdPermutation(n, rng)
+        self.boost = boost
+        self.top_sellers = top_sellers
+
+        # Best-ranked products per category, and their share of the total weight
+        wanted = {category: top_sellers for category in set(item_categories)} if boost > 1.0 else {}
+        self.top_items, top_weights = [], []
+        rank = 0
+        while wanted and rank < n:
+            item = self.ranks(rank)
+            rank += 1
+            category = item_categories[item]
+            if wanted.get(category):
+                wanted[category] -= 1
+                if not wanted[category]:
+                    del wanted[category]
+                self.top_items.append(item)
+                top_weights.append((boost - 1.0) * self.zipf.weight(rank))
+        extra = math.fsum(top_weights)
+        self.top_probability = extra / (self.zipf.total_weight() + extra)
+        # A few entries per category: a bisect over cumulative weights is enough
+        self.top_cum_weights = list(accumulate(top_weights))
+        self._top_arrays = None
+
+    def _top_item(self, rng):
+        u = rng.random() * self.top_cum_weights[-1]
+        return self.top_items[bisect(self.top_cum_weights, u, 0, len(self.top_items) - 1)]
+
+    def sample(self, rng=random):
+        if self.top_items and rng.random() < self.top_probability:
+            return self._top_item(rng)
+        return self.ranks(self.zipf.sample(rng) - 1)
+
+    def sample_many(self, np_rng, size, uniforms=None):
+        # With `uniforms(stream, positions)`, stream 0 picks between top sellers
+        # and Zipf ranks, stream 1 the top seller and streams 2+ the Zipf draws
+        if uniforms is None:
+            def uniforms(stream, positions):
+                return np_rng.random(positions.size)
+        ranks = self.zipf.sample_many(np_rng, size, lambda attempt, positions: uniforms(2 + attempt, positions)) - 1
+        items = (ranks * self.ranks.a + self.ranks.b) % self.ranks.size
+        if self.top_items:
+            if self._top_arrays is None:
+                self._top_arrays = np.array(self.top_items, dtype=np.int64), np.array(self.top_cum_weights)
+            top_items, cum_weights = self._top_arrays
+            top = uniforms(0, np.arange(size)) < self.top_probability
+            u = uniforms(1, np.flatnonzero(top)) * cum_weights[-1]
+            items[top] = top_items[np.minimum(np.searchsorted(cum_weights, u, side="right"), len(top_items) - 1)]
+        return items
+
+    def state(self):
+        # Parameters to rebuild the same sampler (with the same item categories)
+        return {"model": "zipf", "items": self.zipf.n, "exponent": self.zipf.exponent, "boost": self.boost,
+                "top_sellers": self.top_sellers, "ranks": self.ranks.state()}
+
+    @classmethod
+    def from_state(cls, state, item_categories):
+        if state.get("model") != "zipf" or state["items"] != len(item_categories):
+            raise ValueError("Popularity model does not match the products")
+        return cls(item_categories, state["exponent"], state["boost"], state["top_sellers"],
+                   ranks=IdPermutation.from_state(state["ranks"]))
+
@@ -0,0 +1,87 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Fast CSV serialization of sales rows.
+
+csv.writer checks every field of every row for characters that need quoting,
+and the generators format a date and a time per row with strftime/isoformat.
+Here dates and times are lookups into tables built once (every day of the
+generation window, every second of the day), numbers go through str(), and
+only text fields are escaped - once per distinct value, then cached. Each
+row is a single join; rows are written to the file in batches.
+
+The output is byte for byte what csv.writer (default dialect) writes.
+"""
+
+from datetime import timedelta
+
+# 'HH:MM:SS' for every second of the day, indexed by hour * 3600 + minute * 60 + second
+TIME_STRINGS = [f"{h:02d}:{m:02d}:{s:02d}" for h in range(24) for m in range(60) for s in range(60)]
+
+DEFAULT_BATCH_ROWS = 1000
+
+
+def date_strings(start_date, num_days):
+    # 'YYYY-MM-DD' for each day of the window, indexed by day offset from start_date
+    return [(start_date + timedelta(days=d)).strftime('%Y-%m-%d') for d in range(num_days)]
+
+
+def csv_field(value):
+    # Quote a text field the same way csv.writer would
+    if any(ch in value for ch in ',"\r\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+class SalesRowSerializer:
+    """
+    Writes sales rows (date, time, product, unit price, quantity, revenue,
+    store, campaign) to a text file opened with newline=''.
+
+    Dates and times are passed as a day offset into `dates` and a second of
+    the day; names are escaped on first sight and looked up afterwards.
+    """
+
+    def __init__(self, file, dates, batch_rows=DEFAULT_BATCH_ROWS):
+        self.file = file
+        self.dates = dates
+        self.batch_rows = batch_rows
+        self._fields = {}
+        self._lines = []
+
+    def field(self, text):
+        # Escaped form of a text field, computed once per distinct value
+        escaped = self._fields.get(text)
+        if escaped is None:
+            escaped = self._fields[text] = csv_field(text)
+        return escaped
+
+    def writerow(self, day, second, product, unit_price, quantity, revenue, store, campaign=''):
+        fields = self._fields
+        product = fields.get(product) or self.field(product)
+        store = fields.get(store) or self.field(store)
+        if campaign:
+            campaign = fields.get(campaign) or self.field(campaign)
+        lines = self._lines
+        lines.append(f"{self.dates[day]},{TIME_STRINGS[second]},{product},{unit_price},"
+                     f"{quantity},{revenue},{store},{campaign}\r\n")
+        if len(lines) >= self.batch_rows:
+            self.flush()
+
+    def write_escaped(self, day, second, product, unit_price, quantity, revenue, store, campaign=''):
+        # writerow() for text fields that are already escaped (or are numbers)
+        lines = self._lines
+        lines.append(f"{self.dates[day]},{TIME_STRINGS[second]},{product},{unit_price},"
+                     f"{quantity},{revenue},{store},{campaign}\r\n")
+        if len(lines) >= self.batch_rows:
+            self.flush()
+
+    def writerows(self, sales):
+        # Each sale is a tuple of writerow() arguments
+        writerow = self.writerow
+        for sale in sales:
+            writerow(*sale)
+
+    def flush(self):
+        if self._lines:
+            self.file.write("".join(self._lines))
+            self._lines = []
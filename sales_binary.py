@@ -0,0 +1,274 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Fixed-width binary sales files, for tools that replay or scan sales without
+parsing CSV.
+
+A file is a header followed by packed little-endian records, one per sale:
+
+    day          int32  days since 1970-01-01
+    second       int32  second of the day
+    product_id   int32
+    store_id     int32
+    quantity     int32
+    price_cents  int32  unit price in cents (revenue = price_cents * quantity)
+    campaign_id  int32  0 = no campaign
+
+The header starts with HEADER_PREFIX (magic, version, header size, record
+size, row count), followed by a JSON description of the record fields and
+zero padding up to `header_size`, a multiple of HEADER_ALIGNMENT. The
+dimension tables stay in CSV.
+
+SalesBinaryFile maps a file with mmap. Row N is one unpack at a fixed
+offset, and the records are also exposed as memoryview and NumPy
+structured-array views over the mapping, without copying.
+"""
+
+import json
+import mmap
+import os
+import struct
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the array views
+    np = None
+
+MAGIC = b"SALESBIN"
+VERSION = 1
+HEADER_ALIGNMENT = 64
+# magic, version, field count, header size, record size, row count
+HEADER_PREFIX = struct.Struct("<8sHHIIQ")
+ROWS_OFFSET = HEADER_PREFIX.size - 8
+
+SALES_FIELDS = [
+    ("day", "int32"),
+    ("second", "int32"),
+    ("product_id", "int32"),
+    ("store_id", "int32"),
+    ("quantity", "int32"),
+    ("price_cents", "int32"),
+    ("campaign_id", "int32"),
+]
+
+# Field type -> struct code (NumPy dtype strings are "<" + the type name)
+FIELD_TYPES = {"int8": "b", "uint8": "B", "int16": "h", "uint16": "H", "int32": "i", "uint32": "I",
+               "int64": "q", "uint64": "Q", "float32": "f", "float64": "d"}
+NUMPY_TYPES = {"int8": "<i1", "uint8": "<u1", "int16": "<i2", "uint16": "<u2", "int32": "<i4",
+               "uint32": "<u4", "int64": "<i8", "uint64": "<u8", "float32": "<f4", "float64": "<f8"}
+
+DEFAULT_BUFFER_RECORDS = 65536  # Records packed in memory before each write
+
+
+def record_struct(fields):
+    return struct.Struct("<" + "".join(FIELD_TYPES[kind] for _, kind in fields))
+
+
+def record_dtype(fields):
+    if np is None:
+        raise RuntimeError("Array views of binary sales files require NumPy (pip install numpy)")
+    return np.dtype([(name, NUMPY_TYPES[kind]) for name, kind in fields])
+
+
+SALES_RECORD = record_struct(SALES_FIELDS)
+
+
+def encode_header(fields, rows, metadata=None):
+    schema = json.dumps({"fields": [{"name": name, "type": kind} for name, kind in fields],
+                         "byte_order": "little", "day_epoch": "1970-01-01",
+                         "metadata": metadata or {}}, separators=(",", ":")).encode()
+    size = HEADER_PREFIX.size + len(schema)
+    header_size = -(-size // HEADER_ALIGNMENT) * HEADER_ALIGNMENT
+    prefix = HEADER_PREFIX.pack(MAGIC, VERSION, len(fields), header_size, record_struct(fields).size, rows)
+    return prefix + schema + bytes(header_size - size)
+
+
+def decode_header(data, path="<binary sales file>"):
+    # -> (header_size, record_size, rows, schema dict)
+    if len(data) < HEADER_PREFIX.size:
+        raise ValueError(f"{path} is too short to be a binary sales file")
+    magic, version, num_fields, header_size, record_size, rows = HEADER_PREFIX.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a binary sales file")
+    if version != VERSION:
+        raise ValueError(f"{path} has format version {version}, expected {VERSION}")
+    schema = json.loads(bytes(data[HEADER_PREFIX.size:header_size]).rstrip(b"\0"))
+    fields = [(field["name"], field["type"]) for field in schema["fields"]]
+    if len(fields) != num_fields or record_struct(fields).size != record_size:
+        raise ValueError(f"{path} has an inconsistent header")
+    schema["fields"] = fields
+    return header_size, record_size, rows, schema
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        prefix = f.read(HEADER_PREFIX.size)
+        if len(prefix) < HEADER_PREFIX.size:
+            raise ValueError(f"{path} is too short to be a binary sales file")
+        header_size = HEADER_PREFIX.unpack(prefix)[3]
+        return decode_header(prefix + f.read(header_size - HEADER_PREFIX.size), path)
+
+
+class SalesBinaryWriter:
+    """
+    Writes sales records to `path`. Single records (write) are packed into a
+    buffer of `buffer_records`; NumPy structured arrays with the record
+    dtype (write_records) go to the file as they are. The row count in the
+    header is filled in on close.
+
+    With `append`, records are added to an existing file; anything after the
+    rows its header counts (e.g. from a crash) is cut off first.
+    """
+
+    def __init__(self, path, append=False, metadata=None, buffer_records=DEFAULT_BUFFER_RECORDS):
+        self.path = path
+        self.fields = SALES_FIELDS
+        self.buffer_records = buffer_records
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            header_size, record_size, self.rows, schema = read_header(path)
+            if schema["fields"] != self.fields:
+                raise ValueError(f"{path} has different record fields, cannot append")
+            self.file = open(path, "r+b")
+            self.file.truncate(header_size + self.rows * record_size)
+            self.file.seek(0, os.SEEK_END)
+        else:
+            self.rows = 0
+            self.file = open(path, "wb")
+            self.file.write(encode_header(self.fields, 0, metadata))
+        self._pack = SALES_RECORD.pack
+        self._buffer = []
+
+    def write(self, day, second, product_id, store_id, quantity, price_cents, campaign_id):
+        self._buffer.append(self._pack(day, second, product_id, store_id, quantity, price_cents, campaign_id))
+        if len(self._buffer) >= self.buffer_records:
+            self.flush()
+
+    def write_records(self, records):
+        # A NumPy array of record_dtype(SALES_FIELDS), written without conversion
+        self.flush()
+        self.file.write(memoryview(records).cast("B"))
+        self.rows += len(records)
+
+    def flush(self):
+        if self._buffer:
+            self.file.write(b"".join(self._buffer))
+            self.rows += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.seek(ROWS_OFFSET)
+        self.file.write(struct.pack("<Q", self.rows))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def concatenate(part_paths, path):
+    # Join binary sales files in order under one header with the total row count
+    headers = [read_header(part) for part in part_paths]
+    if any(schema["fields"] != headers[0][3]["fields"] for _, _, _, schema in headers):
+        raise ValueError("Binary sales parts have different record fields")
+    total = sum(rows for _, _, rows, _ in headers)
+    with open(path, "wb") as out:
+        out.write(encode_header(headers[0][3]["fields"], total, headers[0][3]["metadata"]))
+        for part, (header_size, record_size, rows, _) in zip(part_paths, headers):
+            with open(part, "rb") as f:
+                f.seek(header_size)
+                remaining = rows * record_size
+                while remaining:
+                    chunk = f.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        raise ValueError(f"{part} is shorter than its header says")
+                    out.write(chunk)
+                    remaining -= len(chunk)
+
+
+class SalesBinaryFile:
+    """
+    Read-only, memory-mapped view of a binary sales file.
+
+        with SalesBinaryFile("sales_data_O1.bin") as sales:
+            sales[12345]                       # one record as a tuple
+            for record in sales: ...           # full scan
+            sales.view()[n, k]                 # memoryview, shape (rows, fields)
+            sales.array()["price_cents"]       # NumPy column view
+
+    Nothing is copied: all views point into the mapping. Drop them before
+    close(); mmap refuses to close while views are still alive.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER_PREFIX.size:
+                raise ValueError(f"{path} is too short to be a binary sales file")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.header_size, self.record_size, self.rows, schema = decode_header(self._mmap, path)
+        except ValueError:
+            self.close()
+            raise
+        self.fields = schema["fields"]
+        self.metadata = schema["metadata"]
+        if size < self.header_size + self.rows * self.record_size:
+            self.close()
+            raise ValueError(f"{path} is shorter than its header says ({self.rows} records)")
+        self.record = record_struct(self.fields)
+        self.names = [name for name, _ in self.fields]
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, n):
+        # Random access: record n (negative counts from the end) as a tuple
+        if n < 0:
+            n += self.rows
+        if not 0 <= n < self.rows:
+            raise IndexError("record index out of range")
+        return self.record.unpack_from(self._mmap, self.header_size + n * self.record_size)
+
+    def __iter__(self):
+        return self.record.iter_unpack(self.records())
+
+    def records(self):
+        # The record bytes as one memoryview
+        end = self.header_size + self.rows * self.record_size
+        return memoryview(self._mmap)[self.header_size:end]
+
+    def view(self):
+        # memoryview of shape (rows, fields); needs fields of a single type.
+        # (memoryview cannot take a shape with a zero in it: an empty file gives an empty 1-d view)
+        codes = {FIELD_TYPES[kind] for _, kind in self.fields}
+        if len(codes) != 1:
+            raise ValueError("view() needs fields of a single type; use array()")
+        if self.rows == 0:
+            return self.records().cast(codes.pop())
+        return self.records().cast(codes.pop(), shape=[self.rows, len(self.fields)])
+
+    def array(self):
+        # NumPy structured array over the records; array()[name] is a column view
+        dtype = record_dtype(self.fields)
+        if self.rows == 0:
+            return np.empty(0, dtype)
+        return np.frombuffer(self._mmap, dtype=dtype, count=self.rows, offset=self.header_size)
+
+    def column(self, name):
+        return self.array()[name]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
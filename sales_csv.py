@@ -0,0 +1,48 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Chunked CSV output for the generators that yield their sales rows one by one
+(Perplexity, Copilot and Copilot_v2).
+
+write_sales_csv() takes `chunk_size` rows at a time off the row iterator
+(itertools.islice) and hands each chunk to csv.writer.writerows() in one
+call, so memory stays at one chunk whatever the number of rows. With a
+`stats_path`, every chunk is also added column-wise to a
+stream_stats.SalesStats, which is written there at the end.
+
+Rows are laid out date, time, product, unit price, quantity, revenue,
+store, campaign.
+"""
+
+import csv
+from itertools import islice
+
+from parallel_compress import open_sales_output
+from stream_stats import SalesStats
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def write_sales_csv(path, header, rows, compression=None, chunk_size=DEFAULT_CHUNK_SIZE, stats_path=None):
+    """
+    Write `header` and then the iterable `rows` to `path` (compressed if
+    `compression` is 'gzip', 'zstd' or 'bz2', see parallel_compress) and
+    return the number of rows written.
+    """
+    stats = SalesStats() if stats_path else None
+    count = 0
+    rows = iter(rows)
+    with open_sales_output(path, compression) as file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            writer.writerows(chunk)
+            if stats is not None:
+                _, _, product, unit_price, quantity, revenue, store, _ = zip(*chunk)
+                stats.add_columns(unit_price, quantity, revenue, product, store)
+            count += len(chunk)
+    if stats is not None:
+        stats.write(stats_path)
+    return count
@@ -0,0 +1,86 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Collision-free names for very large store and product dimensions.
+
+Drawing a random number per name and retrying on a collision gets slower as
+the names fill the number range, and has to give up (or accept duplicates)
+at some point. Here item i gets its number from a bijection on an ID space,
+
+    i -> (a * i + b) mod space,    gcd(a, space) = 1
+
+so distinct items always get distinct numbers, the numbers look scattered
+rather than sequential, and each one is computed on its own in O(1), with
+nothing to look up or remember. A catalogue of n items is built in O(n) time
+and memory, whatever its size.
+"""
+
+import math
+import random
+
+# Model codes: digits and capitals, without I and O (easily confused with 1 and 0)
+CODE_ALPHABET = "0123456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+
+
+def id_space(count, base=10, spread=10):
+    # (space, digits): the smallest power of `base` with room for `spread` numbers per item
+    digits = 1
+    while base ** digits < count * spread:
+        digits += 1
+    return base ** digits, digits
+
+
+class IdPermutation:
+    """
+    Bijection i -> (a * i + b) mod size on range(size), with a and b drawn
+    from `rng`. inverse() maps a number back to its index.
+    """
+
+    def __init__(self, size, rng=random):
+        if size < 1:
+            raise ValueError("IdPermutation needs a positive size")
+        self.size = size
+        # Multipliers near size / golden ratio scatter consecutive indices the most
+        a = int(size * 0.6180339887) + rng.randrange(max(1, size // 16))
+        while math.gcd(a, size) != 1:
+            a += 1
+        self.a = a % size or 1
+        self.b = rng.randrange(size)
+
+    def __call__(self, i):
+        return (self.a * i + self.b) % self.size
+
+    def inverse(self, number):
+        return (number - self.b) * pow(self.a, -1, self.size) % self.size
+
+    def state(self):
+        return [self.size, self.a, self.b]
+
+    @classmethod
+    def from_state(cls, state):
+        permutation = cls.__new__(cls)
+        permutation.size, permutation.a, permutation.b = state
+        return permutation
+
+
+_TRIPLES = {}  # alphabet -> every three-character string, in order
+
+
+def code(number, digits, alphabet=CODE_ALPHABET):
+    # `number` written with `digits` characters of `alphabet`, most significant
+    # first; three characters per table lookup
+    triples = _TRIPLES.get(alphabet)
+    if triples is None:
+        triples = _TRIPLES[alphabet] = [a + b + c for a in alphabet for b in alphabet for c in alphabet]
+    if digits <= 6:
+        # Up to six characters (1.5B codes with the default alphabet): one or two lookups
+        high, low = divmod(number, len(triples))
+        return triples[high][6 - digits:] + triples[low] if digits > 3 else triples[low][3 - digits:]
+    chunks = []
+    while digits >= 3:
+        number, rest = divmod(number, len(triples))
+        chunks.append(triples[rest])
+        digits -= 3
+    if digits:
+        # Below base ** digits a triple starts with 3 - digits zeros
+        chunks.append(triples[number % len(alphabet) ** digits][3 - digits:])
+    return "".join(reversed(chunks))
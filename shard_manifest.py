@@ -0,0 +1,142 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Manifests for sales shards generated on separate machines.
+
+Every node writes its part file and, next to it, a small JSON manifest:
+which shard it is (index and count), the rows it holds (first_row up to
+stop_row), the seed it was generated from and how that seed was derived
+from the master seed, the size and SHA-256 of the part file, the settings of
+the run and the SHA-256 of every dimension file the node wrote. Nodes never
+talk to each other: the dimensions are a pure function of the seed, so they
+come out byte-identical everywhere, and the manifests say so.
+
+Once the parts and manifests are collected in one directory,
+verify_shards() checks that they belong to the same run, that every shard
+is there exactly once, that the row ranges neither overlap nor leave gaps,
+that every part file is intact and that all nodes wrote the same dimension
+files. Only then should the parts be concatenated.
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    # (size in bytes, SHA-256 hex digest) of a file, read in chunks
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return size, digest.hexdigest()
+
+
+def file_digests(paths):
+    # {file name: SHA-256} of the given files
+    return {os.path.basename(path): file_digest(path)[1] for path in paths}
+
+
+def shard_manifest(part_path, shard_index, shard_count, first_row, rows, total_rows, seed_lineage, run,
+                   dimension_paths=(), **extra):
+    """
+    Manifest of one shard. `seed_lineage` describes how the shard's seed
+    was made (e.g. master seed, derivation path and derived seed); `run`
+    holds the settings every shard of the run must share.
+    """
+    size, sha256 = file_digest(part_path)
+    return dict({
+        "shard_index": shard_index,
+        "shard_count": shard_count,
+        "first_row": first_row,
+        "stop_row": first_row + rows,
+        "rows": rows,
+        "total_rows": total_rows,
+        "seed": seed_lineage,
+        "part": os.path.basename(part_path),
+        "bytes": size,
+        "sha256": sha256,
+        "run": run,
+        "dimensions": file_digests(dimension_paths),
+    }, **extra)
+
+
+def manifest_path(part_base):
+    return part_base + MANIFEST_SUFFIX
+
+
+def read_manifests(directory, prefix):
+    # Every manifest in `directory` whose name starts with `prefix`
+    manifests = []
+    for path in sorted(glob.glob(os.path.join(glob.escape(directory), glob.escape(prefix) + "*" + MANIFEST_SUFFIX))):
+        with open(path) as f:
+            manifests.append(json.load(f))
+    return manifests
+
+
+def verify_shards(manifests, directory="."):
+    """
+    Check a complete set of shard manifests against each other and against
+    the part and dimension files in `directory`. Returns the manifests in
+    shard order; raises RuntimeError listing every problem found.
+    """
+    if not manifests:
+        raise RuntimeError(f"No shard manifests found in {directory}")
+    problems = []
+    first = manifests[0]
+    for manifest in manifests[1:]:
+        for key in ("shard_count", "total_rows", "run", "dimensions"):
+            if manifest[key] != first[key]:
+                problems.append(f"shard {manifest['shard_index']} has a different {key} than shard "
+                                f"{first['shard_index']}")
+
+    by_index = {}
+    for manifest in manifests:
+        by_index.setdefault(manifest["shard_index"], []).append(manifest)
+    shard_count = first["shard_count"]
+    missing = [idx for idx in range(shard_count) if idx not in by_index]
+    if missing:
+        problems.append(f"missing shards {missing} of {shard_count}")
+    for idx, copies in sorted(by_index.items()):
+        if len(copies) > 1:
+            problems.append(f"shard {idx} appears {len(copies)} times")
+        if not 0 <= idx < shard_count:
+            problems.append(f"shard {idx} is outside 0..{shard_count - 1}")
+
+    ordered = sorted(manifests, key=lambda m: (m["first_row"], m["shard_index"]))
+    next_row = 0
+    for manifest in ordered:
+        if manifest["stop_row"] - manifest["first_row"] != manifest["rows"]:
+            problems.append(f"shard {manifest['shard_index']}: row range does not match its row count")
+        if manifest["first_row"] < next_row:
+            problems.append(f"shard {manifest['shard_index']}: rows {manifest['first_row']}.. overlap the "
+                            f"previous shard (ending at {next_row})")
+        elif manifest["first_row"] > next_row and not missing:
+            problems.append(f"rows {next_row}..{manifest['first_row'] - 1} are in no shard")
+        next_row = max(next_row, manifest["stop_row"])
+    if not missing and next_row != first["total_rows"]:
+        problems.append(f"shards cover {next_row} rows, expected {first['total_rows']}")
+
+    for manifest in ordered:
+        path = os.path.join(directory, manifest["part"])
+        if not os.path.exists(path):
+            problems.append(f"{manifest['part']} not found")
+        elif file_digest(path) != (manifest["bytes"], manifest["sha256"]):
+            problems.append(f"{manifest['part']} does not match its manifest (size or checksum)")
+    for name, sha256 in first["dimensions"].items():
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            problems.append(f"dimension file {name} not found")
+        elif file_digest(path)[1] != sha256:
+            problems.append(f"dimension file {name} differs from the one the shards were generated with")
+
+    if problems:
+        raise RuntimeError("Shards cannot be merged: " + "; ".join(problems))
+    return sorted(manifests, key=lambda m: m["shard_index"])
@@ -0,0 +1,144 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Bulk loading of generated tables straight into a SQLite database.
+
+Rows are inserted with executemany in batches of `batch_rows`, inside large
+transactions (one per `commit_rows` rows). During the load the database runs
+with journal_mode=OFF and synchronous=OFF: no rollback journal, no fsync per
+commit. Indexes are created only after all rows are in, which is much
+cheaper than keeping them up to date row by row. Both settings only apply
+to the loading connection; other connections get SQLite's defaults.
+
+A crash during the load can leave the database corrupt; it is meant to be
+regenerated, not recovered.
+"""
+
+import sqlite3
+import time
+
+DEFAULT_BATCH_ROWS = 50000       # Rows per executemany call
+DEFAULT_COMMIT_ROWS = 1000000    # Rows per transaction
+
+SQL_TYPES = {bool: "INTEGER", int: "INTEGER", float: "REAL", str: "TEXT"}
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def column_types(header, rows):
+    # SQLite type of each column, from the first row with a value in it
+    types = []
+    for i, name in enumerate(header):
+        value = next((row[i] for row in rows if row[i] is not None), None)
+        types.append((name, SQL_TYPES.get(type(value), "")))
+    return types
+
+
+class SQLiteLoader:
+    """
+    One connection to the database at `path`, set up for bulk loading.
+    insert() buffers rows per table; flush() hands them to executemany.
+    The connection may be used from another thread than the one that opened
+    it, as long as only one thread uses it at a time.
+    """
+
+    def __init__(self, path, batch_rows=DEFAULT_BATCH_ROWS, commit_rows=DEFAULT_COMMIT_ROWS):
+        self.path = path
+        self.batch_rows = batch_rows
+        self.commit_rows = commit_rows
+        self.rows = {}  # table -> rows inserted through this loader
+        self.load_time = 0.0  # seconds spent in executemany and commits
+        self.index_time = 0.0
+        self._pending = {}  # table -> (insert statement, buffered rows)
+        self._uncommitted = 0
+        self.conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=OFF")
+        self.conn.execute("PRAGMA synchronous=OFF")
+        self.conn.execute("BEGIN")
+
+    def create_table(self, table, columns, replace=True):
+        # columns: (name, SQL type) pairs; an existing table is dropped first with `replace`
+        if replace:
+            self.conn.execute(f"DROP TABLE IF EXISTS {quote(table)}")
+        definition = ", ".join(f"{quote(name)} {kind}".rstrip() for name, kind in columns)
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS {quote(table)} ({definition})")
+        placeholders = ", ".join("?" for _ in columns)
+        self._pending[table] = (f"INSERT INTO {quote(table)} VALUES ({placeholders})", [])
+        self.rows.setdefault(table, 0)
+
+    def insert(self, table, row):
+        buffered = self._pending[table][1]
+        buffered.append(row)
+        if len(buffered) >= self.batch_rows:
+            self._execute(table)
+
+    def insert_many(self, table, rows):
+        self._pending[table][1].extend(rows)
+        if len(self._pending[table][1]) >= self.batch_rows:
+            self._execute(table)
+
+    def _execute(self, table):
+        statement, buffered = self._pending[table]
+        if not buffered:
+            return
+        started = time.perf_counter()
+        self.conn.executemany(statement, buffered)
+        self.rows[table] += len(buffered)
+        self._uncommitted += len(buffered)
+        self._pending[table] = (statement, [])
+        if self._uncommitted >= self.commit_rows:
+            self.conn.execute("COMMIT")
+            self.conn.execute("BEGIN")
+            self._uncommitted = 0
+        self.load_time += time.perf_counter() - started
+
+    def flush(self):
+        for table in self._pending:
+            self._execute(table)
+
+    def create_indexes(self, table, columns):
+        # One index per column, built after the load. Ends the load transaction.
+        self.flush()
+        started = time.perf_counter()
+        self.conn.execute("COMMIT")
+        self.load_time += time.perf_counter() - started
+        started = time.perf_counter()
+        for column in columns:
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {quote(f'idx_{table}_{column}')} "
+                              f"ON {quote(table)} ({quote(column)})")
+        self.index_time += time.perf_counter() - started
+        self.conn.execute("BEGIN")
+
+    def close(self):
+        if self.conn is None:
+            return
+        self.flush()
+        started = time.perf_counter()
+        self.conn.execute("COMMIT")
+        self.load_time += time.perf_counter() - started
+        self.conn.close()
+        self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_table(path, table):
+    # All rows of `table` in insertion order, as lists
+    conn = sqlite3.connect(path)
+    try:
+        return [list(row) for row in conn.execute(f"SELECT * FROM {quote(table)} ORDER BY rowid")]
+    finally:
+        conn.close()
+
+
+def table_counts(path, tables):
+    conn = sqlite3.connect(path)
+    try:
+        return {table: conn.execute(f"SELECT COUNT(*) FROM {quote(table)}").fetchone()[0] for table in tables}
+    finally:
+        conn.close()
@@ -0,0 +1,371 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+One-pass summary statistics of the sales rows, in bounded memory.
+
+SalesStats collects, while rows are generated:
+
+  - mean, variance, min and max of unit_price, quantity and revenue
+    (Welford's online algorithm, batches combined with Chan's formula)
+  - quantiles of the same columns (KLL sketch, rank error about 1.7 / k)
+  - distinct products and stores (HyperLogLog, about 1.04 / sqrt(2^p) error)
+  - the most frequent products and stores (Space-Saving, with a per-item
+    error bound)
+
+The memory used depends on the sketch parameters, not on the row count
+(KLL grows with log(rows / k), a few extra compactors for 1B rows). All
+sketches can be merged, so shards can be summarized separately, and all
+randomness comes from their own seeded generators: the same rows give the
+same report, and the generators' random streams are never touched.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import operator
+import random
+from collections import Counter
+
+DEFAULT_BATCH_ROWS = 10000
+DEFAULT_KLL_K = 200
+DEFAULT_HLL_PRECISION = 14
+DEFAULT_TOP_CAPACITY = 64   # Space-Saving counters per column
+DEFAULT_TOP_K = 10          # Items listed in the report
+REPORT_QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max (Welford / Chan et al.)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+
+    def add_many(self, values):
+        # Moments of the batch (two passes over it), then combined
+        if not values:
+            return
+        batch = RunningMoments()
+        batch.count = len(values)
+        batch.mean = math.fsum(values) / batch.count
+        deviations = [value - batch.mean for value in values]
+        batch.m2 = math.fsum(map(operator.mul, deviations, deviations))
+        batch.min, batch.max = min(values), max(values)
+        self.merge(batch)
+
+    def merge(self, other):
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.min, self.max = other.count, other.mean, other.m2, other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def variance(self):
+        # Sample variance
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def state(self):
+        return [self.count, self.mean, self.m2, self.min, self.max]
+
+    def load_state(self, state):
+        self.count, self.mean, self.m2, self.min, self.max = state
+
+
+class KLLSketch:
+    """
+    KLL quantile sketch (Karnin, Lang, Liberty 2016). Level h holds items of
+    weight 2^h; a full level is sorted and every other item (random offset)
+    moves up a level. Capacities shrink by `c` per level below the top.
+    """
+
+    def __init__(self, k=DEFAULT_KLL_K, c=2.0 / 3.0, seed=0):
+        self.k = k
+        self.c = c
+        self.rng = random.Random(seed)
+        self.compactors = [[]]
+        self.size = 0
+        self.max_size = self._capacity(0)
+
+    def _capacity(self, level):
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def _grow(self):
+        self.compactors.append([])
+        self.max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+
+    def _compress(self):
+        while self.size >= self.max_size:
+            for level, items in enumerate(self.compactors):
+                if len(items) >= self._capacity(level):
+                    if level + 1 == len(self.compactors):
+                        self._grow()
+                    items.sort()
+                    keep = items[-1:] if len(items) % 2 else []
+                    offset = self.rng.random() < 0.5
+                    self.compactors[level + 1].extend(items[offset:len(items) - len(keep):2])
+                    self.compactors[level] = keep
+                    self.size = sum(len(c) for c in self.compactors)
+                    break
+
+    def add(self, value):
+        self.compactors[0].append(value)
+        self.size += 1
+        if self.size >= self.max_size:
+            self._compress()
+
+    def add_many(self, values):
+        self.compactors[0].extend(values)
+        self.size += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, items in enumerate(other.compactors):
+            self.compactors[level].extend(items)
+        self.size = sum(len(c) for c in self.compactors)
+        self._compress()
+
+    def quantiles(self, fractions):
+        # Approximate value at each fraction (0..1) of the weighted items
+        weighted = sorted((value, 1 << level) for level, items in enumerate(self.compactors) for value in items)
+        if not weighted:
+            return [None for _ in fractions]
+        total = sum(weight for _, weight in weighted)
+        results = []
+        for fraction in fractions:
+            target, seen = fraction * total, 0
+            for value, weight in weighted:
+                seen += weight
+                if seen >= target:
+                    break
+            results.append(value)
+        return results
+
+    def state(self):
+        version, internal, gauss = self.rng.getstate()
+        return {"compactors": [list(items) for items in self.compactors], "rng": [version, list(internal), gauss]}
+
+    def load_state(self, state):
+        self.compactors = [list(items) for items in state["compactors"]]
+        self.size = sum(len(c) for c in self.compactors)
+        self.max_size = sum(self._capacity(level) for level in range(len(self.compactors)))
+        version, internal, gauss = state["rng"]
+        self.rng.setstate((version, tuple(internal), gauss))
+
+
+def hash64(value):
+    # Stable 64-bit hash of a value's text (Python's hash() changes between runs)
+    return int.from_bytes(hashlib.blake2b(str(value).encode(), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counter with 2^p one-byte registers."""
+
+    def __init__(self, precision=DEFAULT_HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def add(self, value):
+        h = hash64(value)
+        rest_bits = 64 - self.precision
+        index = h >> rest_bits
+        rest = h & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other):
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / math.fsum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            return m * math.log(m / zeros)  # linear counting for small cardinalities
+        return raw
+
+    def state(self):
+        return self.registers.hex()
+
+    def load_state(self, state):
+        self.registers = bytearray.fromhex(state)
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy hitters with `capacity` counters. Each kept item has
+    a count that overestimates its true count by at most its error.
+    Batches of exact counts are merged in (mergeable summaries, Agarwal et
+    al. 2012), so each batch costs one pass over its distinct items.
+    """
+
+    def __init__(self, capacity=DEFAULT_TOP_CAPACITY):
+        self.capacity = capacity
+        self.counters = {}  # item -> [count, error]
+
+    def _floor(self):
+        # Count any item not kept may have had
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge_counters(self, counters, floor=0):
+        own_floor = self._floor()
+        merged = {}
+        for item in self.counters.keys() | counters.keys():
+            count, error = self.counters.get(item, (own_floor, own_floor))
+            other_count, other_error = counters.get(item, (floor, floor))
+            merged[item] = [count + other_count, error + other_error]
+        kept = heapq.nlargest(self.capacity, merged.items(), key=lambda entry: (entry[1][0], str(entry[0])))
+        self.counters = dict(kept)
+
+    def add_counts(self, counts):
+        # {item: exact count in this batch}
+        self.merge_counters({item: (count, 0) for item, count in counts.items()})
+
+    def merge(self, other):
+        self.merge_counters(other.counters, other._floor())
+
+    def top(self, k):
+        ranked = sorted(self.counters.items(), key=lambda entry: (-entry[1][0], str(entry[0])))[:k]
+        return [{"value": item, "count": count, "error": error} for item, (count, error) in ranked]
+
+    def state(self):
+        return [[item, count, error] for item, (count, error) in self.counters.items()]
+
+    def load_state(self, state):
+        self.counters = {item: [count, error] for item, count, error in state}
+
+
+class SalesStats:
+    """
+    Summary of the sales rows: moments and quantiles of unit_price,
+    quantity and revenue, distinct counts and heavy hitters of product and
+    store. add() buffers single rows and folds them in per `batch_rows`;
+    add_columns() and add_counts() take whole batches.
+    """
+
+    NUMERIC = ("unit_price", "quantity", "revenue")
+    KEYS = ("product", "store")
+
+    def __init__(self, batch_rows=DEFAULT_BATCH_ROWS, k=DEFAULT_KLL_K, precision=DEFAULT_HLL_PRECISION,
+                 capacity=DEFAULT_TOP_CAPACITY, seed=0):
+        self.batch_rows = batch_rows
+        self.rows = 0
+        self.moments = {name: RunningMoments() for name in self.NUMERIC}
+        self.quantiles = {name: KLLSketch(k, seed=seed * 31 + i) for i, name in enumerate(self.NUMERIC)}
+        self.distinct = {name: HyperLogLog(precision) for name in self.KEYS}
+        self.top = {name: SpaceSaving(capacity) for name in self.KEYS}
+        self._pending = []
+
+    def add(self, unit_price, quantity, revenue, product, store):
+        self._pending.append((unit_price, quantity, revenue, product, store))
+        if len(self._pending) >= self.batch_rows:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            pending, self._pending = self._pending, []
+            self.add_columns(*(list(column) for column in zip(*pending)))
+
+    def add_columns(self, unit_price, quantity, revenue, product=None, store=None):
+        # Lists of equal length; product/store may be left out and passed to add_counts()
+        self.rows += len(unit_price)
+        for name, values in zip(self.NUMERIC, (unit_price, quantity, revenue)):
+            self.moments[name].add_many(values)
+            self.quantiles[name].add_many(values)
+        for name, values in zip(self.KEYS, (product, store)):
+            if values is not None:
+                self.add_counts(name, Counter(values))
+
+    def add_counts(self, name, counts):
+        # {value: number of rows} of a product or store column
+        distinct = self.distinct[name]
+        for value in counts:
+            distinct.add(value)
+        self.top[name].add_counts(counts)
+
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        self.rows += other.rows
+        for name in self.NUMERIC:
+            self.moments[name].merge(other.moments[name])
+            self.quantiles[name].merge(other.quantiles[name])
+        for name in self.KEYS:
+            self.distinct[name].merge(other.distinct[name])
+            self.top[name].merge(other.top[name])
+
+    def state(self):
+        # JSON-able state, for checkpoints and for sending between processes
+        self.flush()
+        return {
+            "rows": self.rows,
+            "moments": {name: m.state() for name, m in self.moments.items()},
+            "quantiles": {name: q.state() for name, q in self.quantiles.items()},
+            "distinct": {name: d.state() for name, d in self.distinct.items()},
+            "top": {name: t.state() for name, t in self.top.items()},
+        }
+
+    def load_state(self, state):
+        self.rows = state["rows"]
+        for group, sketches in (("moments", self.moments), ("quantiles", self.quantiles),
+                                ("distinct", self.distinct), ("top", self.top)):
+            for name, sketch in sketches.items():
+                sketch.load_state(state[group][name])
+
+    def report(self, top_k=DEFAULT_TOP_K):
+        self.flush()
+        columns = {}
+        for name in self.NUMERIC:
+            m = self.moments[name]
+            quantiles = self.quantiles[name].quantiles(REPORT_QUANTILES)
+            columns[name] = {
+                "count": m.count,
+                "mean": m.mean,
+                "variance": m.variance(),
+                "stddev": math.sqrt(m.variance()),
+                "min": m.min,
+                "max": m.max,
+                "quantiles": {f"p{round(q * 100):02d}": value for q, value in zip(REPORT_QUANTILES, quantiles)},
+            }
+        some = next(iter(self.quantiles.values()))
+        return {
+            "rows": self.rows,
+            "columns": columns,
+            "distinct": {name: round(d.estimate()) for name, d in self.distinct.items()},
+            "top": {name: t.top(top_k) for name, t in self.top.items()},
+            "sketches": {
+                "quantiles": f"KLL k={some.k}",
+                "distinct": f"HyperLogLog p={next(iter(self.distinct.values())).precision}",
+                "top": f"Space-Saving, {next(iter(self.top.values())).capacity} counters",
+            },
+        }
+
+    def write(self, path, top_k=DEFAULT_TOP_K):
+        report = self.report(top_k)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return report
@@ -0,0 +1,94 @@
+""" MIT License - Copyright (c) 2025 Antonio Romeo
+
+Producer/consumer pipeline for the sales writers.
+
+The generating thread puts row batches on a bounded queue and goes straight
+back to generating; a writer thread takes them off, formats and writes them.
+The write syscall releases the GIL, so on slow (e.g. network attached)
+volumes disk latency overlaps with generation instead of adding to it. When
+the queue is full the producer blocks, so at most `max_pending` batches are
+held in memory.
+
+Optionally the writer thread flushes and fsyncs the file every
+`fsync_interval` seconds, and once more on close.
+"""
+
+import io
+import os
+import queue
+import threading
+import time
+
+DEFAULT_MAX_PENDING = 8  # Batches queued between producer and writer thread
+DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024  # Write buffer of the output file in pipelined mode
+
+_DONE = object()
+
+
+def fsync_file(file):
+    # Flush Python's buffers and ask the OS to put the data on disk
+    file.flush()
+    try:
+        os.fsync(file.fileno())
+    except (OSError, io.UnsupportedOperation, AttributeError):
+        pass  # in-memory or otherwise unsyncable file
+
+
+class BackgroundWriter:
+    """
+    Runs `consume(batch)` on a writer thread for every batch passed to put(),
+    in order. An exception raised by `consume` is re-raised in the producer
+    by the next put() or by close().
+    """
+
+    def __init__(self, consume, file=None, max_pending=DEFAULT_MAX_PENDING, fsync_interval=None):
+        if fsync_interval is not None and file is None:
+            raise ValueError("fsync_interval needs the file to sync")
+        self.consume = consume
+        self.file = file
+        self.fsync_interval = fsync_interval
+        self.batches = 0
+        self.fsyncs = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name="sales-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        last_sync = time.monotonic()
+        while True:
+            batch = self._queue.get()
+            if batch is _DONE:
+                break
+            if self._error is not None:
+                continue  # keep draining so the producer never blocks on a dead writer
+            try:
+                self.consume(batch)
+                self.batches += 1
+                if self.fsync_interval is not None and time.monotonic() - last_sync >= self.fsync_interval:
+                    fsync_file(self.file)
+                    self.fsyncs += 1
+                    last_sync = time.monotonic()
+            except BaseException as exc:
+                self._error = exc
+
+    def put(self, batch):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(batch)
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(_DONE)
+            self._thread.join()
+        if self._error is not None:
+            raise self._error
+        if self.fsync_interval is not None:
+            fsync_file(self.file)
+            self.fsyncs += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()